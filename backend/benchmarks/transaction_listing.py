@@ -0,0 +1,129 @@
+"""
+Benchmark de la liste des transactions (pages de 100 lignes).
+
+Alimente une base dédiée avec 1M de transactions réparties sur quelques comptes,
+puis mesure la latence d'une page de 100 lignes :
+  - ancien chemin : documents Beanie + `account.fetch()` par ligne, pagination par offset
+  - nouveau chemin : curseur brut projeté, pagination keyset
+
+Usage (depuis backend/) :
+    python -m benchmarks.transaction_listing --total 1000000 --pages 50
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, UTC
+
+from beanie import init_beanie
+from bson import DBRef, ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from src.config.settings import get_settings
+from src.models.banking import Account, Transaction
+from src.models.user import User
+from src.api.v1.transaction import TRANSACTION_PROJECTION, transaction_response_from_raw
+from src.utils.pagination import encode_cursor, keyset_after
+
+settings = get_settings()
+PAGE_SIZE = 100
+SORT = [("transaction_date", -1), ("_id", -1)]
+
+
+async def seed(db, total: int, accounts: int, batch_size: int = 10_000) -> ObjectId:
+    """Insère `total` transactions et retourne l'id du compte le plus chargé"""
+    collection = db[Transaction.Settings.name]
+    account_ids = [ObjectId() for _ in range(accounts)]
+    hot_account = account_ids[0]
+    start = datetime.now(UTC) - timedelta(days=5 * 365)
+    step = timedelta(days=5 * 365) / total
+
+    for offset in range(0, total, batch_size):
+        batch = []
+        for i in range(offset, min(offset + batch_size, total)):
+            # La moitié des lignes appartient au compte "chaud"
+            account_id = hot_account if i % 2 == 0 else random.choice(account_ids)
+            batch.append({
+                "transaction_id": f"BEN{i:012d}",
+                "account": DBRef("accounts", account_id),
+                "transaction_type": random.choice(["deposit", "withdrawal", "transfer"]),
+                "amount": random.randint(-50_000, 50_000),  # centièmes
+                "currency": "USD",
+                "description": "Benchmark",
+                "status": "completed",
+                "transaction_date": start + step * i,
+            })
+        await collection.insert_many(batch, ordered=False)
+    return hot_account
+
+
+async def old_page(account_id: ObjectId, offset: int) -> int:
+    transactions = await Transaction.find({"account.$id": account_id}) \
+        .sort(SORT).skip(offset).limit(PAGE_SIZE).to_list()
+    for transaction in transactions:
+        await transaction.account.fetch()
+    return len(transactions)
+
+
+async def new_page(collection, account_id: ObjectId, cursor) -> tuple:
+    query = {"account.$id": account_id}
+    if cursor:
+        query = {"$and": [query, keyset_after(cursor, "transaction_date")]}
+    rows = [
+        transaction_response_from_raw(document, str(account_id))
+        async for document in collection.find(query, TRANSACTION_PROJECTION).sort(SORT).limit(PAGE_SIZE)
+    ]
+    next_cursor = encode_cursor(rows[-1].transaction_date, rows[-1].id) if rows else None
+    return len(rows), next_cursor
+
+
+def report(label: str, samples: list) -> None:
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[int(len(samples_ms) * 0.95) - 1] if len(samples_ms) > 1 else samples_ms[0]
+    print(f"{label:<40} median={statistics.median(samples_ms):8.2f} ms  p95={p95:8.2f} ms  max={samples_ms[-1]:8.2f} ms")
+
+
+async def main(total: int, accounts: int, pages: int, keep: bool) -> None:
+    client = AsyncIOMotorClient(settings.MONGODB_URI)
+    db = client[f"{settings.DB_NAME}_bench"]
+    await init_beanie(database=db, document_models=[User, Account, Transaction])
+
+    if not keep:
+        await db[Transaction.Settings.name].delete_many({})
+    if await db[Transaction.Settings.name].estimated_document_count() < total:
+        print(f"Seeding {total} transactions...")
+        started = time.perf_counter()
+        hot_account = await seed(db, total, accounts)
+        print(f"Seeded in {time.perf_counter() - started:.1f} s")
+    else:
+        hot_account = (await db[Transaction.Settings.name].find_one({}, {"account": 1}))["account"].id
+
+    # Ancien chemin (le compte n'existe pas : fetch() coûte tout de même un aller-retour)
+    old_samples = []
+    for page in range(pages):
+        started = time.perf_counter()
+        await old_page(hot_account, page * PAGE_SIZE)
+        old_samples.append(time.perf_counter() - started)
+
+    collection = Transaction.get_motor_collection()
+    new_samples = []
+    cursor = None
+    for _ in range(pages):
+        started = time.perf_counter()
+        _, cursor = await new_page(collection, hot_account, cursor)
+        new_samples.append(time.perf_counter() - started)
+
+    report(f"offset + fetch per row ({pages} pages)", old_samples)
+    report(f"projection + keyset ({pages} pages)", new_samples)
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--total", type=int, default=1_000_000)
+    parser.add_argument("--accounts", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--keep", action="store_true", help="réutiliser les données déjà insérées")
+    args = parser.parse_args()
+    asyncio.run(main(args.total, args.accounts, args.pages, args.keep))
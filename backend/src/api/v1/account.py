@@ -1,11 +1,61 @@
+import asyncio
+from datetime import datetime, timedelta, UTC
+from typing import AsyncIterator, Dict, List, Optional
+
 from beanie import PydanticObjectId
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from src.api.v1.auth import get_current_active_user
-from src.models.user import User
+from src.api.v1.transaction import get_user_account as get_account_for_user, get_user_account_context
+from src.config.settings import get_settings
 from src.models.banking import Account
+from src.models.user import User
+from src.utils.money import minor_to_float
+from src.utils.ledger import account_key, ledger_balance
+from src.utils.rollups import monthly_rollups
+from src.utils.balance_history import extend_daily_balances, balance_series
+from src.utils.live_events import RESYNC, format_event, live_events
 from pydantic import BaseModel
 
 router = APIRouter()
+settings = get_settings()
+
+class LedgerBalanceResponse(BaseModel):
+    account_id: PydanticObjectId
+    balance: float
+    ledger_balance: float
+    in_sync: bool
+
+
+class TypeSummary(BaseModel):
+    count: int
+    total: float
+
+
+class MonthlySummary(BaseModel):
+    month: str
+    income: float
+    expense: float
+    net: float
+    by_type: Dict[str, TypeSummary]
+
+
+class MonthlySummaryResponse(BaseModel):
+    account_id: PydanticObjectId
+    currency: str
+    months: List[MonthlySummary]
+
+
+class BalancePoint(BaseModel):
+    date: str
+    balance: float
+
+
+class BalanceHistoryResponse(BaseModel):
+    account_id: PydanticObjectId
+    currency: str
+    points: List[BalancePoint]
+
 
 class AccountResponse(BaseModel):
     id: PydanticObjectId
@@ -17,33 +67,130 @@ class AccountResponse(BaseModel):
     is_primary: bool
     created_at: str
     updated_at: str
-    last_transaction: str = None
+    last_transaction: Optional[str] = None
 
 @router.get("/accounts", response_model=AccountResponse)
 async def get_user_account(current_user: User = Depends(get_current_active_user)):
     """Récupère le compte bancaire de l'utilisateur connecté"""
-    if not current_user.uses_banking_app:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Banking app is not enabled for this user"
-        )
-
-    account = await Account.find_one({"user.$id": current_user.id})
-    if not account:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Account not found for this user"
-        )
+    account = await get_account_for_user(current_user)
 
     return AccountResponse(
         id=account.id,
         account_number=account.account_number,
         account_name=account.account_name,
-        balance=account.balance,
+        balance=minor_to_float(account.balance),
         currency=account.currency,
         is_active=account.is_active,
         is_primary=account.is_primary,
         created_at=account.created_at.isoformat(),
         updated_at=account.updated_at.isoformat(),
         last_transaction=account.last_transaction.isoformat() if account.last_transaction else None
-    )
\ No newline at end of file
+    )
+
+
+@router.get("/accounts/ledger-balance", response_model=LedgerBalanceResponse)
+async def get_ledger_balance(
+        rebuild: bool = False,
+        current_user: User = Depends(get_current_active_user)
+):
+    """Compare le solde du compte (qui fait foi) au solde recalculé depuis le journal d'audit (instantané + écritures)"""
+    account = await get_account_for_user(current_user)
+    computed = await ledger_balance(account_key(account.id), rebuild=rebuild)
+    return LedgerBalanceResponse(
+        account_id=account.id,
+        balance=minor_to_float(account.balance),
+        ledger_balance=minor_to_float(computed),
+        in_sync=computed == account.balance
+    )
+
+
+def last_months(count: int, now: datetime) -> List[str]:
+    """Les `count` derniers mois ("YYYY-MM"), du plus ancien au mois courant"""
+    index = now.year * 12 + now.month - 1
+    return [f"{i // 12:04d}-{i % 12 + 1:02d}" for i in range(index - count + 1, index + 1)]
+
+
+@router.get("/accounts/monthly-summary", response_model=MonthlySummaryResponse)
+async def get_monthly_summary(
+        months: int = Query(24, ge=1, le=24),
+        current_user: User = Depends(get_current_active_user)
+):
+    """Entrées/sorties mensuelles par type de transaction, lues dans les agrégats matérialisés"""
+    account = await get_user_account_context(current_user)
+    keys = last_months(months, datetime.now(UTC))
+    rollups = {rollup.month: rollup for rollup in await monthly_rollups(account.id, since_month=keys[0])}
+
+    summaries = []
+    for month in keys:
+        rollup = rollups.get(month)
+        income, expense = (rollup.income, rollup.expense) if rollup else (0, 0)
+        summaries.append(MonthlySummary(
+            month=month,
+            income=minor_to_float(income),
+            expense=minor_to_float(expense),
+            net=minor_to_float(income - expense),
+            by_type={
+                transaction_type: TypeSummary(count=totals.count, total=minor_to_float(totals.total))
+                for transaction_type, totals in (rollup.types.items() if rollup else [])
+            }
+        ))
+
+    return MonthlySummaryResponse(account_id=account.id, currency=account.currency, months=summaries)
+
+
+@router.get("/accounts/balance-history", response_model=BalanceHistoryResponse)
+async def get_balance_history(
+        days: int = Query(365, ge=1, le=730),
+        current_user: User = Depends(get_current_active_user)
+):
+    """Solde de fin de journée sur les `days` derniers jours (UTC), aujourd'hui inclus"""
+    account = await get_account_for_user(current_user)
+    today = datetime.now(UTC).date()
+    await extend_daily_balances(account.id, account.currency, today)
+    series = await balance_series(account.id, today - timedelta(days=days - 1), today, account.balance)
+    return BalanceHistoryResponse(
+        account_id=account.id,
+        currency=account.currency,
+        points=[BalancePoint(date=day, balance=minor_to_float(balance)) for day, balance in series]
+    )
+
+
+async def account_events(account_id: PydanticObjectId) -> AsyncIterator[str]:
+    """Flux SSE d'un compte : solde courant, puis transactions et soldes au fil de l'eau"""
+    queue = live_events.subscribe(account_id)
+    try:
+        yield "retry: 5000\n\n"
+        # Lu après l'abonnement : aucun changement ne tombe entre l'état initial et le flux
+        account = await Account.get_motor_collection().find_one({"_id": account_id}, {"balance": 1})
+        yield format_event("balance", {"account_id": str(account_id), "balance": minor_to_float(account["balance"])})
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=settings.LIVE_EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Commentaire SSE : garde la connexion ouverte à travers les proxys
+                yield ": ping\n\n"
+                continue
+            if message is None:
+                return
+            yield format_event("resync", {"account_id": str(account_id)}) if message == RESYNC else message
+    finally:
+        live_events.unsubscribe(account_id, queue)
+
+
+@router.get("/accounts/events")
+async def stream_account_events(current_user: User = Depends(get_current_active_user)):
+    """
+    Événements temps réel du compte (Server-Sent Events) : `balance`, `transaction`, et
+    `resync` quand des événements ont été perdus (recharger alors le compte et l'historique).
+    """
+    account = await get_user_account_context(current_user)
+    if not live_events.available:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Flux temps réel indisponible"
+        )
+    return StreamingResponse(
+        account_events(account.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
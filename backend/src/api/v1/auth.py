@@ -15,6 +15,7 @@ from ...models.user import User, UserRole, UserStatus
 from ...config.settings import get_settings
 from ...utils.email import send_password_reset_email, send_otp_email
 from ...utils.security import get_password_hash, verify_password
+from ...utils.account_cache import account_cache
 
 
 logger = logging.getLogger(__name__)
@@ -257,11 +258,12 @@ async def create_bank_account_for_user(user: User):
         account = Account(
             user=user,
             account_number=account_number,
-            balance=0.0,
+            balance=0,
             currency=Currency.USD,
             is_active=True
         )
         await account.insert()
+        account_cache.invalidate(user_id=user.id, account_number=account_number)
         logger.info(f"Bank account created for user {user.id}")
         return account
 
@@ -891,6 +893,8 @@ async def update_profile(
         # Update timestamp
         current_user.updated_at = datetime.now(UTC)
         await current_user.save()
+        # Le nom du titulaire figure dans le contexte de compte mis en cache
+        account_cache.invalidate(user_id=current_user.id)
 
         return UserResponse(
             id=str(current_user.id),
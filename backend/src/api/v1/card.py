@@ -5,11 +5,14 @@ from beanie import PydanticObjectId
 from fastapi import APIRouter, Depends, status, HTTPException
 from datetime import date, datetime
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 from src.api.v1.auth import get_current_active_user
-from src.models.banking import CardType, Account, Card, CardStatus
+from src.models.banking import CardType, Card, CardStatus
 from src.models.user import User
+from src.utils.money import to_minor, minor_to_float, validate_money_amount
+from src.utils.account_cache import account_cache
+from src.utils.card_limits import card_authorizer
 
 router = APIRouter()
 
@@ -35,6 +38,25 @@ class CardResponse(BaseModel):
     created_at: datetime
 
 
+class AuthorizationRequest(BaseModel):
+    amount: float
+    merchant: Optional[str] = Field(None, max_length=100)
+
+    @field_validator('amount')
+    @classmethod
+    def validate_amount(cls, v: float) -> float:
+        return validate_money_amount(v)
+
+class AuthorizationResponse(BaseModel):
+    card_id: PydanticObjectId
+    approved: bool
+    reason: Optional[str] = None
+    amount: float
+    daily_limit: float
+    spent_last_24h: float
+    remaining: float
+
+
 def mask_card_number(card_number: str) -> str:
     """Mask card number except last 4 digits"""
     if not card_number or len(card_number) < 4:
@@ -52,8 +74,8 @@ async def create_card(
         Créer une nouvelle carte bancaire pour l'utilisateur connecté
     """
     # Vérifier que l'utilisateur a un compte bancaire principal
-    account = await Account.find_one({"user.$id": current_user.id}, Account.is_primary == True)
-    if not account:
+    account = await account_cache.by_user(current_user)
+    if not account or not account.is_primary:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Vous devez avoir un compte bancaire principal pour créer une carte"
@@ -72,7 +94,7 @@ async def create_card(
         expiry_date=expiry_date,
         cvv=cvv,
         is_contactless=card_data.is_contactless,
-        daily_limit=card_data.daily_limit,
+        daily_limit=to_minor(card_data.daily_limit),
         is_virtual=card_data.is_virtual,
         purpose=card_data.purpose,
         status=CardStatus.ACTIVE
@@ -87,7 +109,7 @@ async def create_card(
         card_name=card.card_name,
         expiry_date=card.expiry_date,
         is_contactless=card.is_contactless,
-        daily_limit=card.daily_limit,
+        daily_limit=minor_to_float(card.daily_limit),
         status=card.status,
         is_virtual=card.is_virtual,
         purpose=card.purpose,
@@ -124,7 +146,7 @@ async def get_card_details(
         card_name=card.card_name,
         expiry_date=card.expiry_date,
         is_contactless=card.is_contactless,
-        daily_limit=card.daily_limit,
+        daily_limit=minor_to_float(card.daily_limit),
         status=card.status,
         is_virtual=card.is_virtual,
         purpose=card.purpose,
@@ -148,7 +170,7 @@ async def get_user_cards(
             card_name=card.card_name,
             expiry_date=card.expiry_date,
             is_contactless=card.is_contactless,
-            daily_limit=card.daily_limit,
+            daily_limit=minor_to_float(card.daily_limit),
             status=card.status,
             is_virtual=card.is_virtual,
             purpose=card.purpose,
@@ -156,3 +178,39 @@ async def get_user_cards(
         )
         for card in cards
     ]
+
+
+@router.post("/cards/{card_id}/authorize", response_model=AuthorizationResponse)
+async def authorize_card_payment(
+    card_id: str,
+    authorization: AuthorizationRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+        Autoriser un paiement par carte contre le plafond journalier (fenêtre glissante de 24 h)
+    """
+    try:
+        card_oid = PydanticObjectId(card_id)
+    except:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ID de carte invalide"
+        )
+    window = await card_authorizer.window(card_oid, current_user.id)
+    if window is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Carte non trouvée ou vous n'avez pas l'autorisation"
+        )
+
+    decision = card_authorizer.authorize(window, to_minor(authorization.amount))
+
+    return AuthorizationResponse(
+        card_id=card_oid,
+        approved=decision.approved,
+        reason=decision.reason,
+        amount=authorization.amount,
+        daily_limit=minor_to_float(decision.daily_limit),
+        spent_last_24h=minor_to_float(decision.spent),
+        remaining=minor_to_float(decision.remaining)
+    )
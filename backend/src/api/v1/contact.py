@@ -6,8 +6,8 @@ from fastapi import APIRouter, Depends, Query, HTTPException, status
 from pydantic import BaseModel, EmailStr
 
 from src.api.v1.auth import get_current_active_user
-from src.models.banking import Account
 from src.models.user import User, UserStatus
+from src.utils.account_cache import account_cache
 
 
 logger = logging.getLogger(__name__)
@@ -49,7 +49,7 @@ async def get_contacts(
 
         contacts: List[ContactResponse] = []
         for user in users:
-            account = await Account.find_one({"user.$id": user.id})
+            account = await account_cache.by_user(user)
             if account:
                 contacts.append(ContactResponse(
                     id=account.id,
@@ -94,7 +94,7 @@ async def get_contact_by_id(
                 detail="Contact non trouvé"
             )
 
-        account = await Account.find_one({"user.$id": user.id})
+        account = await account_cache.by_user(user)
         if not account:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
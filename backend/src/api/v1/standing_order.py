@@ -0,0 +1,294 @@
+import asyncio
+from datetime import datetime, UTC
+from typing import List, Optional
+
+from beanie import PydanticObjectId
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel, Field, field_validator
+
+from src.api.v1.auth import get_current_active_user
+from src.api.v1.transaction import (
+    TransferCreate, process_transfer, get_account_by_number, get_user_account_context
+)
+from src.config.settings import get_settings
+from src.models.banking import StandingOrder, StandingOrderFrequency, StandingOrderStatus
+from src.models.user import User, UserStatus
+from src.utils.idempotency import run_idempotent
+from src.utils.money import to_minor, minor_to_float, validate_money_amount
+from src.utils.standing_orders import RunResult, next_occurrence, standing_order_scheduler
+
+router = APIRouter()
+settings = get_settings()
+
+
+class StandingOrderCreate(BaseModel):
+    to_account_number: str
+    amount: float
+    description: str = Field("", max_length=140)
+    frequency: StandingOrderFrequency
+    interval: int = Field(1, ge=1, le=12)
+    start_at: Optional[datetime] = None  # Première échéance ; maintenant par défaut
+    end_at: Optional[datetime] = None
+
+    @field_validator('amount')
+    @classmethod
+    def validate_amount(cls, v: float) -> float:
+        return validate_money_amount(v)
+
+
+class StandingOrderResponse(BaseModel):
+    id: PydanticObjectId
+    to_account_number: str
+    amount: float
+    description: str
+    frequency: str
+    interval: int
+    start_at: datetime
+    end_at: Optional[datetime] = None
+    status: str
+    next_run_at: Optional[datetime] = None
+    runs: int
+    consecutive_failures: int
+    last_run_at: Optional[datetime] = None
+    last_transaction_id: Optional[str] = None
+    last_error: Optional[str] = None
+    created_at: datetime
+
+
+def standing_order_response(order: StandingOrder) -> StandingOrderResponse:
+    return StandingOrderResponse(
+        id=order.id,
+        to_account_number=order.to_account_number,
+        amount=minor_to_float(order.amount),
+        description=order.description,
+        frequency=order.frequency,
+        interval=order.interval,
+        start_at=order.start_at,
+        end_at=order.end_at,
+        status=order.status,
+        next_run_at=order.next_run_at,
+        runs=order.runs,
+        consecutive_failures=order.consecutive_failures,
+        last_run_at=order.last_run_at,
+        last_transaction_id=order.last_transaction_id,
+        last_error=order.last_error,
+        created_at=order.created_at
+    )
+
+
+def as_utc(moment: datetime) -> datetime:
+    return moment.replace(tzinfo=moment.tzinfo or UTC)
+
+
+async def get_user_standing_order(order_id: str, user: User) -> StandingOrder:
+    try:
+        order_oid = PydanticObjectId(order_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ID d'ordre permanent invalide"
+        )
+    order = await StandingOrder.find_one({"_id": order_oid, "user.$id": user.id})
+    if not order:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ordre permanent non trouvé"
+        )
+    return order
+
+
+async def execute_standing_orders(orders: List[dict]) -> List[RunResult]:
+    """
+    Exécute un lot d'ordres réservés par l'ordonnanceur, comme autant d'appels à
+    POST /transactions/transfer. Chaque échéance a sa clé d'idempotence : un ordre
+    réexécuté après la perte d'un bail ne produit pas de second transfert.
+    """
+    user_ids = list({order["user"].id for order in orders})
+    users = {user.id: user for user in await User.find({"_id": {"$in": user_ids}}).to_list()}
+    semaphore = asyncio.Semaphore(settings.STANDING_ORDER_CONCURRENCY)
+
+    async def execute(order: dict) -> RunResult:
+        user = users.get(order["user"].id)
+        if user is None or user.status != UserStatus.ACTIVE:
+            return RunResult(None, "Utilisateur introuvable ou inactif")
+        transfer_data = TransferCreate(
+            to_account_number=order["to_account_number"],
+            amount=minor_to_float(order["amount"]),
+            description=order.get("description") or "Ordre permanent"
+        )
+        async with semaphore:
+            try:
+                result = await run_idempotent(
+                    user.id, "standing_order", f"{order['_id']}:{order.get('occurrence', 0)}", transfer_data,
+                    lambda: process_transfer(transfer_data, user)
+                )
+            except HTTPException as e:
+                return RunResult(None, str(e.detail))
+            except Exception as e:
+                return RunResult(None, str(e))
+        # Une échéance rejouée renvoie la réponse mémorisée (dict)
+        transaction_id = result["transaction_id"] if isinstance(result, dict) else result.transaction_id
+        return RunResult(transaction_id, None)
+
+    return list(await asyncio.gather(*(execute(order) for order in orders)))
+
+
+@router.post("/standing-orders", response_model=StandingOrderResponse, status_code=status.HTTP_201_CREATED)
+async def create_standing_order(
+        order_data: StandingOrderCreate,
+        current_user: User = Depends(get_current_active_user)
+):
+    """
+        Créer un ordre permanent (transfert répété) depuis le compte de l'utilisateur connecté
+    """
+    sender = await get_user_account_context(current_user)
+    recipient = await get_account_by_number(order_data.to_account_number)
+    if recipient.id == sender.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Impossible de transférer vers le même compte"
+        )
+
+    now = datetime.now(UTC)
+    start_at = as_utc(order_data.start_at) if order_data.start_at else now
+    end_at = as_utc(order_data.end_at) if order_data.end_at else None
+    if start_at < now and (now - start_at).total_seconds() > 60:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La première échéance ne peut pas être dans le passé"
+        )
+    if end_at is not None and end_at < start_at:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La date de fin précède la première échéance"
+        )
+
+    order = StandingOrder(
+        user=current_user,
+        to_account_number=recipient.account_number,
+        amount=to_minor(order_data.amount),
+        description=order_data.description,
+        frequency=order_data.frequency,
+        interval=order_data.interval,
+        start_at=start_at,
+        end_at=end_at,
+        next_run_at=start_at
+    )
+    await order.insert()
+    standing_order_scheduler.schedule(order.id, start_at)
+
+    return standing_order_response(order)
+
+
+@router.get("/standing-orders", response_model=List[StandingOrderResponse])
+async def get_standing_orders(
+        current_user: User = Depends(get_current_active_user)
+):
+    """
+        Récupérer les ordres permanents de l'utilisateur connecté
+    """
+    orders = await StandingOrder.find({"user.$id": current_user.id}).sort("-created_at").to_list()
+    return [standing_order_response(order) for order in orders]
+
+
+@router.get("/standing-orders/{order_id}", response_model=StandingOrderResponse)
+async def get_standing_order(
+        order_id: str,
+        current_user: User = Depends(get_current_active_user)
+):
+    """
+        Récupérer un ordre permanent de l'utilisateur connecté
+    """
+    return standing_order_response(await get_user_standing_order(order_id, current_user))
+
+
+async def set_standing_order_status(order: StandingOrder, update: dict) -> StandingOrder:
+    """
+    Change l'état d'un ordre qui n'est pas en cours d'exécution : un ordre réservé par
+    un worker est refusé (409) plutôt que modifié sous ses pieds.
+    """
+    now = datetime.now(UTC)
+    result = await StandingOrder.get_motor_collection().update_one(
+        {"_id": order.id, "$or": [{"claimed_until": None}, {"claimed_until": {"$lt": now}}]},
+        {"$set": {**update, "updated_at": now}}
+    )
+    if not result.matched_count:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ordre permanent en cours d'exécution, réessayez dans un instant"
+        )
+    return await StandingOrder.get(order.id)
+
+
+@router.post("/standing-orders/{order_id}/pause", response_model=StandingOrderResponse)
+async def pause_standing_order(
+        order_id: str,
+        current_user: User = Depends(get_current_active_user)
+):
+    """
+        Suspendre un ordre permanent actif
+    """
+    order = await get_user_standing_order(order_id, current_user)
+    if order.status != StandingOrderStatus.ACTIVE.value:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Seul un ordre actif peut être suspendu"
+        )
+    order = await set_standing_order_status(order, {"status": StandingOrderStatus.PAUSED.value})
+    return standing_order_response(order)
+
+
+@router.post("/standing-orders/{order_id}/resume", response_model=StandingOrderResponse)
+async def resume_standing_order(
+        order_id: str,
+        current_user: User = Depends(get_current_active_user)
+):
+    """
+        Reprendre un ordre permanent suspendu ; les échéances passées entre-temps ne sont pas rattrapées
+    """
+    order = await get_user_standing_order(order_id, current_user)
+    if order.status != StandingOrderStatus.PAUSED.value:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Seul un ordre suspendu peut être repris"
+        )
+
+    now = datetime.now(UTC)
+    occurrence, next_run_at = order.occurrence, as_utc(order.next_run_at)
+    if next_run_at <= now:
+        occurrence, next_run_at = next_occurrence(
+            as_utc(order.start_at), order.frequency, order.interval, order.occurrence, now
+        )
+    update = {
+        "status": StandingOrderStatus.ACTIVE.value,
+        "occurrence": occurrence,
+        "next_run_at": next_run_at,
+        "consecutive_failures": 0,
+    }
+    if order.end_at is not None and next_run_at > as_utc(order.end_at):
+        update.update(status=StandingOrderStatus.COMPLETED.value, next_run_at=None)
+
+    order = await set_standing_order_status(order, update)
+    if order.status == StandingOrderStatus.ACTIVE.value:
+        standing_order_scheduler.schedule(order.id, next_run_at)
+    return standing_order_response(order)
+
+
+@router.delete("/standing-orders/{order_id}", response_model=StandingOrderResponse)
+async def cancel_standing_order(
+        order_id: str,
+        current_user: User = Depends(get_current_active_user)
+):
+    """
+        Annuler un ordre permanent (définitif)
+    """
+    order = await get_user_standing_order(order_id, current_user)
+    if order.status in (StandingOrderStatus.CANCELLED.value, StandingOrderStatus.COMPLETED.value):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cet ordre permanent est déjà terminé"
+        )
+    order = await set_standing_order_status(
+        order, {"status": StandingOrderStatus.CANCELLED.value, "next_run_at": None}
+    )
+    return standing_order_response(order)
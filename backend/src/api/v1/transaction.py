@@ -1,21 +1,39 @@
-import asyncio
 import logging
-import uuid
 from datetime import datetime, UTC
-from typing import List, Optional, Tuple
-from decimal import Decimal, getcontext
+from enum import Enum
+from collections import defaultdict
+from typing import Dict, List, NoReturn, Optional, Tuple
+from decimal import Decimal
 
-import httpx
+import numpy as np
 from beanie import PydanticObjectId
-from fastapi import APIRouter, Depends, Query, HTTPException, status, BackgroundTasks
-from pydantic import BaseModel, field_validator
-from src.api.v1.auth import get_current_active_user
-from src.models.user import User
-from src.models.banking import Account, Transaction, TransactionType, TransactionStatus, Currency, ExchangeRate
+from fastapi import APIRouter, Depends, Query, HTTPException, status, Header, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, field_validator
+from src.api.v1.auth import get_current_active_user, check_user_role
+from src.models.user import User, UserRole
+from src.models.banking import Account, Transaction, TransactionType, TransactionStatus, Currency
+from src.utils.balance import debit_account, credit_account, credit_accounts, by_user, by_id
+from src.utils.transfer import run_in_transaction, transfer_metrics
+from src.utils.group_commit import transaction_inserts
+from src.utils.account_cache import AccountContext, account_cache
+from src.utils.anomaly import anomaly_scorer
+from src.utils.categories import categorize
+from src.utils.standing_orders import standing_order_scheduler
+from src.utils.live_events import live_events
+from src.utils.transfer_limits import TransferLimits, limits_for, reserve_transfers, release_transfers
+from src.utils.idempotency import run_idempotent, complete_in_transaction
+from src.utils.ids import ids
+from src.utils.exchange import exchange_rate_cache
+from src.utils.pagination import CURSOR_HEADER, encode_cursor, keyset_after
+from src.utils.ledger import post_entry, post_entries, deposit_legs, withdrawal_legs, transfer_legs
+from src.utils.export import stream_csv, stream_ndjson
+from src.utils.archive import find_page, find_ascending
+from src.utils.rollups import rollup_increment, record_rollups
+from src.utils.money import to_minor, minor_to_float, convert_minor, validate_money_amount
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
-getcontext().prec = 6
 
 class TransactionResponse(BaseModel):
     id: PydanticObjectId
@@ -25,11 +43,43 @@ class TransactionResponse(BaseModel):
     amount: float
     currency: str
     description: str
+    category: Optional[str] = None
     status: str
     recipient_name: Optional[str] = None
     recipient_account_number: Optional[str] = None
     transaction_date: datetime
 
+TRANSACTION_PROJECTION = {
+    "transaction_id": 1,
+    "transaction_type": 1,
+    "amount": 1,
+    "currency": 1,
+    "description": 1,
+    "category": 1,
+    "status": 1,
+    "recipient_name": 1,
+    "recipient_account_number": 1,
+    "transaction_date": 1,
+}
+
+
+def transaction_response_from_raw(document: dict, account_id: str) -> TransactionResponse:
+    """Construit la réponse directement depuis un document brut projeté"""
+    return TransactionResponse(
+        id=document["_id"],
+        transaction_id=document["transaction_id"],
+        account_id=account_id,
+        transaction_type=document["transaction_type"],
+        amount=minor_to_float(document["amount"]),
+        currency=document["currency"],
+        description=document["description"],
+        category=document.get("category"),
+        status=document["status"],
+        recipient_name=document.get("recipient_name"),
+        recipient_account_number=document.get("recipient_account_number"),
+        transaction_date=document["transaction_date"]
+    )
+
 class DepositRequest(BaseModel):
     amount: float
     description: str = "Deposit"
@@ -37,9 +87,7 @@ class DepositRequest(BaseModel):
     @field_validator('amount')
     @classmethod
     def validate_amount(cls, v: float) -> float:
-        if v <= 0:
-            raise ValueError('Amount must be greater than zero')
-        return v
+        return validate_money_amount(v)
 
 class WithdrawalRequest(BaseModel):
     amount: float
@@ -48,9 +96,7 @@ class WithdrawalRequest(BaseModel):
     @field_validator('amount')
     @classmethod
     def validate_amount(cls, v: float) -> float:
-        if v <= 0:
-            raise ValueError('Amount must be greater than zero')
-        return v
+        return validate_money_amount(v)
 
 class TransferCreate(BaseModel):
     to_account_number: str
@@ -60,9 +106,46 @@ class TransferCreate(BaseModel):
     @field_validator('amount')
     @classmethod
     def validate_amount(cls, v: float) -> float:
-        if v <= 0:
-            raise ValueError('Amount must be greater than zero')
-        return v
+        return validate_money_amount(v)
+
+
+MAX_BATCH_TRANSFERS = 1000
+
+
+class BatchTransferLine(BaseModel):
+    to_account_number: str
+    amount: float
+    description: Optional[str] = None
+
+    @field_validator('amount')
+    @classmethod
+    def validate_amount(cls, v: float) -> float:
+        return validate_money_amount(v)
+
+
+class BatchTransferRequest(BaseModel):
+    items: List[BatchTransferLine] = Field(..., min_length=1, max_length=MAX_BATCH_TRANSFERS)
+    description: str = ""
+
+
+class BatchTransferLineResult(BaseModel):
+    index: int
+    to_account_number: str
+    amount: float
+    status: str  # "completed" ou "rejected"
+    transaction_id: Optional[str] = None
+    converted_amount: Optional[float] = None
+    currency: Optional[str] = None
+    detail: Optional[str] = None
+
+
+class BatchTransferResponse(BaseModel):
+    account_id: str
+    currency: str
+    total_debited: float
+    completed: int
+    rejected: int
+    results: List[BatchTransferLineResult]
 
 
 class ConversionRequest(BaseModel):
@@ -77,6 +160,15 @@ class ConversionRequest(BaseModel):
             raise ValueError('Amount must be greater than zero')
         return v
 
+MAX_BATCH_CONVERSIONS = 10000
+EXPORT_BATCH_SIZE = 1000
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
 class ConversionResponse(BaseModel):
     from_currency: str
     to_currency: str
@@ -86,14 +178,36 @@ class ConversionResponse(BaseModel):
     date: datetime
 
 
-async def get_user_account(user: User) -> Account:
-    """Récupère le compte bancaire unique d'un utilisateur"""
+def ensure_banking_enabled(user: User) -> None:
+    """Vérifie que l'application bancaire est activée pour l'utilisateur"""
     if not user.uses_banking_app:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Banking app is not enabled for this user"
         )
 
+
+class BatchConversionRequest(BaseModel):
+    items: List[ConversionRequest] = Field(..., min_length=1, max_length=MAX_BATCH_CONVERSIONS)
+
+
+class BatchConversionItem(BaseModel):
+    from_currency: str
+    to_currency: str
+    amount: float
+    converted_amount: float
+    exchange_rate: float
+
+
+class BatchConversionResponse(BaseModel):
+    rates_date: Optional[datetime] = None
+    results: List[BatchConversionItem]
+
+
+async def get_user_account(user: User) -> Account:
+    """Récupère le compte bancaire unique d'un utilisateur (lecture en base, solde à jour)"""
+    ensure_banking_enabled(user)
+
     account = await Account.find_one({"user.$id": user.id})
     if not account:
         raise HTTPException(
@@ -104,9 +218,23 @@ async def get_user_account(user: User) -> Account:
     return account
 
 
-async def get_account_by_number(account_number: str) -> Account:
-    """Récupère un compte bancaire par son numéro de compte"""
-    account = await Account.find_one({"account_number": account_number})
+async def get_user_account_context(user: User) -> AccountContext:
+    """Métadonnées du compte d'un utilisateur, depuis le cache du worker si possible"""
+    ensure_banking_enabled(user)
+
+    account = await account_cache.by_user(user)
+    if not account:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Account not found for this user"
+        )
+
+    return account
+
+
+async def get_account_by_number(account_number: str) -> AccountContext:
+    """Récupère les métadonnées d'un compte par son numéro (cache du worker)"""
+    account = await account_cache.by_number(account_number)
     if not account:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -115,72 +243,103 @@ async def get_account_by_number(account_number: str) -> Account:
     return account
 
 
+async def raise_account_update_failure(query: dict, amount: Optional[int] = None, session=None) -> NoReturn:
+    """
+    Explique pourquoi une mise à jour atomique du solde n'a rien modifié
+    (`amount` en centièmes, comme `Account.balance`).
+    Appelé uniquement sur le chemin d'échec, le chemin nominal ne lit jamais le compte.
+    Dans une transaction, `session` fait lire le compte tel que la transaction le voit.
+    """
+    account = await Account.find_one(query, session=session)
+    if not account:
+        if "user.$id" in query:
+            account_cache.invalidate(user_id=query["user.$id"])
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Account not found for this user"
+        )
+    if not account.is_active:
+        account_cache.invalidate(account_id=account.id)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Account is inactive"
+        )
+    if amount is not None and account.balance < amount:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Insufficient funds"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Account was modified concurrently, please retry"
+    )
+
+
 async def get_exchange_rate(from_currency: Currency, to_currency: Currency) -> Decimal:
-    """Récupère le taux de change entre deux devises"""
+    """Récupère le taux de change entre deux devises (cache mémoire du processus)"""
+    # Les documents (use_enum_values) exposent la devise sous forme de chaîne
+    from_currency, to_currency = Currency(from_currency), Currency(to_currency)
     if from_currency == to_currency:
         return Decimal(1)
 
-    rates = await ExchangeRate.find_one({})
-    if not rates:
-        # Si les taux n'existent pas, essayons de les récupérer d'abord
-        await update_exchange_rates()
-
-        # Réessayons de récupérer les taux
-        rates = await ExchangeRate.find_one({})
-        if not rates:
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Exchange rates not available"
-            )
+    matrix = await exchange_rate_cache.get_matrix()
+    if not matrix:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Exchange rates not available"
+        )
 
-    if to_currency.value not in rates.rates:
+    if from_currency.value not in matrix or to_currency.value not in matrix:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Conversion from {from_currency} to {to_currency} not supported"
         )
 
-    return Decimal(str(rates.rates[to_currency.value]))
+    return Decimal(str(matrix.rate(from_currency.value, to_currency.value)))
 
 
-async def update_exchange_rates():
-    """Met à jour les taux de change depuis une API externe"""
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get("https://api.exchangerate-api.com/v4/latest/USD")
-            data = response.json()
-
-            await ExchangeRate.find_one().upsert(
-                {"$set": {
-                    "rates": data["rates"],
-                    "last_updated": datetime.now(UTC)
-                }},
-                on_insert=ExchangeRate(
-                    base_currency=Currency.USD,
-                    rates=data["rates"],
-                    last_updated=datetime.now(UTC)
-                )
-            )
-    except Exception as e:
-        logger.error(f"Erreur lors de la mise à jour des taux: {str(e)}")
+async def get_transfer_limits(account: AccountContext) -> TransferLimits:
+    """Plafonds de transfert du niveau du compte, dans la devise du compte"""
+    return limits_for(account.tier, await get_exchange_rate(Currency.USD, account.currency))
 
 
-@router.get("/transactions", response_model=List[TransactionResponse])
-async def get_transactions(
-        transaction_type: Optional[TransactionType] = None,
-        start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None,
-        limit: int = Query(20, gt=0, le=100),
-        offset: int = Query(0, ge=0),
-        current_user: User = Depends(get_current_active_user)
-):
-    """Get transactions for the current user"""
-    account = await get_user_account(current_user)
+async def enforce_transfer_limits(
+        account: AccountContext,
+        limits: TransferLimits,
+        legs: List[Tuple[PydanticObjectId, int]],
+        now: datetime,
+        session=None
+) -> None:
+    """
+    Refuse les transferts hors plafonds, sinon les impute aux compteurs glissants.
+    Sans transaction, l'appelant retire l'imputation (release_transfers) si le transfert échoue.
+    """
+    violation = await reserve_transfers(account.id, limits, legs, now, session=session)
+    if violation:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=violation
+        )
+
+
+def build_transaction_query(
+        account: AccountContext,
+        transaction_type: Optional[TransactionType],
+        start_date: Optional[datetime],
+        end_date: Optional[datetime]
+) -> dict:
+    """Filtre Mongo de l'historique d'un compte (type et plage de dates optionnels)"""
+    if end_date and start_date and end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La date de fin doit être postérieure à la date de début"
+        )
 
     # Modified query to work with DBRef format
     query = {"account.$id": account.id}
 
     if transaction_type:
-        query["transaction_type"] = transaction_type
+        query["transaction_type"] = transaction_type.value
 
     date_filter = {}
     if start_date:
@@ -190,154 +349,237 @@ async def get_transactions(
     if date_filter:
         query["transaction_date"] = date_filter
 
-    if end_date and start_date and end_date < start_date:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="La date de fin doit être postérieure à la date de début"
-        )
-
-    # Debug: Print the query being used
-    print(f"Transaction query: {query}")
-
-    sort_expression: List[Tuple[str, int]] = [("transaction_date", -1)]
-    transactions = await Transaction.find(query).sort(sort_expression).skip(offset).limit(limit).to_list()
-
-    # Debug: Print number of transactions found
-    print(f"Found {len(transactions)} transactions")
-
-
-    transactions_response = []
-    for transaction in transactions:
-        transaction_account = await transaction.account.fetch()
-        response_data = {
-            "id": transaction.id,
-            "transaction_id": transaction.transaction_id,
-            "account_id": str(transaction_account.id),
-            "transaction_type": transaction.transaction_type,
-            "amount": transaction.amount,
-            "currency": transaction.currency,
-            "description": transaction.description,
-            "status": transaction.status,
-            "transaction_date": transaction.transaction_date
-        }
+    return query
 
-        if transaction.recipient_name:
-            response_data["recipient_name"] = transaction.recipient_name
-        if transaction.recipient_account_number:
-            response_data["recipient_account_number"] = transaction.recipient_account_number
 
-        transactions_response.append(TransactionResponse(**response_data))
+@router.get("/transactions", response_model=List[TransactionResponse])
+async def get_transactions(
+        response: Response,
+        transaction_type: Optional[TransactionType] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        limit: int = Query(20, gt=0, le=100),
+        offset: int = Query(0, ge=0),
+        cursor: Optional[str] = Query(None, description="Curseur opaque renvoyé dans l'en-tête X-Next-Cursor"),
+        current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get transactions for the current user
+
+    Pagination par curseur (keyset) : passer la valeur de l'en-tête X-Next-Cursor
+    de la page précédente dans `cursor`. `offset` reste accepté pour compatibilité.
+    """
+    account = await get_user_account_context(current_user)
+    query = build_transaction_query(account, transaction_type, start_date, end_date)
+
+    if cursor:
+        query = {"$and": [query, keyset_after(cursor, "transaction_date")]}
+        offset = 0
+
+    # Lecture brute avec projection : tous les documents appartiennent au compte
+    # déjà chargé, aucune résolution du lien `account` n'est nécessaire.
+    # Les transactions archivées ne sont lues que si la page dépasse les récentes.
+    documents = await find_page(query, TRANSACTION_PROJECTION, offset, limit)
+
+    account_id = str(account.id)
+    transactions_response = [
+        transaction_response_from_raw(document, account_id)
+        for document in documents
+    ]
+
+    if len(transactions_response) == limit:
+        last = transactions_response[-1]
+        response.headers[CURSOR_HEADER] = encode_cursor(last.transaction_date, last.id)
 
     return transactions_response
 
 
 
+@router.get("/transactions/export")
+async def export_transactions(
+        format: ExportFormat = ExportFormat.CSV,
+        transaction_type: Optional[TransactionType] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        current_user: User = Depends(get_current_active_user)
+):
+    """
+    Exporte l'historique complet du compte (relevé) en CSV ou NDJSON.
+    Les lignes sont lues d'un curseur Motor et envoyées par morceaux : mémoire constante.
+    """
+    account = await get_user_account_context(current_user)
+    query = build_transaction_query(account, transaction_type, start_date, end_date)
+
+    # Transactions archivées puis récentes, dans l'ordre chronologique
+    raw_cursor = find_ascending(query, TRANSACTION_PROJECTION, EXPORT_BATCH_SIZE)
+
+    filename = f"transactions_{account.account_number}_{datetime.now(UTC):%Y%m%d}.{format.value}"
+    if format == ExportFormat.NDJSON:
+        content, media_type = stream_ndjson(raw_cursor), "application/x-ndjson"
+    else:
+        content, media_type = stream_csv(raw_cursor), "text/csv; charset=utf-8"
+
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.post("/transactions/deposit", response_model=TransactionResponse)
 async def deposit_money(
         deposit_data: DepositRequest,
+        response: Response,
+        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
         current_user: User = Depends(get_current_active_user)
 ):
     """Deposit money into an account"""
-    account: Account = await get_user_account(current_user)
-
-    transaction_id = f"DEP{uuid.uuid4().hex[:12].upper()}"
-    now = datetime.now(UTC)
-
-    transaction = Transaction(
-        transaction_id=transaction_id,
-        account=account,
-        transaction_type=TransactionType.DEPOSIT,
-        amount=deposit_data.amount,
-        currency=account.currency,
-        description=deposit_data.description,
-        status=TransactionStatus.COMPLETED,
-        transaction_date=now
+    return await run_idempotent(
+        current_user.id, "deposit", idempotency_key, deposit_data,
+        lambda: process_deposit(deposit_data, current_user), response
     )
 
-    await transaction.insert()
 
-    # Mise à jour du solde
-    account.balance += deposit_data.amount
-    account.last_transaction = now
-    account.updated_at = now
-    await account.save()
+async def process_deposit(deposit_data: DepositRequest, current_user: User) -> TransactionResponse:
+    """Crédite le compte de l'utilisateur et enregistre la transaction"""
+    ensure_banking_enabled(current_user)
+    amount = to_minor(deposit_data.amount)
 
-    return TransactionResponse(
-        id=transaction.id,
-        transaction_id=transaction.transaction_id,
-        account_id=str(account.id),
-        transaction_type=transaction.transaction_type,
-        amount=transaction.amount,
-        currency=transaction.currency,
-        description=transaction.description,
-        status=transaction.status,
-        transaction_date=transaction.transaction_date
-    )
+    async def deposit_entry(session) -> TransactionResponse:
+        now = datetime.now(UTC)
+
+        # Crédit atomique côté serveur, sans lecture préalable du compte
+        account = await credit_account(by_user(current_user.id), amount, now, session=session)
+        if not account:
+            await raise_account_update_failure(by_user(current_user.id), session=session)
+
+        transaction = Transaction(
+            transaction_id=ids.next_id(),
+            account=account,
+            transaction_type=TransactionType.DEPOSIT,
+            amount=amount,
+            currency=account.currency,
+            description=deposit_data.description,
+            category=categorize(deposit_data.description, TransactionType.DEPOSIT.value),
+            status=TransactionStatus.COMPLETED,
+            transaction_date=now
+        )
+
+        await transaction_inserts.insert(transaction, session=session)
+        await post_entry(
+            deposit_legs(account.id, amount, account.currency),
+            transaction.transaction_id, now, session=session
+        )
+        await record_rollups(
+            [rollup_increment(account.id, account.currency, transaction.transaction_type, transaction.amount, now)],
+            session=session
+        )
+
+        result = TransactionResponse(
+            id=transaction.id,
+            transaction_id=transaction.transaction_id,
+            account_id=str(account.id),
+            transaction_type=transaction.transaction_type,
+            amount=minor_to_float(transaction.amount),
+            currency=transaction.currency,
+            description=transaction.description,
+            category=transaction.category,
+            status=transaction.status,
+            transaction_date=transaction.transaction_date
+        )
+        # Réponse de la clé d'idempotence validée par le même commit que le mouvement
+        await complete_in_transaction(result, session)
+        return result
+
+    return await run_in_transaction(deposit_entry)
 
 
 @router.post("/transactions/withdrawal", response_model=TransactionResponse)
 async def withdraw_money(
         withdrawal_data: WithdrawalRequest,
+        response: Response,
+        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
         current_user: User = Depends(get_current_active_user)
 ):
     """Withdraw money from an account"""
-    account: Account = await get_user_account(current_user)
-    if account.balance < withdrawal_data.amount:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Insufficient funds"
-        )
-
-    transaction_id = f"WIT{uuid.uuid4().hex[:12].upper()}"
-    now = datetime.now(UTC)
-
-    transaction = Transaction(
-        transaction_id=transaction_id,
-        account=account,
-        transaction_type=TransactionType.WITHDRAWAL,
-        amount=-withdrawal_data.amount,  # Montant négatif pour un retrait
-        currency=account.currency,
-        description=withdrawal_data.description,
-        status=TransactionStatus.COMPLETED,
-        transaction_date=now
+    return await run_idempotent(
+        current_user.id, "withdrawal", idempotency_key, withdrawal_data,
+        lambda: process_withdrawal(withdrawal_data, current_user), response
     )
 
-    await transaction.insert()
 
-    # Mise à jour du solde
-    account.balance -= withdrawal_data.amount
-    account.last_transaction = now
-    account.updated_at = now
-    await account.save()
+async def process_withdrawal(withdrawal_data: WithdrawalRequest, current_user: User) -> TransactionResponse:
+    """Débite le compte de l'utilisateur et enregistre la transaction"""
+    ensure_banking_enabled(current_user)
+    amount = to_minor(withdrawal_data.amount)
 
-    return TransactionResponse(
-        id=transaction.id,
-        transaction_id=transaction.transaction_id,
-        account_id=str(account.id),
-        transaction_type=transaction.transaction_type,
-        amount=transaction.amount,
-        currency=transaction.currency,
-        description=transaction.description,
-        status=transaction.status,
-        transaction_date=transaction.transaction_date
-    )
+    async def withdrawal_entry(session) -> TransactionResponse:
+        now = datetime.now(UTC)
+
+        # Débit conditionnel (balance >= amount) appliqué en un seul aller-retour
+        account = await debit_account(by_user(current_user.id), amount, now, session=session)
+        if not account:
+            await raise_account_update_failure(by_user(current_user.id), amount, session=session)
+
+        transaction = Transaction(
+            transaction_id=ids.next_id(),
+            account=account,
+            transaction_type=TransactionType.WITHDRAWAL,
+            amount=-amount,  # Montant négatif pour un retrait
+            currency=account.currency,
+            description=withdrawal_data.description,
+            category=categorize(withdrawal_data.description, TransactionType.WITHDRAWAL.value),
+            status=TransactionStatus.COMPLETED,
+            transaction_date=now
+        )
+
+        await transaction_inserts.insert(transaction, session=session)
+        await post_entry(
+            withdrawal_legs(account.id, amount, account.currency),
+            transaction.transaction_id, now, session=session
+        )
+        await record_rollups(
+            [rollup_increment(account.id, account.currency, transaction.transaction_type, transaction.amount, now)],
+            session=session
+        )
+
+        result = TransactionResponse(
+            id=transaction.id,
+            transaction_id=transaction.transaction_id,
+            account_id=str(account.id),
+            transaction_type=transaction.transaction_type,
+            amount=minor_to_float(transaction.amount),
+            currency=transaction.currency,
+            description=transaction.description,
+            category=transaction.category,
+            status=transaction.status,
+            transaction_date=transaction.transaction_date
+        )
+        # Réponse de la clé d'idempotence validée par le même commit que le mouvement
+        await complete_in_transaction(result, session)
+        return result
+
+    return await run_in_transaction(withdrawal_entry)
 
 @router.post("/transactions/transfer", response_model=TransactionResponse)
 async def create_transfer(
         transfer_data: TransferCreate,
+        response: Response,
+        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
         current_user: User = Depends(get_current_active_user)
 ):
-
     """Create a transfer between accounts"""
-    try:
-        from_account = await get_user_account(current_user)
-        amount = Decimal(str(transfer_data.amount))
+    return await run_idempotent(
+        current_user.id, "transfer", idempotency_key, transfer_data,
+        lambda: process_transfer(transfer_data, current_user), response
+    )
 
-        if from_account.balance < amount:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Solde insuffisant"
-            )
+
+async def process_transfer(transfer_data: TransferCreate, current_user: User) -> TransactionResponse:
+    """Exécute un transfert entre deux comptes"""
+    try:
+        ensure_banking_enabled(current_user)
+        amount = to_minor(transfer_data.amount)
 
         # Récupère le compte destinataire via son numéro de compte
         to_account = await get_account_by_number(transfer_data.to_account_number)
@@ -349,93 +591,379 @@ async def create_transfer(
             )
 
         # Vérifie qu'il ne s'agit pas d'un transfert vers soi-même
-        if from_account.id == to_account.id:
+        if to_account.user_id == current_user.id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Impossible de transférer vers le même compte"
             )
 
-        exchange_rate = Decimal(1)
-        converted_amount = amount
+        to_account_link = Account.link_from_id(to_account.id)
+        description = transfer_data.description or "Transfert"
+        sender = await get_user_account_context(current_user)
+        limits = await get_transfer_limits(sender)
+        legs = [(to_account.id, amount)]
+        # Score calculé en mémoire sur les derniers transferts du compte ; signale sans bloquer
+        anomaly_score = await anomaly_scorer.score(sender.id, amount)
+        flagged = anomaly_scorer.is_anomalous(anomaly_score)
+
+        async def transfer_entry(session) -> TransactionResponse:
+            # Rejoué intégralement en cas d'erreur transitoire : tout est recalculé ici
+            now = datetime.now(UTC)
+
+            # Plafonds et vélocité évalués et imputés sur les compteurs glissants, avant tout débit
+            await enforce_transfer_limits(sender, limits, legs, now, session=session)
+
+            from_account = None
+            try:
+                # Débit conditionnel du compte émetteur : aucune lecture préalable du solde
+                from_account = await debit_account(by_user(current_user.id), amount, now, session=session)
+                if not from_account:
+                    await raise_account_update_failure(by_user(current_user.id), amount, session=session)
+
+                converted_amount = amount
+                if from_account.currency != to_account.currency:
+                    exchange_rate = await get_exchange_rate(from_account.currency, to_account.currency)
+                    converted_amount = convert_minor(amount, exchange_rate)
+
+                credited = await credit_account(by_id(to_account.id), converted_amount, now, session=session)
+                if not credited:
+                    account_cache.invalidate(account_id=to_account.id)
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="Le compte destinataire est inactif"
+                    )
+            except Exception:
+                # Sans transaction (serveur autonome), rien n'annule le débit ni l'imputation aux plafonds
+                if session is None:
+                    if from_account:
+                        await credit_account(by_id(from_account.id), amount, now)
+                    await release_transfers(sender.id, legs, now)
+                raise
+
+            sender_transaction = Transaction(
+                transaction_id=ids.next_id(),
+                account=from_account,
+                transaction_type=TransactionType.TRANSFER,
+                amount=-amount,
+                currency=from_account.currency,
+                description=description,
+                category=categorize(description, TransactionType.TRANSFER.value),
+                status=TransactionStatus.COMPLETED,
+                recipient_account=to_account_link,
+                recipient_name=to_account.holder_name,
+                recipient_account_number=to_account.account_number,
+                anomaly_score=anomaly_score,
+                flagged=flagged,
+                transaction_date=now
+            )
+
+            # Création de la transaction pour le destinataire
+            recipient_transaction = Transaction(
+                transaction_id=ids.next_id(),
+                account=to_account_link,
+                transaction_type=TransactionType.DEPOSIT,
+                amount=converted_amount,  # Montant positif pour le destinataire
+                currency=to_account.currency,
+                description=description,
+                category=categorize(description, TransactionType.DEPOSIT.value),
+                status=TransactionStatus.COMPLETED,
+                transaction_date=now
+            )
 
-        if from_account.currency != to_account.currency:
-            exchange_rate = await get_exchange_rate(from_account.currency, to_account.currency)
-            converted_amount = amount * exchange_rate
+            await transaction_inserts.insert_many([sender_transaction, recipient_transaction], session=session)
+            await post_entry(
+                transfer_legs(
+                    from_account.id, from_account.currency, amount,
+                    to_account.id, to_account.currency, converted_amount
+                ),
+                sender_transaction.transaction_id, now, session=session
+            )
+            await record_rollups([
+                rollup_increment(
+                    from_account.id, from_account.currency,
+                    sender_transaction.transaction_type, sender_transaction.amount, now
+                ),
+                rollup_increment(
+                    to_account.id, to_account.currency,
+                    recipient_transaction.transaction_type, recipient_transaction.amount, now
+                ),
+            ], session=session)
+
+            result = TransactionResponse(
+                id=sender_transaction.id,
+                transaction_id=sender_transaction.transaction_id,
+                account_id=str(from_account.id),
+                transaction_type=sender_transaction.transaction_type,
+                amount=minor_to_float(sender_transaction.amount),
+                currency=sender_transaction.currency,
+                description=sender_transaction.description,
+                category=sender_transaction.category,
+                status=sender_transaction.status,
+                transaction_date=sender_transaction.transaction_date,
+                recipient_name=sender_transaction.recipient_name,
+                recipient_account_number=sender_transaction.recipient_account_number
+            )
+            await complete_in_transaction(result, session)
+            return result
+
+        result = await run_in_transaction(transfer_entry)
+        anomaly_scorer.observe(sender.id, result.transaction_id, amount, result.transaction_date)
+        if flagged:
+            logger.warning(
+                f"Transfert inhabituel {result.transaction_id} "
+                f"(compte {sender.id}, score {anomaly_score:.2f})"
+            )
+        return result
 
-        to_account_user = await to_account.user.fetch()
-        now = datetime.now(UTC)
-        sender_transaction_id = f"TRN{uuid.uuid4().hex[:12].upper()}"
-        recipient_transaction_id = f"TRN{uuid.uuid4().hex[:12].upper()}"
-
-        sender_transaction = Transaction(
-            transaction_id=sender_transaction_id,
-            account=from_account,
-            transaction_type=TransactionType.TRANSFER,
-            amount=-float(amount),
-            currency=from_account.currency,
-            description=transfer_data.description or "Transfert",
-            status=TransactionStatus.COMPLETED,
-            recipient_account=to_account,
-            recipient_name=to_account_user.full_name,
-            recipient_account_number=to_account.account_number,
-            transaction_date=now
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors du transfert: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Une erreur est survenue lors du transfert"
         )
 
-        # Création de la transaction pour le destinataire
-        recipient_transaction = Transaction(
-            transaction_id=recipient_transaction_id,
-            account=to_account,
-            transaction_type=TransactionType.DEPOSIT,
-            amount=float(converted_amount),  # Montant positif pour le destinataire
-            currency=to_account.currency,
-            description=transfer_data.description or "Transfert",
-            status=TransactionStatus.COMPLETED,
-            transaction_date=now
-        )
 
-        from_account.balance -= float(amount)
-        from_account.last_transaction = now
-        from_account.updated_at = now
+@router.post("/transactions/transfer/batch", response_model=BatchTransferResponse)
+async def create_batch_transfer(
+        batch_data: BatchTransferRequest,
+        response: Response,
+        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+        current_user: User = Depends(get_current_active_user)
+):
+    """Exécute plusieurs transferts (ex. paie) depuis le compte de l'utilisateur, en un seul débit"""
+    return await run_idempotent(
+        current_user.id, "transfer_batch", idempotency_key, batch_data,
+        lambda: process_batch_transfer(batch_data, current_user), response
+    )
 
-        to_account.balance += float(converted_amount)
-        to_account.last_transaction = now
-        to_account.updated_at = now
 
-        await asyncio.gather(
-            sender_transaction.insert(),
-            recipient_transaction.insert(),
-            from_account.save(),
-            to_account.save()
-        )
+async def process_batch_transfer(batch_data: BatchTransferRequest, current_user: User) -> BatchTransferResponse:
+    """
+    Valide tous les destinataires en une requête `$in`, débite le total une seule fois,
+    crédite par `bulk_write` et insère transactions et écritures par `insert_many`, le
+    tout dans une même transaction. Les lignes invalides sont rejetées individuellement.
+    """
+    try:
+        ensure_banking_enabled(current_user)
+        lines = batch_data.items
+
+        numbers = list({line.to_account_number for line in lines})
+        recipients = {
+            document["account_number"]: document
+            async for document in Account.get_motor_collection().find(
+                {"account_number": {"$in": numbers}},
+                {"account_number": 1, "currency": 1, "is_active": 1, "user": 1}
+            )
+        }
+        names = {
+            document["_id"]: document.get("full_name")
+            async for document in User.get_motor_collection().find(
+                {"_id": {"$in": list({recipient["user"].id for recipient in recipients.values()})}},
+                {"full_name": 1}
+            )
+        }
 
-        return TransactionResponse(
-            id=sender_transaction.id,
-            transaction_id=sender_transaction.transaction_id,
-            account_id=str(from_account.id),
-            transaction_type=sender_transaction.transaction_type,
-            amount=sender_transaction.amount,
-            currency=sender_transaction.currency,
-            description=sender_transaction.description,
-            status=sender_transaction.status,
-            transaction_date=sender_transaction.transaction_date,
-            recipient_name=sender_transaction.recipient_name,
-            recipient_account_number=sender_transaction.recipient_account_number
-        )
+        sender = await get_user_account_context(current_user)
+        limits = await get_transfer_limits(sender)
+
+        results: List[BatchTransferLineResult] = []
+        accepted: List[Tuple[int, dict, int]] = []  # (ligne, compte destinataire, montant en centièmes)
+        for index, line in enumerate(lines):
+            recipient = recipients.get(line.to_account_number)
+            amount = to_minor(line.amount)
+            detail = None
+            if recipient is None:
+                detail = "Recipient account not found"
+            elif not recipient["is_active"]:
+                detail = "Le compte destinataire est inactif"
+            elif recipient["user"].id == current_user.id:
+                detail = "Impossible de transférer vers le même compte"
+            elif amount > limits.single:
+                # Plafond par transfert : la ligne seule est rejetée ; les plafonds cumulés
+                # (24 h, 30 jours, vélocité) portent sur tout le lot
+                detail = "Montant maximal par transfert dépassé"
+            else:
+                accepted.append((index, recipient, amount))
+            results.append(BatchTransferLineResult(
+                index=index,
+                to_account_number=line.to_account_number,
+                amount=line.amount,
+                status="rejected" if detail else "completed",
+                detail=detail
+            ))
+
+        async def batch_entry(session) -> BatchTransferResponse:
+            # Rejoué intégralement en cas d'erreur transitoire : tout est recalculé ici
+            now = datetime.now(UTC)
+            total = sum(amount for _, _, amount in accepted)
+            legs = [(recipient["_id"], amount) for _, recipient, amount in accepted]
+            await enforce_transfer_limits(sender, limits, legs, now, session=session)
+
+            from_account = None
+            try:
+                from_account = await debit_account(by_user(current_user.id), total, now, session=session)
+                if not from_account:
+                    await raise_account_update_failure(by_user(current_user.id), total, session=session)
+
+                rates = {
+                    currency: await get_exchange_rate(from_account.currency, currency)
+                    for currency in {recipient["currency"] for _, recipient, _ in accepted}
+                }
+                converted = [convert_minor(amount, rates[recipient["currency"]]) for _, recipient, amount in accepted]
+
+                credits: Dict[PydanticObjectId, int] = defaultdict(int)
+                for (_, recipient, _), converted_amount in zip(accepted, converted):
+                    credits[recipient["_id"]] += converted_amount
+                not_credited = await credit_accounts(credits, now, session=session)
+                for account_id in not_credited:
+                    account_cache.invalidate(account_id=account_id)
+            except Exception:
+                # Sans transaction (serveur autonome), rien n'annule le débit ni l'imputation aux plafonds
+                if session is None:
+                    if from_account:
+                        await credit_account(by_id(from_account.id), total, now)
+                    await release_transfers(sender.id, legs, now)
+                raise
+
+            # Destinataire désactivé entre la validation et l'écriture : ses lignes sont remboursées
+            # et retirées des plafonds
+            refund = sum(amount for _, recipient, amount in accepted if recipient["_id"] in not_credited)
+            if refund:
+                await credit_account(by_id(from_account.id), refund, now, session=session)
+                await release_transfers(
+                    sender.id, [leg for leg in legs if leg[0] in not_credited], now, session=session
+                )
+
+            completed: Dict[int, Tuple[str, int]] = {}
+            transactions = []
+            entries = []
+            sender_total = 0
+            received: Dict[PydanticObjectId, List[int]] = defaultdict(list)
+            currencies: Dict[PydanticObjectId, str] = {}
+            for (index, recipient, amount), converted_amount in zip(accepted, converted):
+                if recipient["_id"] in not_credited:
+                    continue
+                line = lines[index]
+                description = line.description or batch_data.description or "Transfert"
+                transaction_id = ids.next_id()
+                completed[index] = (transaction_id, converted_amount)
+                sender_total += amount
+                received[recipient["_id"]].append(converted_amount)
+                currencies[recipient["_id"]] = recipient["currency"]
+
+                transactions.append(Transaction(
+                    transaction_id=transaction_id,
+                    account=from_account,
+                    transaction_type=TransactionType.TRANSFER,
+                    amount=-amount,
+                    currency=from_account.currency,
+                    description=description,
+                    category=categorize(description, TransactionType.TRANSFER.value),
+                    status=TransactionStatus.COMPLETED,
+                    recipient_account=Account.link_from_id(recipient["_id"]),
+                    recipient_name=names.get(recipient["user"].id),
+                    recipient_account_number=recipient["account_number"],
+                    transaction_date=now
+                ))
+                transactions.append(Transaction(
+                    transaction_id=ids.next_id(),
+                    account=Account.link_from_id(recipient["_id"]),
+                    transaction_type=TransactionType.DEPOSIT,
+                    amount=converted_amount,
+                    currency=recipient["currency"],
+                    description=description,
+                    category=categorize(description, TransactionType.DEPOSIT.value),
+                    status=TransactionStatus.COMPLETED,
+                    transaction_date=now
+                ))
+                entries.append((
+                    transfer_legs(
+                        from_account.id, from_account.currency, amount,
+                        recipient["_id"], recipient["currency"], converted_amount
+                    ),
+                    transaction_id
+                ))
+
+            if transactions:
+                await Transaction.insert_many(transactions, session=session)
+                await post_entries(entries, now, session=session)
+                rollups = [
+                    rollup_increment(
+                        from_account.id, from_account.currency, TransactionType.TRANSFER.value,
+                        -sender_total, now, count=len(completed)
+                    )
+                ]
+                rollups.extend(
+                    rollup_increment(
+                        account_id, currencies[account_id], TransactionType.DEPOSIT.value,
+                        sum(amounts), now, count=len(amounts)
+                    )
+                    for account_id, amounts in received.items()
+                )
+                await record_rollups(rollups, session=session)
+
+            batch_response = build_response(from_account, sender_total, completed)
+            await complete_in_transaction(batch_response, session)
+            return batch_response
+
+        def build_response(
+                from_account, total_debited: int, completed: Dict[int, Tuple[str, int]]
+        ) -> BatchTransferResponse:
+            # Copies fraîches : une tentative rejouée ne garde rien de la précédente
+            line_results = [result.model_copy() for result in results]
+            for index, _, _ in accepted:
+                result = line_results[index]
+                if index in completed:
+                    transaction_id, converted_amount = completed[index]
+                    result.transaction_id = transaction_id
+                    result.converted_amount = minor_to_float(converted_amount)
+                    result.currency = recipients[result.to_account_number]["currency"]
+                else:
+                    result.status = "rejected"
+                    result.detail = "Le compte destinataire est inactif"
+
+            return BatchTransferResponse(
+                account_id=str(from_account.id),
+                currency=from_account.currency,
+                total_debited=minor_to_float(total_debited),
+                completed=len(completed),
+                rejected=len(lines) - len(completed),
+                results=line_results
+            )
+
+        if accepted:
+            return await run_in_transaction(batch_entry)
+        return build_response(sender, 0, {})
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Erreur lors du transfert: {str(e)}", exc_info=True)
+        logger.error(f"Erreur lors du transfert groupé: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Une erreur est survenue lors du transfert"
         )
 
 
+@router.get("/transactions/metrics")
+async def get_transfer_metrics(
+        current_user: User = Depends(check_user_role([UserRole.ADMIN]))
+):
+    """Compteurs des transferts, des insertions regroupées, du cache de comptes, des ordres permanents et du flux temps réel"""
+    return {
+        "transfers": transfer_metrics.snapshot(),
+        "group_commit": transaction_inserts.metrics.snapshot(),
+        "account_cache": account_cache.snapshot(),
+        "standing_orders": standing_order_scheduler.snapshot(),
+        "live_events": live_events.snapshot(),
+    }
+
+
 @router.post("/currency/convert", response_model=ConversionResponse)
 async def convert_currency(
         conversion_data: ConversionRequest,
-        background_tasks: BackgroundTasks,
         current_user: User = Depends(get_current_active_user)
 ):
     """Convertit un montant d'une devise à une autre"""
@@ -449,9 +977,6 @@ async def convert_currency(
                 detail="Devise non supportée. Devises disponibles: USD, EUR, XOF"
             )
 
-        # Programmez une mise à jour des taux en arrière-plan
-        background_tasks.add_task(update_exchange_rates)
-
         exchange_rate = await get_exchange_rate(from_currency, to_currency)
 
         amount = Decimal(str(conversion_data.amount))
@@ -469,4 +994,53 @@ async def convert_currency(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/currency/convert/batch", response_model=BatchConversionResponse)
+async def convert_currency_batch(
+        batch: BatchConversionRequest,
+        current_user: User = Depends(get_current_active_user)
+):
+    """Convertit en un seul appel une liste de (devise source, devise cible, montant)"""
+    supported = {currency.value for currency in Currency}
+    for position, item in enumerate(batch.items):
+        if item.from_currency not in supported or item.to_currency not in supported:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Devise non supportée (ligne {position}). Devises disponibles: USD, EUR, XOF"
+            )
+
+    matrix = await exchange_rate_cache.get_matrix()
+    if not matrix:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Exchange rates not available"
+        )
+
+    items = batch.items
+    try:
+        from_idx = matrix.indices([item.from_currency for item in items])
+        to_idx = matrix.indices([item.to_currency for item in items])
+    except KeyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Conversion vers ou depuis {e.args[0]} non supportée"
+        )
+    amounts = np.fromiter((item.amount for item in items), dtype=np.float64, count=len(items))
+
+    rates, converted = matrix.convert(from_idx, to_idx, amounts)
+
+    return BatchConversionResponse(
+        rates_date=exchange_rate_cache.last_updated,
+        results=[
+            BatchConversionItem(
+                from_currency=item.from_currency,
+                to_currency=item.to_currency,
+                amount=item.amount,
+                converted_amount=converted_amount,
+                exchange_rate=rate
+            )
+            for item, rate, converted_amount in zip(items, rates.tolist(), converted.tolist())
+        ]
+    )
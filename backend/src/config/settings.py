@@ -78,11 +78,71 @@ class Settings(BaseSettings):
     # Configuration pour l'API de taux de change
     EXCHANGE_API_BASE_URL: str = "https://open.er-api.com/v6/latest"
     EXCHANGE_RATE_CACHE_DURATION: int = 21600
+    EXCHANGE_RATE_USE_STUB: bool = False
     CURRENCY_CONVERSION_DEFAULT_FEE: float = 0.025
 
     # Application specific settings
     STUDENT_DEFAULT_CURRENCY: str = "USD"
     BANKING_TRANSFER_FEE_PERCENTAGE: float = 0.5
+
+    # Transactions MongoDB (nécessite un replica set, cf. docker-compose.yml ; False sur un serveur autonome)
+    MONGODB_TRANSACTIONS_ENABLED: bool = True
+    TRANSFER_MAX_RETRIES: int = 5
+    TRANSFER_RETRY_BACKOFF_MS: int = 10
+    TRANSFER_RETRY_BACKOFF_MAX_MS: int = 500
+
+    # Regroupement des insertions de transactions hors transaction MongoDB (group commit) ;
+    # sans effet entre requêtes si MONGODB_TRANSACTIONS_ENABLED (avertissement au démarrage)
+    TRANSACTION_GROUP_COMMIT_ENABLED: bool = False
+    TRANSACTION_GROUP_COMMIT_MAX_BATCH: int = 100
+    TRANSACTION_GROUP_COMMIT_MAX_DELAY_MS: float = 2.0
+
+    # Clés d'idempotence des opérations monétaires
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 60 * 60 * 24
+    IDEMPOTENCY_PENDING_TIMEOUT_SECONDS: int = 60
+
+    # Cache des métadonnées de compte (par worker)
+    ACCOUNT_CACHE_TTL_SECONDS: float = 30.0
+    ACCOUNT_CACHE_MAX_ENTRIES: int = 10000
+
+    # Compteurs de plafond des cartes : intervalle de persistance/réconciliation
+    CARD_COUNTER_FLUSH_INTERVAL_SECONDS: float = 5.0
+
+    # Score d'anomalie des transferts sortants (médiane/MAD sur les derniers montants)
+    ANOMALY_WINDOW_SIZE: int = 100
+    ANOMALY_MIN_HISTORY: int = 10
+    ANOMALY_SCORE_THRESHOLD: float = 3.5
+    # Dispersion minimale (centièmes, et fraction de la médiane) : un historique constant
+    # ne fait pas signaler le moindre écart
+    ANOMALY_MIN_SPREAD: int = 100
+    ANOMALY_MIN_SPREAD_RATIO: float = 0.1
+    ANOMALY_REFRESH_SECONDS: float = 300.0
+    ANOMALY_MAX_ACCOUNTS: int = 10000
+
+    # Ordres permanents : ordonnanceur en mémoire, échéances réservées par lots
+    STANDING_ORDER_SCHEDULER_ENABLED: bool = True
+    STANDING_ORDER_POLL_SECONDS: float = 30.0
+    STANDING_ORDER_BATCH_SIZE: int = 200
+    STANDING_ORDER_CONCURRENCY: int = 32
+    STANDING_ORDER_LEASE_SECONDS: float = 300.0
+    STANDING_ORDER_MAX_FAILURES: int = 3
+    # Délai avant de retenter une échéance en échec (doublé à chaque échec consécutif)
+    STANDING_ORDER_RETRY_SECONDS: float = 300.0
+
+    # Flux temps réel (SSE) alimenté par un change stream par worker
+    LIVE_EVENTS_QUEUE_SIZE: int = 100
+    LIVE_EVENTS_HEARTBEAT_SECONDS: float = 15.0
+
+    # Archivage des transactions : âge d'archivage et durée de cache de la limite entre niveaux
+    TRANSACTION_ARCHIVE_AFTER_DAYS: int = 365
+    ARCHIVE_WATERMARK_CACHE_SECONDS: float = 30.0
+
+    # Identifiants de transaction triables dans le temps : numéro de worker (0-1023) unique
+    # par processus. Fixé ici, l'exploitant garantit son unicité ; à défaut, chaque processus
+    # réserve un numéro libre par un bail renouvelé (id_worker_leases)
+    ID_WORKER_ID: Optional[int] = None
+    ID_WORKER_LEASE_SECONDS: float = 60.0
+
     CLOTHES_ITEMS_PER_PAGE: int = 20
 
 
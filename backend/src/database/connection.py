@@ -4,9 +4,16 @@ import logging
 
 from ..config.settings import get_settings
 from ..models.blacklisted_token import BlacklistedToken
+from ..models.analytics import MonthlyRollup, DailyBalance
+from ..models.idempotency import IdempotencyRecord
+from ..models.ids import WorkerIdLease
+from ..models.ledger import LedgerPosting, BalanceSnapshot
 from ..models.user import User
 from ..models.student import Student, Course, Assignment, Grade, Attendance
-from ..models.banking import Account, Transaction, Card, ExchangeRate
+from ..models.banking import (
+    Account, Transaction, Card, CardSpendBucket, ExchangeRate, ExchangeRateSnapshot, TransferCounter,
+    StandingOrder, ArchivedTransaction, ArchiveWatermark
+)
 from ..models.clothes import Product, Category, Brand, Review, UserPreference
 
 settings = get_settings()
@@ -48,8 +55,20 @@ async def init_db():
                 # Banking app models
                 Account,
                 Transaction,
+                ArchivedTransaction,
+                ArchiveWatermark,
                 Card,
+                CardSpendBucket,
+                TransferCounter,
+                StandingOrder,
                 ExchangeRate,
+                ExchangeRateSnapshot,
+                IdempotencyRecord,
+                WorkerIdLease,
+                LedgerPosting,
+                BalanceSnapshot,
+                MonthlyRollup,
+                DailyBalance,
 
                 # Clothes app models
                 Product,
@@ -76,6 +95,13 @@ async def get_db():
     return client[settings.DB_NAME]
 
 
+def get_client() -> AsyncIOMotorClient:
+    """Return the Motor client (used to open sessions and transactions)"""
+    if client is None:
+        raise RuntimeError("MongoDB client is not initialized")
+    return client
+
+
 async def close_db_connection():
     """Close database connection"""
     global client
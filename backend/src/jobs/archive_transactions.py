@@ -0,0 +1,136 @@
+"""
+Archivage des transactions anciennes dans `transactions_archive` (à planifier, par exemple chaque nuit).
+
+Les transactions antérieures à minuit (UTC) il y a `--days` jours sont déplacées en trois
+temps, chacun rejouable après une interruption :
+
+1. copie par lots de `--batch-size` dans l'archive (même _id, doublons ignorés) ;
+2. déplacement de la limite d'archivage (archive_watermarks) : les lectures de
+   l'historique, de l'export et des agrégats passent à l'archive pour les dates antérieures ;
+3. après `--grace-seconds` (plus long que le cache de la limite dans les workers),
+   suppression par lots des transactions copiées.
+
+Usage (depuis backend/) :
+    python -m src.jobs.archive_transactions --days 365 --batch-size 5000
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, time, timedelta, UTC
+
+from pymongo.errors import BulkWriteError
+
+from ..config.settings import get_settings
+from ..database.connection import init_db, close_db_connection
+from ..models.banking import ArchivedTransaction, ArchiveWatermark, Transaction
+from ..utils.archive import DATE_FIELD
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+DUPLICATE_KEY = 11000
+
+
+async def copy_to_archive(cutoff: datetime, batch_size: int) -> int:
+    """Copie dans l'archive les transactions antérieures à `cutoff` ; retourne le nombre copié"""
+    archive = ArchivedTransaction.get_motor_collection()
+    cursor = Transaction.get_motor_collection().find(
+        {DATE_FIELD: {"$lt": cutoff}}, batch_size=batch_size
+    ).sort([(DATE_FIELD, 1), ("_id", 1)])
+
+    copied = 0
+    batch = []
+
+    async def flush() -> None:
+        nonlocal copied
+        try:
+            await archive.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # Déjà copiées lors d'une exécution interrompue
+            if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+                raise
+        copied += len(batch)
+        logger.info(f"{copied} transactions copiées (jusqu'au {batch[-1][DATE_FIELD]:%Y-%m-%d})")
+
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            await flush()
+            batch = []
+    if batch:
+        await flush()
+    return copied
+
+
+async def advance_watermark(cutoff: datetime) -> datetime:
+    """Avance la limite d'archivage (jamais en arrière) et retourne sa valeur"""
+    collection = ArchiveWatermark.get_motor_collection()
+    name = Transaction.get_settings().name
+    await collection.update_one(
+        {"_id": name},
+        {"$max": {"archived_before": cutoff}, "$set": {"updated_at": datetime.now(UTC)}},
+        upsert=True
+    )
+    state = await collection.find_one({"_id": name})
+    return state["archived_before"].replace(tzinfo=UTC)
+
+
+async def delete_archived(watermark: datetime, batch_size: int) -> int:
+    """Supprime des transactions récentes celles antérieures à la limite et présentes dans l'archive"""
+    transactions = Transaction.get_motor_collection()
+    archive = ArchivedTransaction.get_motor_collection()
+    deleted = 0
+    while True:
+        ids = [
+            document["_id"]
+            for document in await transactions.find(
+                {DATE_FIELD: {"$lt": watermark}}, {"_id": 1}
+            ).limit(batch_size).to_list(None)
+        ]
+        if not ids:
+            return deleted
+        archived = [document["_id"] for document in await archive.find({"_id": {"$in": ids}}, {"_id": 1}).to_list(None)]
+        if len(archived) != len(ids):
+            # Ne devrait pas arriver : la limite n'avance qu'après une copie complète
+            raise RuntimeError(f"{len(ids) - len(archived)} transactions antérieures à la limite absentes de l'archive")
+        result = await transactions.delete_many({"_id": {"$in": archived}})
+        deleted += result.deleted_count
+        logger.info(f"{deleted} transactions supprimées de la collection principale")
+
+
+async def run(days: int, batch_size: int, grace_seconds: float) -> None:
+    await init_db()
+    try:
+        cutoff = datetime.combine((datetime.now(UTC) - timedelta(days=days)).date(), time.min, tzinfo=UTC)
+        state = await ArchiveWatermark.get_motor_collection().find_one({"_id": Transaction.get_settings().name})
+        current = state["archived_before"].replace(tzinfo=UTC) if state else None
+
+        if current is None or current < cutoff:
+            copied = await copy_to_archive(cutoff, batch_size)
+            watermark = await advance_watermark(cutoff)
+            logger.info(f"{copied} transactions copiées, limite d'archivage au {watermark:%Y-%m-%d}")
+            # Les workers relisent la limite au plus tard après ARCHIVE_WATERMARK_CACHE_SECONDS
+            await asyncio.sleep(grace_seconds)
+        else:
+            # Limite déjà en place : reprise d'une suppression interrompue
+            watermark = current
+
+        deleted = await delete_archived(watermark, batch_size)
+        logger.info(f"Terminé : {deleted} transactions archivées avant le {watermark:%Y-%m-%d}")
+    finally:
+        await close_db_connection()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=settings.TRANSACTION_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--grace-seconds", type=float, default=2 * settings.ARCHIVE_WATERMARK_CACHE_SECONDS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args.days, args.batch_size, args.grace_seconds))
+
+
+if __name__ == "__main__":
+    main()
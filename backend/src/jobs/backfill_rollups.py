@@ -0,0 +1,119 @@
+"""
+Reconstruction des agrégats mensuels (monthly_rollups) depuis les transactions.
+
+Traite les comptes par lots, dans l'ordre de leur _id : pour chaque lot, un `$group`
+côté serveur sur (compte, mois, type) puis un `bulk_write` qui remplace les agrégats
+concernés. Chaque lot est idempotent ; `--after` reprend après le dernier compte traité.
+
+Les valeurs calculées remplacent celles maintenues en direct : lancer le job avant
+d'activer la mise à jour au fil de l'eau, ou en période creuse.
+
+Usage (depuis backend/) :
+    python -m src.jobs.backfill_rollups --batch-size 500
+"""
+import argparse
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, UTC
+from typing import List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from ..database.connection import init_db, close_db_connection
+from ..models.analytics import MonthlyRollup
+from ..models.banking import Account, TransactionStatus
+from ..utils.archive import aggregate_groups
+from ..utils.rollups import rollup_id
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill_accounts(accounts: List[dict]) -> int:
+    """Recalcule les agrégats des comptes donnés et retourne le nombre de mois écrits"""
+    currencies = {account["_id"]: account["currency"] for account in accounts}
+    # Transactions récentes et archivées
+    groups = await aggregate_groups([
+        {"$match": {
+            "account.$id": {"$in": list(currencies)},
+            "status": TransactionStatus.COMPLETED.value,
+        }},
+        {"$group": {
+            # Un chemin "$account.$id" est refusé en agrégation : on groupe sur la DBRef entière
+            "_id": {
+                "account": "$account",
+                "month": {"$dateToString": {"format": "%Y-%m", "date": "$transaction_date"}},
+                "type": "$transaction_type",
+            },
+            "count": {"$sum": 1},
+            "total": {"$sum": "$amount"},
+            "income": {"$sum": {"$cond": [{"$gt": ["$amount", 0]}, "$amount", 0]}},
+            "expense": {"$sum": {"$cond": [{"$lt": ["$amount", 0]}, {"$subtract": [0, "$amount"]}, 0]}},
+        }},
+    ])
+
+    months = defaultdict(lambda: {"income": 0, "expense": 0, "types": {}})
+    for group in groups:
+        key = (group["_id"]["account"].id, group["_id"]["month"])
+        months[key]["income"] += group["income"]
+        months[key]["expense"] += group["expense"]
+        months[key]["types"][group["_id"]["type"]] = {"count": group["count"], "total": group["total"]}
+
+    if not months:
+        return 0
+
+    now = datetime.now(UTC)
+    await MonthlyRollup.get_motor_collection().bulk_write(
+        [
+            UpdateOne(
+                {"_id": rollup_id(account_id, month)},
+                {"$set": {
+                    "account_id": account_id,
+                    "month": month,
+                    "currency": currencies[account_id],
+                    **totals,
+                    "updated_at": now,
+                }},
+                upsert=True
+            )
+            for (account_id, month), totals in months.items()
+        ],
+        ordered=False
+    )
+    return len(months)
+
+
+async def run(batch_size: int, after: Optional[str]) -> None:
+    await init_db()
+    try:
+        query = {"_id": {"$gt": ObjectId(after)}} if after else {}
+        cursor = Account.get_motor_collection().find(query, {"currency": 1}, batch_size=batch_size).sort("_id", 1)
+
+        written = 0
+        batch = []
+        async for account in cursor:
+            batch.append(account)
+            if len(batch) >= batch_size:
+                written += await backfill_accounts(batch)
+                logger.info(f"{written} mois écrits, dernier compte traité : {batch[-1]['_id']}")
+                batch = []
+        if batch:
+            written += await backfill_accounts(batch)
+        logger.info(f"Terminé : {written} agrégats mensuels écrits")
+    finally:
+        await close_db_connection()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--after", help="reprendre après cet id de compte")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args.batch_size, args.after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Classement des transactions existantes par catégorie (voir utils.categories).
+
+Parcourt les transactions dans l'ordre de leur _id, par lots de `--batch-size`, et
+écrit la catégorie de chaque lot par `bulk_write`. Par défaut seules les transactions
+sans catégorie sont traitées ; `--all` reclasse tout (après un changement de mots-clés).
+
+Les deux niveaux sont traités : l'archive (transactions les plus anciennes), puis les
+transactions récentes. `--after` reprend après le dernier _id journalisé, sur les deux
+niveaux : les _id archivés précèdent ceux des transactions récentes.
+
+Usage (depuis backend/) :
+    python -m src.jobs.categorize_transactions --batch-size 5000
+"""
+import argparse
+import asyncio
+import logging
+from collections import Counter
+from typing import List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from ..database.connection import init_db, close_db_connection
+from ..models.banking import ArchivedTransaction, Transaction
+from ..utils.categories import categorize
+
+logger = logging.getLogger(__name__)
+
+
+async def write_batch(collection, batch: List[dict], counts: Counter) -> None:
+    operations = []
+    for document in batch:
+        category = categorize(document.get("description") or "", document["transaction_type"])
+        counts[category] += 1
+        operations.append(UpdateOne({"_id": document["_id"]}, {"$set": {"category": category}}))
+    await collection.bulk_write(operations, ordered=False)
+
+
+async def run(batch_size: int, after: Optional[str], recategorize: bool) -> None:
+    await init_db()
+    try:
+        query = {} if recategorize else {"category": None}
+        if after:
+            query["_id"] = {"$gt": ObjectId(after)}
+
+        counts: Counter = Counter()
+        for collection in (ArchivedTransaction.get_motor_collection(), Transaction.get_motor_collection()):
+            cursor = collection.find(
+                query, {"description": 1, "transaction_type": 1}, batch_size=batch_size
+            ).sort("_id", 1)
+
+            batch: List[dict] = []
+            async for document in cursor:
+                batch.append(document)
+                if len(batch) >= batch_size:
+                    await write_batch(collection, batch, counts)
+                    logger.info(
+                        f"{sum(counts.values())} transactions classées "
+                        f"({collection.name}, dernier _id {batch[-1]['_id']})"
+                    )
+                    batch = []
+            if batch:
+                await write_batch(collection, batch, counts)
+
+        logger.info(f"Terminé : {sum(counts.values())} transactions classées")
+        for category, count in counts.most_common():
+            logger.info(f"  {category}: {count}")
+    finally:
+        await close_db_connection()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--after", help="reprendre après cet _id de transaction")
+    parser.add_argument("--all", dest="recategorize", action="store_true", help="reclasser aussi les transactions déjà classées")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args.batch_size, args.after, args.recategorize))
+
+
+if __name__ == "__main__":
+    main()
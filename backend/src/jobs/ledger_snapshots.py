@@ -0,0 +1,84 @@
+"""
+Arrêté périodique des soldes du journal (à planifier, par exemple toutes les heures).
+
+    python -m src.jobs.ledger_snapshots
+    python -m src.jobs.ledger_snapshots --opening-entries   # une fois, à la mise en service
+
+`--opening-entries` reprend le solde courant de chaque compte sans écriture sous forme
+d'une pièce d'ouverture (contrepartie : compte de caisse). À lancer pendant une fenêtre
+de maintenance, avant d'ouvrir le trafic.
+"""
+import argparse
+import asyncio
+import logging
+
+from ..database.connection import init_db, close_db_connection
+from ..models.banking import Account
+from ..models.ledger import LedgerPosting
+from ..utils.ids import worker_id_allocator
+from ..utils.ledger import account_key, deposit_legs, post_entry, take_snapshots
+
+logger = logging.getLogger(__name__)
+
+OPENING_TRANSACTION_ID = "OPENING"
+
+
+async def post_opening_entries(batch_size: int) -> int:
+    posted = 0
+    batch = []
+
+    async def flush(accounts) -> int:
+        keys = [account_key(account["_id"]) for account in accounts]
+        with_postings = {
+            row["_id"]
+            async for row in LedgerPosting.get_motor_collection().aggregate([
+                {"$match": {"account_key": {"$in": keys}}},
+                {"$group": {"_id": "$account_key"}},
+            ])
+        }
+        count = 0
+        for account in accounts:
+            if account_key(account["_id"]) in with_postings or not account.get("balance"):
+                continue
+            await post_entry(deposit_legs(account["_id"], account["balance"], account["currency"]), OPENING_TRANSACTION_ID)
+            count += 1
+        return count
+
+    cursor = Account.get_motor_collection().find({}, {"balance": 1, "currency": 1}, batch_size=batch_size)
+    async for account in cursor:
+        batch.append(account)
+        if len(batch) >= batch_size:
+            posted += await flush(batch)
+            batch = []
+    if batch:
+        posted += await flush(batch)
+    return posted
+
+
+async def run(opening_entries: bool, batch_size: int) -> None:
+    await init_db()
+    try:
+        if opening_entries:
+            # Les pièces d'ouverture reçoivent des identifiants triables
+            await worker_id_allocator.acquire()
+            try:
+                logger.info(f"{await post_opening_entries(batch_size)} pièces d'ouverture enregistrées")
+            finally:
+                await worker_id_allocator.release()
+        logger.info(f"{await take_snapshots(batch_size=batch_size)} instantanés de solde créés")
+    finally:
+        await close_db_connection()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--opening-entries", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args.opening_entries, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
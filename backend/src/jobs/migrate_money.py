@@ -0,0 +1,81 @@
+"""
+Migration des montants float vers des entiers en centièmes (voir utils.money).
+
+Parcourt en flux les documents dont le champ est encore un double et les réécrit par
+lots avec `bulk_write`. Chaque mise à jour est conditionnée à l'ancienne valeur : un
+document modifié entre-temps est laissé tel quel et repris au passage suivant. La
+migration peut donc être interrompue puis relancée sans risque.
+
+Usage (depuis backend/) :
+    python -m src.jobs.migrate_money --batch-size 5000
+"""
+import argparse
+import asyncio
+import logging
+
+import numpy as np
+from pymongo import UpdateOne
+
+from ..database.connection import init_db, close_db_connection
+from ..models.banking import Account, Card, Transaction
+from ..utils.money import to_minor_array
+
+logger = logging.getLogger(__name__)
+
+MONEY_FIELDS = [
+    (Account, "balance"),
+    (Transaction, "amount"),
+    (Card, "daily_limit"),
+]
+
+
+async def migrate_field(collection, field: str, batch_size: int) -> int:
+    """Convertit `field` en centièmes pour tous les documents où il est un double"""
+    migrated = 0
+    cursor = collection.find({field: {"$type": "double"}}, {field: 1}, batch_size=batch_size)
+
+    batch = []
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            migrated += await _flush(collection, field, batch)
+            batch = []
+    if batch:
+        migrated += await _flush(collection, field, batch)
+    return migrated
+
+
+async def _flush(collection, field: str, batch) -> int:
+    old_values = np.fromiter((document[field] for document in batch), dtype=np.float64, count=len(batch))
+    new_values = to_minor_array(old_values).tolist()
+    result = await collection.bulk_write(
+        [
+            UpdateOne({"_id": document["_id"], field: document[field]}, {"$set": {field: minor}})
+            for document, minor in zip(batch, new_values)
+        ],
+        ordered=False
+    )
+    return result.modified_count
+
+
+async def run(batch_size: int) -> None:
+    await init_db()
+    try:
+        for model, field in MONEY_FIELDS:
+            migrated = await migrate_field(model.get_motor_collection(), field, batch_size)
+            logger.info(f"{model.Settings.name}.{field}: {migrated} documents migrés")
+    finally:
+        await close_db_connection()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
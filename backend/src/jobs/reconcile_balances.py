@@ -0,0 +1,189 @@
+"""
+Rapprochement des soldes de compte avec l'historique des transactions (à planifier chaque nuit).
+
+Pour chaque lot de `--batch-size` comptes (dans l'ordre de leur _id), un seul `$group`
+côté serveur totalise les transactions terminées par compte ; les soldes et les totaux
+sont comparés en une opération NumPy. Un écart peut venir d'une écriture en cours entre
+les deux lectures : les comptes en écart sont relus une fois avant d'être signalés.
+
+Les écarts confirmés sont écrits dans `--output` (CSV). Après chaque lot, l'avancement
+est enregistré dans `--checkpoint` : relancée après une interruption, la commande reprend
+après le dernier lot terminé et complète le même rapport. Si l'exécution précédente est
+allée à son terme, une nouvelle exécution commence (rapport réécrit). `--restart` ignore
+le point de reprise.
+
+Le code de sortie vaut 1 si des écarts sont confirmés.
+
+Usage (depuis backend/) :
+    python -m src.jobs.reconcile_balances --output drift.csv --checkpoint reconcile.json
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+from datetime import datetime, UTC
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+from ..database.connection import init_db, close_db_connection
+from ..models.banking import Account, TransactionStatus
+from ..utils.archive import aggregate_groups
+from ..utils.money import from_minor
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ["account_id", "account_number", "currency", "balance", "transactions_total", "drift", "transactions"]
+
+
+async def transaction_totals(account_ids: List[ObjectId]) -> Dict[ObjectId, Tuple[int, int]]:
+    """(somme des montants, nombre) des transactions terminées de chaque compte, archive comprise"""
+    rows = await aggregate_groups([
+        {"$match": {"account.$id": {"$in": account_ids}, "status": TransactionStatus.COMPLETED.value}},
+        # "$account.$id" n'est pas un chemin valide en agrégation : on groupe sur le DBRef
+        {"$group": {"_id": "$account", "total": {"$sum": "$amount"}, "count": {"$sum": 1}}},
+    ])
+    return {row["_id"].id: (row["total"], row["count"]) for row in rows}
+
+
+def find_drift(balances: np.ndarray, totals: np.ndarray) -> np.ndarray:
+    """Indices des comptes dont le solde diffère du total de leurs transactions"""
+    return np.flatnonzero(balances != totals)
+
+
+async def reconcile_batch(accounts: List[dict]) -> List[dict]:
+    """Écarts confirmés d'un lot de comptes (documents bruts : _id, balance, ...)"""
+    account_ids = [account["_id"] for account in accounts]
+    totals = await transaction_totals(account_ids)
+    balances = np.fromiter((account.get("balance", 0) for account in accounts), dtype=np.int64, count=len(accounts))
+    sums = np.fromiter((totals.get(account_id, (0, 0))[0] for account_id in account_ids), dtype=np.int64, count=len(accounts))
+
+    suspects = [accounts[index] for index in find_drift(balances, sums)]
+    if not suspects:
+        return []
+
+    # Seconde lecture des seuls comptes en écart : élimine les transferts en cours
+    suspect_ids = [account["_id"] for account in suspects]
+    totals = await transaction_totals(suspect_ids)
+    fresh = {
+        account["_id"]: account
+        async for account in Account.get_motor_collection().find(
+            {"_id": {"$in": suspect_ids}}, {"balance": 1, "currency": 1, "account_number": 1}
+        )
+    }
+    rows = []
+    for account_id in suspect_ids:
+        account = fresh.get(account_id)
+        if account is None:
+            continue
+        total, count = totals.get(account_id, (0, 0))
+        balance = account.get("balance", 0)
+        if balance != total:
+            rows.append({
+                "account_id": str(account_id),
+                "account_number": account.get("account_number"),
+                "currency": account.get("currency"),
+                "balance": from_minor(balance),
+                "transactions_total": from_minor(total),
+                "drift": from_minor(balance - total),
+                "transactions": count,
+            })
+    return rows
+
+
+def load_checkpoint(path: Optional[str]) -> Optional[dict]:
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_checkpoint(path: Optional[str], checkpoint: dict) -> None:
+    """Écriture atomique : un arrêt en cours d'écriture laisse le point de reprise précédent"""
+    if not path:
+        return
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as file:
+        json.dump(checkpoint, file)
+    os.replace(temporary, path)
+
+
+async def run(output: str, checkpoint_path: Optional[str], batch_size: int, restart: bool) -> int:
+    """Retourne le nombre de comptes en écart"""
+    checkpoint = None if restart else load_checkpoint(checkpoint_path)
+    if checkpoint is not None and checkpoint.get("completed"):
+        # Exécution précédente terminée : la suivante (la nuit d'après) repart de zéro
+        logger.info(f"Rapprochement du {checkpoint['started_at']} terminé, nouvelle exécution")
+        checkpoint = None
+    if checkpoint is None:
+        checkpoint = {
+            "started_at": datetime.now(UTC).isoformat(),
+            "after": None,
+            "accounts": 0,
+            "drifted": 0,
+            "completed": False,
+        }
+    else:
+        logger.info(f"Reprise après le compte {checkpoint['after']} ({checkpoint['accounts']} comptes déjà vérifiés)")
+
+    await init_db()
+    try:
+        resuming = checkpoint["after"] is not None
+        with open(output, "a" if resuming else "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=FIELDS)
+            if not resuming:
+                writer.writeheader()
+
+            query = {"_id": {"$gt": ObjectId(checkpoint["after"])}} if resuming else {}
+            cursor = Account.get_motor_collection().find(
+                query, {"balance": 1}, batch_size=batch_size
+            ).sort("_id", 1)
+
+            async def flush(batch: List[dict]) -> None:
+                rows = await reconcile_batch(batch)
+                writer.writerows(rows)
+                file.flush()
+                checkpoint["after"] = str(batch[-1]["_id"])
+                checkpoint["accounts"] += len(batch)
+                checkpoint["drifted"] += len(rows)
+                save_checkpoint(checkpoint_path, checkpoint)
+                for row in rows:
+                    logger.warning(f"Écart sur le compte {row['account_id']}: {row['drift']} {row['currency']}")
+
+            batch: List[dict] = []
+            async for account in cursor:
+                batch.append(account)
+                if len(batch) >= batch_size:
+                    await flush(batch)
+                    batch = []
+            if batch:
+                await flush(batch)
+
+        checkpoint["completed"] = True
+        save_checkpoint(checkpoint_path, checkpoint)
+        logger.info(f"Terminé : {checkpoint['accounts']} comptes vérifiés, {checkpoint['drifted']} en écart")
+        return checkpoint["drifted"]
+    finally:
+        await close_db_connection()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="balance_drift.csv")
+    parser.add_argument("--checkpoint", help="fichier de reprise (JSON)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--restart", action="store_true", help="ignorer le point de reprise existant")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    drifted = asyncio.run(run(args.output, args.checkpoint, args.batch_size, args.restart))
+    # Code de sortie non nul en cas d'écart, pour l'alerte de la tâche planifiée
+    sys.exit(1 if drifted else 0)
+
+
+if __name__ == "__main__":
+    main()
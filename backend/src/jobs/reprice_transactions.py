@@ -0,0 +1,77 @@
+"""
+Reprise des transactions d'une période au taux en vigueur à leur date.
+
+Usage (depuis backend/) :
+    python -m src.jobs.reprice_transactions --start 2026-09-01 --end 2026-10-01 --currency USD --output september.csv
+"""
+import argparse
+import asyncio
+import csv
+import logging
+import sys
+from datetime import datetime, UTC
+
+from ..database.connection import init_db, close_db_connection
+from ..models.banking import Currency
+from ..utils.archive import find_ascending
+from ..utils.money import from_minor
+from ..utils.rate_history import reprice_stream
+
+logger = logging.getLogger(__name__)
+
+FIELDS = [
+    "transaction_id", "transaction_date", "transaction_type", "amount", "currency",
+    "repriced_currency", "exchange_rate", "repriced_amount", "rate_timestamp",
+]
+
+
+async def run(start: datetime, end: datetime, currency: Currency, output, batch_size: int) -> None:
+    await init_db()
+    try:
+        # Transactions archivées comprises
+        cursor = find_ascending(
+            {"transaction_date": {"$gte": start, "$lt": end}},
+            {field: 1 for field in ("transaction_id", "transaction_date", "transaction_type", "amount", "currency")},
+            batch_size
+        )
+
+        writer = csv.DictWriter(output, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+
+        rows = 0
+        missing = 0
+        total = 0
+        async for row in reprice_stream(cursor, currency, chunk_size=batch_size):
+            rows += 1
+            if row["repriced_amount"] is None:
+                missing += 1
+            else:
+                total += row["repriced_amount"]
+            writer.writerow({
+                **row,
+                "amount": from_minor(row["amount"]),
+                "repriced_amount": from_minor(row["repriced_amount"]) if row["repriced_amount"] is not None else None,
+            })
+
+        logger.info(f"{rows} transactions reprises en {currency.value}, total={from_minor(total)}, sans taux={missing}")
+    finally:
+        await close_db_connection()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", type=datetime.fromisoformat, required=True)
+    parser.add_argument("--end", type=datetime.fromisoformat, required=True)
+    parser.add_argument("--currency", type=Currency, default=Currency.USD)
+    parser.add_argument("--output", type=argparse.FileType("w"), default=sys.stdout)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    start = args.start.replace(tzinfo=args.start.tzinfo or UTC)
+    end = args.end.replace(tzinfo=args.end.tzinfo or UTC)
+    asyncio.run(run(start, end, args.currency, args.output, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Recalcul des scores d'anomalie de tous les transferts sortants (voir utils.anomaly).
+
+Parcourt les comptes dans l'ordre de leur _id puis, pour chaque compte, ses transferts
+par date croissante, par morceaux de `--chunk-size`. Chaque montant est comparé aux
+ANOMALY_WINDOW_SIZE transferts qui le précèdent : les derniers montants d'un morceau
+servent de contexte au suivant. Les scores d'un morceau sont calculés en une opération
+NumPy et écrits par `bulk_write`. `--after` reprend après le dernier compte traité.
+
+L'historique est lu sur les deux niveaux (archive puis transactions récentes, voir
+utils.archive) : les transferts archivés sont rescorés et servent de contexte aux suivants.
+
+Usage (depuis backend/) :
+    python -m src.jobs.rescore_transfers --chunk-size 5000
+"""
+import argparse
+import asyncio
+import logging
+import math
+from typing import List, Optional
+
+import numpy as np
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from ..config.settings import get_settings
+from ..database.connection import init_db, close_db_connection
+from ..models.banking import Account, TransactionType
+from ..utils.anomaly import rolling_scores
+from ..utils.archive import find_ascending, update_tiers
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+async def rescore_account(account_id: ObjectId, chunk_size: int) -> tuple:
+    """Retourne (transferts rescorés, transferts signalés) pour un compte"""
+    window = settings.ANOMALY_WINDOW_SIZE
+    cursor = find_ascending(
+        {
+            "account.$id": account_id,
+            "transaction_type": TransactionType.TRANSFER.value,
+            "amount": {"$lt": 0},
+        },
+        {"amount": 1},
+        batch_size=chunk_size
+    )
+
+    carry = np.empty(0)
+    scored = flagged = 0
+    chunk: List[dict] = []
+
+    async def flush() -> None:
+        nonlocal carry, scored, flagged
+        amounts = np.fromiter((-document["amount"] for document in chunk), dtype=np.float64, count=len(chunk))
+        series = np.concatenate([carry, amounts])
+        scores = rolling_scores(series, window, settings.ANOMALY_MIN_HISTORY)[len(carry):]
+        carry = series[-window:]
+
+        operations = []
+        for document, score in zip(chunk, scores.tolist()):
+            known = not math.isnan(score)
+            is_flagged = known and score > settings.ANOMALY_SCORE_THRESHOLD
+            flagged += is_flagged
+            operations.append(UpdateOne(
+                {"_id": document["_id"]},
+                {"$set": {"anomaly_score": score if known else None, "flagged": is_flagged}}
+            ))
+        await update_tiers(operations)
+        scored += len(chunk)
+
+    async for document in cursor:
+        chunk.append(document)
+        if len(chunk) >= chunk_size:
+            await flush()
+            chunk = []
+    if chunk:
+        await flush()
+    return scored, flagged
+
+
+async def run(chunk_size: int, after: Optional[str]) -> None:
+    await init_db()
+    try:
+        query = {"_id": {"$gt": ObjectId(after)}} if after else {}
+        accounts = Account.get_motor_collection().find(query, {"_id": 1}).sort("_id", 1)
+
+        total_scored = total_flagged = 0
+        async for account in accounts:
+            scored, flagged = await rescore_account(account["_id"], chunk_size)
+            total_scored += scored
+            total_flagged += flagged
+            if scored:
+                logger.info(f"Compte {account['_id']}: {scored} transferts, {flagged} signalés")
+        logger.info(f"Terminé : {total_scored} transferts rescorés, {total_flagged} signalés")
+    finally:
+        await close_db_connection()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--after", help="reprendre après cet id de compte")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args.chunk_size, args.after))
+
+
+if __name__ == "__main__":
+    main()
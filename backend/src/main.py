@@ -7,6 +7,12 @@ from contextlib import asynccontextmanager
 
 from src.config.settings import get_settings
 from src.database.connection import init_db, close_db_connection
+from src.utils.exchange import close_exchange_client
+from src.utils.group_commit import transaction_inserts
+from src.utils.card_limits import card_authorizer
+from src.utils.standing_orders import standing_order_scheduler
+from src.utils.live_events import live_events
+from src.utils.ids import worker_id_allocator
 from src.api.v1.auth import router as auth_router
 from src.api.v1.student import router as student_router
 from src.api.v1.clothes import router as clothes_router
@@ -14,6 +20,7 @@ from src.api.v1.card import router as card_router
 from src.api.v1.contact import router as contact_router
 from src.api.v1.transaction import router as transaction_router
 from src.api.v1.account import router as account_router
+from src.api.v1.standing_order import router as standing_order_router, execute_standing_orders
 
 
 
@@ -23,7 +30,19 @@ settings = get_settings()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    # Numéro de worker unique avant toute création de transaction
+    await worker_id_allocator.acquire()
+    transaction_inserts.check_configuration()
+    card_authorizer.start()
+    if settings.STANDING_ORDER_SCHEDULER_ENABLED:
+        standing_order_scheduler.start(execute_standing_orders)
     yield
+    await live_events.stop()
+    await standing_order_scheduler.stop()
+    await card_authorizer.stop()
+    await transaction_inserts.close()
+    await worker_id_allocator.release()
+    await close_exchange_client()
     await close_db_connection()
 
 
@@ -77,6 +96,7 @@ app.include_router(card_router, prefix=f"{settings.API_PREFIX}/banking", tags=["
 app.include_router(contact_router, prefix=f"{settings.API_PREFIX}/banking", tags=["Contacts"])
 app.include_router(transaction_router, prefix=f"{settings.API_PREFIX}/banking", tags=["Transactions"])
 app.include_router(account_router, prefix=f"{settings.API_PREFIX}/banking", tags=["Accounts"])
+app.include_router(standing_order_router, prefix=f"{settings.API_PREFIX}/banking", tags=["Standing Orders"])
 app.include_router(student_router, prefix=f"{settings.API_PREFIX}/student", tags=["Student App"])
 app.include_router(clothes_router, prefix=f"{settings.API_PREFIX}/clothes", tags=["Clothes App"])
 
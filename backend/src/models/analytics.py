@@ -0,0 +1,57 @@
+from datetime import datetime, UTC
+from typing import Dict
+
+from beanie import Document, PydanticObjectId
+from pydantic import BaseModel, Field
+
+from .banking import Currency
+
+
+class TypeTotals(BaseModel):
+    count: int = 0
+    total: int = 0  # En centièmes, signé
+
+
+class MonthlyRollup(Document):
+    """
+    Agrégat mensuel d'un compte, maintenu par `$inc` à chaque transaction terminée.
+    _id = "<account_id>:<YYYY-MM>" ; un graphique sur 24 mois lit au plus 24 documents.
+    """
+    id: str
+    account_id: PydanticObjectId
+    month: str  # "YYYY-MM"
+    currency: Currency
+    income: int = 0   # En centièmes
+    expense: int = 0  # En centièmes, valeur absolue
+    types: Dict[str, TypeTotals] = Field(default_factory=dict)
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+    class Settings:
+        name = "monthly_rollups"
+        indexes = [
+            [("account_id", 1), ("month", -1)],
+        ]
+
+    class Config:
+        use_enum_values = True
+
+
+class DailyBalance(Document):
+    """
+    Solde de fin de journée (UTC) d'un compte, pour les jours où il a bougé.
+    _id = "<account_id>:<YYYY-MM-DD>" ; les jours sans mouvement reprennent le solde précédent.
+    """
+    id: str
+    account_id: PydanticObjectId
+    day: str  # "YYYY-MM-DD"
+    balance: int  # En centièmes
+    currency: Currency
+
+    class Settings:
+        name = "daily_balances"
+        indexes = [
+            [("account_id", 1), ("day", -1)],
+        ]
+
+    class Config:
+        use_enum_values = True
@@ -2,8 +2,9 @@ from datetime import datetime, date, UTC
 from enum import Enum
 from typing import Optional, Dict, List
 
-from beanie import Document, Indexed, Link
+from beanie import Document, Indexed, Link, PydanticObjectId, TimeSeriesConfig, Granularity
 from pydantic import Field, field_validator
+from pymongo import IndexModel
 
 from ..models.user import User
 
@@ -28,6 +29,45 @@ class TransactionStatus(str, Enum):
     FAILED = "failed"       # Échouée
 
 
+class TransactionCategory(str, Enum):
+    """Catégories de dépenses, déduites de la description (voir utils.categories)"""
+    GROCERIES = "groceries"         # Alimentation
+    DINING = "dining"               # Restaurants et cafés
+    TRANSPORT = "transport"         # Transports et carburant
+    HOUSING = "housing"             # Loyer et logement
+    UTILITIES = "utilities"         # Énergie, eau, télécoms
+    HEALTH = "health"               # Santé
+    ENTERTAINMENT = "entertainment" # Loisirs et abonnements
+    SHOPPING = "shopping"           # Achats divers
+    EDUCATION = "education"         # Scolarité et formation
+    INCOME = "income"               # Salaires et revenus
+    CASH = "cash"                   # Retraits d'espèces
+    TRANSFER = "transfer"           # Transferts sans autre indication
+    OTHER = "other"                 # Non classée
+
+
+class AccountTier(str, Enum):
+    """Niveaux de compte : chacun a ses plafonds de transfert (voir utils.transfer_limits)"""
+    STANDARD = "standard"
+    PREMIUM = "premium"
+    BUSINESS = "business"
+
+
+class StandingOrderFrequency(str, Enum):
+    """Périodicités des ordres permanents"""
+    DAILY = "daily"     # Quotidien
+    WEEKLY = "weekly"   # Hebdomadaire
+    MONTHLY = "monthly" # Mensuel (même jour du mois, ramené au dernier jour si besoin)
+
+
+class StandingOrderStatus(str, Enum):
+    """États possibles d'un ordre permanent"""
+    ACTIVE = "active"         # Actif
+    PAUSED = "paused"         # Suspendu (par l'utilisateur ou après des échecs répétés)
+    CANCELLED = "cancelled"   # Annulé
+    COMPLETED = "completed"   # Terminé (date de fin atteinte)
+
+
 class CardType(str, Enum):
     """Types de cartes disponibles"""
     DEBIT = "debit"     # Carte de débit
@@ -55,15 +95,37 @@ class ExchangeRate(Document):
         use_enum_values = True
 
 
+class ExchangeRateSnapshot(Document):
+    """Historique des taux de change (collection time series, un document par rafraîchissement)"""
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    base_currency: Currency = Currency.USD
+    rates: Dict[str, float]
+
+    class Settings:
+        name = "exchange_rate_snapshots"
+        timeseries = TimeSeriesConfig(
+            time_field="timestamp",
+            granularity=Granularity.hours
+        )
+        indexes = [
+            # Recherche « taux en vigueur à la date T » : timestamp <= T, tri décroissant, limit 1
+            [("timestamp", -1)],
+        ]
+
+    class Config:
+        use_enum_values = True
+
+
 class Account(Document):
     """Modèle de compte bancaire (un seul compte courant par utilisateur)"""
     user: Link[User]
     account_number: Indexed(str, unique=True)
     account_name: str = Field(default="Compte Principal")
-    balance: float = 0.0
+    balance: int = 0  # En centièmes (voir utils.money)
     currency: Currency = Currency.USD
     is_active: bool = True
     is_primary: bool = True
+    tier: AccountTier = AccountTier.STANDARD
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
     last_transaction: Optional[datetime] = None
@@ -91,7 +153,7 @@ class Transaction(Document):
     transaction_id: Indexed(str, unique=True)
     account: Link[Account]
     transaction_type: TransactionType
-    amount: float
+    amount: int  # En centièmes, négatif pour un débit
     currency: Currency = Currency.USD
     description: str
     status: TransactionStatus = TransactionStatus.PENDING
@@ -101,6 +163,13 @@ class Transaction(Document):
     recipient_name: Optional[str] = None
     recipient_account_number: Optional[str] = None
 
+    # Catégorie déduite de la description (None : pas encore classée, voir jobs.categorize_transactions)
+    category: Optional[TransactionCategory] = None
+
+    # Score d'anomalie du montant par rapport à l'historique du compte (voir utils.anomaly)
+    anomaly_score: Optional[float] = None
+    flagged: bool = False
+
     # Horodatage
     transaction_date: datetime = Field(default_factory=lambda: datetime.now(UTC))
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
@@ -108,11 +177,52 @@ class Transaction(Document):
 
     class Settings:
         name = "transactions"
+        indexes = [
+            # Historique paginé par curseur (transaction_date, _id), avec ou sans filtre de type
+            [("account.$id", 1), ("transaction_date", -1), ("_id", -1)],
+            [("account.$id", 1), ("transaction_type", 1), ("transaction_date", -1), ("_id", -1)],
+            # Parcours par période, tous comptes confondus (rapports de fin de mois)
+            [("transaction_date", 1)],
+            # File de revue des transferts signalés
+            IndexModel(
+                [("transaction_date", -1)],
+                name="flagged_transaction_date",
+                partialFilterExpression={"flagged": True}
+            ),
+        ]
 
     class Config:
         use_enum_values = True
 
 
+class ArchivedTransaction(Transaction):
+    """
+    Transaction archivée (voir jobs.archive_transactions) : même document, même _id, dans
+    une collection à part. Ses index restent hors de la mémoire de travail des transactions récentes.
+    """
+
+    class Settings:
+        name = "transactions_archive"
+        indexes = [
+            [("account.$id", 1), ("transaction_date", -1), ("_id", -1)],
+            [("transaction_date", 1)],
+        ]
+
+
+class ArchiveWatermark(Document):
+    """
+    Limite entre les deux niveaux d'une collection (_id = nom de la collection) : les
+    documents antérieurs à `archived_before` se lisent dans l'archive, les autres dans
+    la collection d'origine.
+    """
+    id: str
+    archived_before: datetime
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+    class Settings:
+        name = "archive_watermarks"
+
+
 class Card(Document):
     """Modèle de carte bancaire"""
     user: Link[User]
@@ -122,7 +232,7 @@ class Card(Document):
     expiry_date: date
     cvv: str
     is_contactless: bool = True
-    daily_limit: float
+    daily_limit: int  # En centièmes
     status: CardStatus = CardStatus.ACTIVE
 
     # Champs spécifiques aux cartes virtuelles
@@ -136,4 +246,87 @@ class Card(Document):
         name = "cards"
 
     class Config:
-        use_enum_values = True
\ No newline at end of file
+        use_enum_values = True
+
+
+class CardSpendBucket(Document):
+    """
+    Dépenses autorisées d'une carte sur une tranche de 15 minutes.
+    _id = "<card_id>:<index de tranche>" ; la fenêtre glissante de 24 h couvre 96 tranches.
+    """
+    id: str
+    card_id: PydanticObjectId
+    bucket_start: datetime
+    amount: int = 0  # En centièmes
+    authorizations: int = 0
+
+    class Settings:
+        name = "card_spend_buckets"
+        indexes = [
+            [("card_id", 1), ("bucket_start", -1)],
+            # Les tranches sorties de la fenêtre ne servent plus
+            IndexModel([("bucket_start", 1)], expireAfterSeconds=2 * 24 * 60 * 60),
+        ]
+
+
+class TransferCounter(Document):
+    """
+    Compteurs glissants des transferts émis par un compte (_id = id du compte).
+    Montants en centièmes de la devise du compte, par heure (`hours`, 24 h) et par jour
+    (`days`, 30 jours) ; nombre de transferts par destinataire et par heure (`recipients`).
+    Les clés sont des index d'heure/de jour depuis l'epoch, les clés expirées sont retirées
+    à chaque écriture. `version` est incrémentée à chaque imputation : une écriture fondée
+    sur une lecture périmée ne s'applique pas.
+    """
+    id: PydanticObjectId
+    hours: Dict[str, int] = Field(default_factory=dict)
+    days: Dict[str, int] = Field(default_factory=dict)
+    recipients: Dict[str, Dict[str, int]] = Field(default_factory=dict)
+    version: int = 0
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+    class Settings:
+        name = "transfer_counters"
+
+
+class StandingOrder(Document):
+    """
+    Ordre permanent : transfert répété vers un même destinataire (voir utils.standing_orders).
+    L'échéance n° `occurrence` tombe à start_at + occurrence × période ; `next_run_at` est
+    la prochaine échéance à exécuter, None une fois l'ordre terminé ou annulé.
+    """
+    user: Link[User]
+    to_account_number: str
+    amount: int  # En centièmes, dans la devise du compte émetteur
+    description: str = ""
+    frequency: StandingOrderFrequency
+    interval: int = 1  # Toutes les `interval` périodes
+    start_at: datetime
+    end_at: Optional[datetime] = None
+    status: StandingOrderStatus = StandingOrderStatus.ACTIVE
+    occurrence: int = 0
+    next_run_at: Optional[datetime] = None
+
+    runs: int = 0
+    consecutive_failures: int = 0
+    last_run_at: Optional[datetime] = None
+    last_transaction_id: Optional[str] = None
+    last_error: Optional[str] = None
+
+    # Réservation par un worker pendant l'exécution (voir StandingOrderScheduler.claim)
+    claimed_by: Optional[str] = None
+    claimed_until: Optional[datetime] = None
+
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+    class Settings:
+        name = "standing_orders"
+        indexes = [
+            # Échéances à venir des ordres actifs
+            [("status", 1), ("next_run_at", 1)],
+            [("user.$id", 1), ("created_at", -1)],
+        ]
+
+    class Config:
+        use_enum_values = True
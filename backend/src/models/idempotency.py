@@ -0,0 +1,32 @@
+from datetime import datetime, UTC
+from typing import Any, Dict, Optional
+
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel
+
+from ..config.settings import get_settings
+
+settings = get_settings()
+
+
+class IdempotencyRecord(Document):
+    """Première réponse d'une opération monétaire, rejouée pour les requêtes répétées"""
+    # _id = "<user_id>:<scope>:<Idempotency-Key>" : une seule recherche sur l'index _id
+    id: str
+    fingerprint: str
+    # Jeton de la réservation : une réservation reprise ne peut plus être complétée par l'ancienne
+    token: Optional[str] = None
+    completed: bool = False
+    status_code: Optional[int] = None
+    response: Optional[Dict[str, Any]] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+    class Settings:
+        name = "idempotency_keys"
+        indexes = [
+            IndexModel(
+                [("created_at", 1)],
+                expireAfterSeconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS
+            ),
+        ]
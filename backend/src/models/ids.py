@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from beanie import Document
+
+
+class WorkerIdLease(Document):
+    """
+    Bail sur un numéro de worker des identifiants triables (_id = numéro, 0-1023).
+    Un processus réserve un numéro libre ou expiré au démarrage et renouvelle le bail
+    tant qu'il tourne : deux processus vivants n'ont jamais le même numéro.
+    """
+    id: int
+    owner: str
+    expires_at: datetime
+
+    class Settings:
+        name = "id_worker_leases"
@@ -0,0 +1,68 @@
+from datetime import datetime, UTC
+from enum import Enum
+from typing import Optional
+
+from beanie import Document
+from pydantic import Field
+
+from .banking import Currency
+
+
+class PostingSide(str, Enum):
+    """Sens d'une écriture"""
+    DEBIT = "debit"
+    CREDIT = "credit"
+
+
+class LedgerPosting(Document):
+    """
+    Écriture du journal en partie double (ajout uniquement, jamais modifiée).
+
+    Chaque écriture d'une même pièce (`entry_id`) partage la devise de sa paire et la
+    somme des montants signés d'une pièce est nulle devise par devise. `account_key` est
+    l'id du compte client, ou une clé de compte système (`system:cash:USD`, `system:fx:EUR`).
+
+    Journal d'audit : le solde qui fait foi reste `Account.balance`, débité par `$inc`
+    conditionnel. Le journal double ces mises à jour (même transaction) sans les remplacer,
+    et ne réduit donc pas la contention sur le document compte.
+    """
+    entry_id: str
+    account_key: str
+    side: PostingSide
+    amount: int  # En centièmes, signé : positif au crédit, négatif au débit
+    currency: Currency
+    transaction_id: Optional[str] = None
+    posted_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+    class Settings:
+        name = "ledger_postings"
+        indexes = [
+            # Solde = instantané + écritures postérieures : parcours par compte et date
+            [("account_key", 1), ("posted_at", 1)],
+            [("entry_id", 1)],
+            [("posted_at", 1)],
+        ]
+
+    class Config:
+        use_enum_values = True
+
+
+class BalanceSnapshot(Document):
+    """Solde d'un compte arrêté à `as_of` (toutes les écritures avec posted_at <= as_of)"""
+    account_key: str
+    balance: int  # En centièmes
+    currency: Currency
+    as_of: datetime
+    postings_count: int = 0
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+    class Settings:
+        name = "balance_snapshots"
+        indexes = [
+            [("account_key", 1), ("as_of", -1)],
+            # Dernier passage d'instantanés, tous comptes confondus
+            [("as_of", -1)],
+        ]
+
+    class Config:
+        use_enum_values = True
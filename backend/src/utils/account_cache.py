@@ -0,0 +1,146 @@
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+from beanie import PydanticObjectId
+
+from ..config.settings import get_settings
+from ..models.banking import Account, AccountTier
+from ..models.user import User
+
+settings = get_settings()
+
+ACCOUNT_CONTEXT_PROJECTION = {
+    "user": 1,
+    "account_number": 1,
+    "account_name": 1,
+    "currency": 1,
+    "is_active": 1,
+    "is_primary": 1,
+    "tier": 1,
+}
+
+
+class AccountContext(NamedTuple):
+    """
+    Métadonnées d'un compte, sans le solde : le solde se lit toujours en base
+    (débits et crédits conditionnels, voir utils.balance).
+    """
+    id: PydanticObjectId
+    user_id: PydanticObjectId
+    account_number: str
+    account_name: str
+    currency: str
+    is_active: bool
+    is_primary: bool
+    tier: str
+    holder_name: Optional[str]
+
+
+class AccountCache:
+    """
+    Cache LRU à durée de vie limitée des comptes, par utilisateur et par numéro de compte.
+
+    Propre à chaque worker : une modification faite par un autre processus n'est vue
+    qu'à l'expiration de l'entrée (`ttl_seconds`). Les écritures de ce processus
+    invalident leurs entrées, et les chemins d'écriture revérifient `is_active` en base.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[PydanticObjectId, tuple]" = OrderedDict()
+        self._by_user: Dict[PydanticObjectId, PydanticObjectId] = {}
+        self._by_number: Dict[str, PydanticObjectId] = {}
+
+    def _get(self, account_id: Optional[PydanticObjectId]) -> Optional[AccountContext]:
+        entry = self._entries.get(account_id) if account_id is not None else None
+        if entry is None:
+            self.misses += 1
+            return None
+        context, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._drop(account_id)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(account_id)
+        self.hits += 1
+        return context
+
+    def put(self, context: AccountContext) -> AccountContext:
+        self._drop(context.id)
+        self._entries[context.id] = (context, time.monotonic() + self.ttl_seconds)
+        self._by_user[context.user_id] = context.id
+        self._by_number[context.account_number] = context.id
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+        return context
+
+    def _drop(self, account_id: PydanticObjectId) -> None:
+        entry = self._entries.pop(account_id, None)
+        if entry is not None:
+            context = entry[0]
+            self._by_user.pop(context.user_id, None)
+            self._by_number.pop(context.account_number, None)
+
+    def invalidate(
+            self,
+            account_id: Optional[PydanticObjectId] = None,
+            user_id: Optional[PydanticObjectId] = None,
+            account_number: Optional[str] = None
+    ) -> None:
+        """Retire l'entrée désignée par n'importe laquelle de ses clés"""
+        for key in (account_id, self._by_user.get(user_id), self._by_number.get(account_number)):
+            if key is not None:
+                self._drop(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_user.clear()
+        self._by_number.clear()
+
+    async def by_user(self, user: User) -> Optional[AccountContext]:
+        context = self._get(self._by_user.get(user.id))
+        if context is not None:
+            return context
+        document = await Account.get_motor_collection().find_one(
+            {"user.$id": user.id}, ACCOUNT_CONTEXT_PROJECTION
+        )
+        return self.put(_context(document, user.full_name)) if document else None
+
+    async def by_number(self, account_number: str) -> Optional[AccountContext]:
+        context = self._get(self._by_number.get(account_number))
+        if context is not None:
+            return context
+        document = await Account.get_motor_collection().find_one(
+            {"account_number": account_number}, ACCOUNT_CONTEXT_PROJECTION
+        )
+        if not document:
+            return None
+        holder = await User.get_motor_collection().find_one({"_id": document["user"].id}, {"full_name": 1})
+        return self.put(_context(document, holder.get("full_name") if holder else None))
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def _context(document: dict, holder_name: Optional[str]) -> AccountContext:
+    return AccountContext(
+        id=document["_id"],
+        user_id=document["user"].id,
+        account_number=document["account_number"],
+        account_name=document.get("account_name", ""),
+        currency=document["currency"],
+        is_active=document.get("is_active", True),
+        is_primary=document.get("is_primary", True),
+        tier=document.get("tier", AccountTier.STANDARD.value),
+        holder_name=holder_name
+    )
+
+
+account_cache = AccountCache(
+    max_entries=settings.ACCOUNT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.ACCOUNT_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,163 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, UTC
+from typing import Dict, Optional
+
+import numpy as np
+from beanie import PydanticObjectId
+from numpy.lib.stride_tricks import sliding_window_view
+
+from ..config.settings import get_settings
+from ..models.banking import Transaction, TransactionType
+
+settings = get_settings()
+
+# Facteur de cohérence entre MAD et écart-type pour une loi normale
+MAD_SCALE = 0.6745
+
+
+def spread_floor(median):
+    """Dispersion minimale retenue pour une médiane donnée (scalaire ou tableau)"""
+    return np.maximum(settings.ANOMALY_MIN_SPREAD, settings.ANOMALY_MIN_SPREAD_RATIO * np.abs(median))
+
+
+def robust_score(history: np.ndarray, amount: float) -> Optional[float]:
+    """
+    Score robuste (médiane/MAD) de `amount` par rapport à `history`.
+    Retombe sur le z-score si la MAD est nulle ; la dispersion ne descend jamais sous
+    spread_floor. None si l'historique est trop court.
+    """
+    if len(history) < settings.ANOMALY_MIN_HISTORY:
+        return None
+    median = np.median(history)
+    mad = np.median(np.abs(history - median))
+    if mad > 0:
+        center, spread = median, mad / MAD_SCALE
+    else:
+        center, spread = history.mean(), history.std()
+    return float((amount - center) / max(spread, spread_floor(median)))
+
+
+def rolling_scores(amounts: np.ndarray, window: int, min_history: int) -> np.ndarray:
+    """
+    Score de chaque montant par rapport aux `window` montants précédents (NaN si moins de
+    `min_history`), calculé pour toute la série en une fois.
+    """
+    n = len(amounts)
+    if n == 0:
+        return np.empty(0)
+    padded = np.concatenate([np.full(window, np.nan), amounts.astype(np.float64)])
+    # Ligne i : les `window` montants qui précèdent amounts[i]
+    history = sliding_window_view(padded[:-1], window)[:n]
+    counts = np.sum(~np.isnan(history), axis=1)
+    scores = np.full(n, np.nan)
+    enough = counts >= min_history
+    if not enough.any():
+        return scores
+
+    history = history[enough]
+    values = amounts[enough].astype(np.float64)
+    median = np.nanmedian(history, axis=1)
+    mad = np.nanmedian(np.abs(history - median[:, None]), axis=1)
+    center = np.where(mad > 0, median, np.nanmean(history, axis=1))
+    spread = np.where(mad > 0, mad / MAD_SCALE, np.nanstd(history, axis=1))
+    scores[enough] = (values - center) / np.maximum(spread, spread_floor(median))
+    return scores
+
+
+class AmountWindow:
+    """Derniers montants sortants d'un compte (tampon circulaire, en centièmes)"""
+    __slots__ = ("values", "size", "position", "refreshed_until", "observed", "refreshed_at")
+
+    def __init__(self, capacity: int):
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.size = 0
+        self.position = 0
+        # Date du dernier transfert relu en base ; les transferts du worker n'y touchent pas
+        self.refreshed_until: Optional[datetime] = None
+        # Transferts du worker déjà ajoutés, ignorés à la prochaine relecture : transaction_id -> date
+        self.observed: Dict[str, datetime] = {}
+        self.refreshed_at = 0.0
+
+    def append(self, amount: float) -> None:
+        self.values[self.position] = amount
+        self.position = (self.position + 1) % len(self.values)
+        self.size = min(self.size + 1, len(self.values))
+
+    def history(self) -> np.ndarray:
+        return self.values[:self.size]
+
+
+class AnomalyScorer:
+    """
+    Fenêtres glissantes des transferts sortants par compte, gardées en mémoire (LRU).
+
+    Une fenêtre est chargée à la première utilisation, puis complétée par chaque transfert
+    du worker et, au plus toutes les ANOMALY_REFRESH_SECONDS, par les transferts plus
+    récents que le dernier relu en base (autres workers, sans doubler ceux du worker).
+    Le calcul du score ne lit jamais la base.
+    """
+
+    def __init__(self, window_size: int, refresh_seconds: float, max_accounts: int):
+        self.window_size = window_size
+        self.refresh_seconds = refresh_seconds
+        self.max_accounts = max_accounts
+        self.windows: "OrderedDict[PydanticObjectId, AmountWindow]" = OrderedDict()
+
+    async def score(self, account_id: PydanticObjectId, amount: int) -> Optional[float]:
+        window = await self._window(account_id)
+        return robust_score(window.history(), float(amount))
+
+    def is_anomalous(self, score: Optional[float]) -> bool:
+        return score is not None and score > settings.ANOMALY_SCORE_THRESHOLD
+
+    def observe(self, account_id: PydanticObjectId, transaction_id: str, amount: int, when: datetime) -> None:
+        """Ajoute un transfert validé à la fenêtre du compte, si elle est chargée"""
+        window = self.windows.get(account_id)
+        if window is not None:
+            window.append(float(amount))
+            window.observed[transaction_id] = when
+
+    async def _window(self, account_id: PydanticObjectId) -> AmountWindow:
+        window = self.windows.get(account_id)
+        if window is None:
+            window = AmountWindow(self.window_size)
+            self.windows[account_id] = window
+            while len(self.windows) > self.max_accounts:
+                self.windows.popitem(last=False)
+        else:
+            self.windows.move_to_end(account_id)
+        if time.monotonic() - window.refreshed_at >= self.refresh_seconds:
+            await self._refresh(account_id, window)
+        return window
+
+    async def _refresh(self, account_id: PydanticObjectId, window: AmountWindow) -> None:
+        query = {
+            "account.$id": account_id,
+            "transaction_type": TransactionType.TRANSFER.value,
+            "amount": {"$lt": 0},
+        }
+        if window.refreshed_until is not None:
+            query["transaction_date"] = {"$gt": window.refreshed_until}
+        window.refreshed_at = time.monotonic()
+        recent = await Transaction.get_motor_collection().find(
+            query, {"amount": 1, "transaction_date": 1, "transaction_id": 1}
+        ).sort([("transaction_date", -1)]).limit(self.window_size).to_list(None)
+        for document in reversed(recent):
+            if window.observed.pop(document["transaction_id"], None) is None:
+                window.append(float(-document["amount"]))
+        if recent:
+            # Mongo relit des dates naïves, toujours en UTC
+            window.refreshed_until = recent[0]["transaction_date"].replace(tzinfo=UTC)
+            # Transferts du worker antérieurs à la limite mais absents de la relecture (limite atteinte)
+            window.observed = {
+                transaction_id: when for transaction_id, when in window.observed.items()
+                if when > window.refreshed_until
+            }
+
+
+anomaly_scorer = AnomalyScorer(
+    window_size=settings.ANOMALY_WINDOW_SIZE,
+    refresh_seconds=settings.ANOMALY_REFRESH_SECONDS,
+    max_accounts=settings.ANOMALY_MAX_ACCOUNTS
+)
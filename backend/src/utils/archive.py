@@ -0,0 +1,142 @@
+import time
+from datetime import datetime, UTC
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from ..config.settings import get_settings
+from ..models.banking import ArchivedTransaction, ArchiveWatermark, Transaction
+
+settings = get_settings()
+
+DATE_FIELD = "transaction_date"
+
+
+class WatermarkCache:
+    """
+    Limite d'archivage des transactions, relue au plus toutes les `ttl_seconds`.
+    Le job d'archivage attend plus longtemps que cette durée entre le déplacement de la
+    limite et la suppression des documents copiés : une valeur en cache reste exacte.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._value: Optional[datetime] = None
+        self._expires_at = 0.0
+
+    async def get(self) -> Optional[datetime]:
+        if time.monotonic() < self._expires_at:
+            return self._value
+        state = await ArchiveWatermark.get_motor_collection().find_one({"_id": Transaction.get_settings().name})
+        # Mongo relit des dates naïves, toujours en UTC
+        self._value = state["archived_before"].replace(tzinfo=UTC) if state else None
+        self._expires_at = time.monotonic() + self.ttl_seconds
+        return self._value
+
+    def clear(self) -> None:
+        self._expires_at = 0.0
+
+
+transaction_watermark = WatermarkCache(settings.ARCHIVE_WATERMARK_CACHE_SECONDS)
+
+
+def split_query(query: Dict[str, Any], watermark: Optional[datetime]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """(requête sur les transactions récentes, requête sur l'archive ou None sans archive)"""
+    if watermark is None:
+        return query, None
+    return (
+        {"$and": [query, {DATE_FIELD: {"$gte": watermark}}]},
+        {"$and": [query, {DATE_FIELD: {"$lt": watermark}}]},
+    )
+
+
+async def find_page(query: Dict[str, Any], projection: Dict[str, Any], offset: int, limit: int) -> List[dict]:
+    """
+    Page triée par (transaction_date, _id) décroissants sur les deux niveaux : l'archive
+    n'est lue que si les transactions récentes ne suffisent pas à remplir la page.
+    """
+    watermark = await transaction_watermark.get()
+    hot, cold = split_query(query, watermark)
+    sort = [(DATE_FIELD, -1), ("_id", -1)]
+
+    documents = await Transaction.get_motor_collection().find(
+        hot, projection
+    ).sort(sort).skip(offset).limit(limit).to_list(None)
+    if cold is None or len(documents) == limit:
+        return documents
+
+    skip = 0
+    if not documents and offset:
+        # Page entièrement dans l'archive : le décalage porte sur les deux niveaux
+        skip = max(offset - await Transaction.get_motor_collection().count_documents(hot), 0)
+    documents += await ArchivedTransaction.get_motor_collection().find(
+        cold, projection
+    ).sort(sort).skip(skip).limit(limit - len(documents)).to_list(None)
+    return documents
+
+
+async def find_ascending(
+        query: Dict[str, Any], projection: Dict[str, Any], batch_size: int
+) -> AsyncIterator[dict]:
+    """Tous les documents par (transaction_date, _id) croissants : l'archive, puis les transactions récentes"""
+    watermark = await transaction_watermark.get()
+    hot, cold = split_query(query, watermark)
+    sort = [(DATE_FIELD, 1), ("_id", 1)]
+
+    if cold is not None:
+        async for document in ArchivedTransaction.get_motor_collection().find(
+                cold, projection, batch_size=batch_size
+        ).sort(sort):
+            yield document
+    async for document in Transaction.get_motor_collection().find(
+            hot, projection, batch_size=batch_size
+    ).sort(sort):
+        yield document
+
+
+async def update_tiers(operations: List[UpdateOne]) -> None:
+    """
+    Applique des mises à jour par _id sur les deux niveaux : un document est modifié où
+    qu'il se trouve, y compris copié dans l'archive mais pas encore supprimé.
+    """
+    if not operations:
+        return
+    await Transaction.get_motor_collection().bulk_write(operations, ordered=False)
+    if await transaction_watermark.get() is not None:
+        await ArchivedTransaction.get_motor_collection().bulk_write(operations, ordered=False)
+
+
+def _group_key(group_id: Any) -> Any:
+    return tuple(sorted(group_id.items())) if isinstance(group_id, dict) else group_id
+
+
+async def aggregate_groups(pipeline: List[Dict[str, Any]], since: Optional[datetime] = None) -> List[dict]:
+    """
+    Exécute sur les deux niveaux un pipeline qui se termine par un `$group` à sommes
+    (`$sum`), puis additionne les groupes de même _id. L'archive est ignorée si
+    `since` (borne basse des dates agrégées) est postérieure à la limite d'archivage.
+    """
+    watermark = await transaction_watermark.get()
+    if watermark is None or (since is not None and since >= watermark):
+        return await Transaction.get_motor_collection().aggregate(pipeline, allowDiskUse=True).to_list(None)
+
+    # Chaque niveau n'agrège que sa plage de dates : un document copié mais pas encore
+    # supprimé par le job d'archivage n'est pas compté deux fois
+    hot = await Transaction.get_motor_collection().aggregate(
+        [{"$match": {DATE_FIELD: {"$gte": watermark}}}, *pipeline], allowDiskUse=True
+    ).to_list(None)
+    cold = await ArchivedTransaction.get_motor_collection().aggregate(
+        [{"$match": {DATE_FIELD: {"$lt": watermark}}}, *pipeline], allowDiskUse=True
+    ).to_list(None)
+
+    merged: Dict[Any, dict] = {}
+    for row in hot + cold:
+        key = _group_key(row["_id"])
+        existing = merged.get(key)
+        if existing is None:
+            merged[key] = dict(row)
+        else:
+            for field, value in row.items():
+                if field != "_id":
+                    existing[field] += value
+    return list(merged.values())
@@ -0,0 +1,103 @@
+from datetime import datetime, UTC
+from typing import Any, Dict, Optional, Set
+
+from beanie import PydanticObjectId, UpdateResponse
+from pymongo import UpdateOne
+
+from ..models.banking import Account
+
+
+def _touch(now: datetime) -> Dict[str, Any]:
+    return {"last_transaction": now, "updated_at": now}
+
+
+async def debit_account(
+        query: Dict[str, Any],
+        amount: int,
+        now: Optional[datetime] = None,
+        session=None
+) -> Optional[Account]:
+    """
+    Débite un compte en une seule opération atomique côté serveur.
+
+    Le débit n'est appliqué que si le compte est actif et que `balance >= amount`
+    (montants en centièmes, voir utils.money).
+    Retourne le compte mis à jour, ou None si aucune ligne ne correspond
+    (compte introuvable, inactif ou solde insuffisant).
+    """
+    now = now or datetime.now(UTC)
+    return await Account.find_one(
+        {**query, "is_active": True, "balance": {"$gte": amount}},
+        session=session
+    ).update(
+        {"$inc": {"balance": -amount}, "$set": _touch(now)},
+        response_type=UpdateResponse.NEW_DOCUMENT,
+        session=session
+    )
+
+
+async def credit_account(
+        query: Dict[str, Any],
+        amount: int,
+        now: Optional[datetime] = None,
+        session=None
+) -> Optional[Account]:
+    """
+    Crédite un compte actif via `$inc`, sans lecture préalable.
+    Retourne le compte mis à jour, ou None si le compte est introuvable ou inactif.
+    """
+    now = now or datetime.now(UTC)
+    return await Account.find_one(
+        {**query, "is_active": True},
+        session=session
+    ).update(
+        {"$inc": {"balance": amount}, "$set": _touch(now)},
+        response_type=UpdateResponse.NEW_DOCUMENT,
+        session=session
+    )
+
+
+async def credit_accounts(
+        credits: Dict[PydanticObjectId, int],
+        now: Optional[datetime] = None,
+        session=None
+) -> Set[PydanticObjectId]:
+    """
+    Crédite plusieurs comptes actifs en un seul `bulk_write` (id -> montant en centièmes).
+    Retourne les ids non crédités (compte introuvable ou inactif au moment de l'écriture).
+    """
+    if not credits:
+        return set()
+    now = now or datetime.now(UTC)
+    collection = Account.get_motor_collection()
+    result = await collection.bulk_write(
+        [
+            UpdateOne(
+                {"_id": account_id, "is_active": True},
+                {"$inc": {"balance": amount}, "$set": _touch(now)}
+            )
+            for account_id, amount in credits.items()
+        ],
+        ordered=False,
+        session=session
+    )
+    if result.matched_count == len(credits):
+        return set()
+    # Chemin d'échec uniquement : on identifie les comptes que le filtre a écartés
+    credited = collection.find(
+        {"_id": {"$in": list(credits)}, "is_active": True}, {"_id": 1}, session=session
+    )
+    return set(credits) - {document["_id"] async for document in credited}
+
+
+def by_user(user_id: PydanticObjectId) -> Dict[str, Any]:
+    """Filtre du compte unique d'un utilisateur (lien stocké en DBRef)"""
+    return {"user.$id": user_id}
+
+
+def by_id(account_id: PydanticObjectId) -> Dict[str, Any]:
+    return {"_id": account_id}
+
+
+def by_number(account_number: str) -> Dict[str, Any]:
+    return {"account_number": account_number}
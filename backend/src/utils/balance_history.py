@@ -0,0 +1,99 @@
+from datetime import date, datetime, time, timedelta, UTC
+from itertools import accumulate
+from typing import List, Optional, Tuple
+
+from beanie import PydanticObjectId
+from pymongo import UpdateOne
+
+from ..models.analytics import DailyBalance
+from ..models.banking import TransactionStatus
+from .archive import aggregate_groups
+
+
+def day_key(value: date) -> str:
+    return value.isoformat()
+
+
+def start_of_day(value: date) -> datetime:
+    return datetime.combine(value, time.min, tzinfo=UTC)
+
+
+async def latest_daily_balance(account_id: PydanticObjectId, before: Optional[str] = None) -> Optional[DailyBalance]:
+    query: dict = {"account_id": account_id}
+    if before is not None:
+        query["day"] = {"$lt": before}
+    return await DailyBalance.find(query).sort([("day", -1)]).first_or_none()
+
+
+async def extend_daily_balances(account_id: PydanticObjectId, currency: str, today: date) -> None:
+    """
+    Complète les soldes de fin de journée jusqu'à la veille de `today`.
+
+    Seules les transactions postérieures au dernier jour enregistré sont agrégées (une
+    somme par jour côté serveur), puis cumulées à partir du dernier solde connu. Au
+    premier appel, tout l'historique du compte est parcouru une fois.
+    """
+    latest = await latest_daily_balance(account_id)
+    date_range = {"$lt": start_of_day(today)}
+    if latest is not None:
+        date_range["$gte"] = start_of_day(date.fromisoformat(latest.day) + timedelta(days=1))
+
+    days = await aggregate_groups([
+        {"$match": {
+            "account.$id": account_id,
+            "status": TransactionStatus.COMPLETED.value,
+            "transaction_date": date_range,
+        }},
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$transaction_date"}},
+            "total": {"$sum": "$amount"},
+        }},
+    ], since=date_range.get("$gte"))
+    days.sort(key=lambda day: day["_id"])
+    if not days:
+        return
+
+    opening = latest.balance if latest else 0
+    balances = accumulate((day["total"] for day in days), initial=opening)
+    next(balances)  # Solde d'ouverture
+    # Upserts à _id déterministe : deux requêtes concurrentes écrivent les mêmes valeurs
+    await DailyBalance.get_motor_collection().bulk_write(
+        [
+            UpdateOne(
+                {"_id": f"{account_id}:{day['_id']}"},
+                {"$set": {"account_id": account_id, "day": day["_id"], "balance": balance, "currency": currency}},
+                upsert=True
+            )
+            for day, balance in zip(days, balances)
+        ],
+        ordered=False
+    )
+
+
+async def balance_series(
+        account_id: PydanticObjectId,
+        first_day: date,
+        today: date,
+        current_balance: int
+) -> List[Tuple[str, int]]:
+    """Solde de fin de journée de `first_day` à `today` inclus ; aujourd'hui = solde courant"""
+    first_key = day_key(first_day)
+    opening = await latest_daily_balance(account_id, before=first_key)
+    changes = {
+        snapshot.day: snapshot.balance
+        async for snapshot in DailyBalance.find({
+            "account_id": account_id,
+            "day": {"$gte": first_key, "$lt": day_key(today)},
+        })
+    }
+
+    series = []
+    balance = opening.balance if opening else 0
+    day = first_day
+    while day < today:
+        key = day_key(day)
+        balance = changes.get(key, balance)
+        series.append((key, balance))
+        day += timedelta(days=1)
+    series.append((day_key(today), current_balance))
+    return series
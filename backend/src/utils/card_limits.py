@@ -0,0 +1,247 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta, UTC
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from beanie import PydanticObjectId
+from pymongo import UpdateOne
+
+from ..config.settings import get_settings
+from ..models.banking import Card, CardSpendBucket, CardStatus
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SPEND_WINDOW = timedelta(hours=24)
+BUCKET_SECONDS = 15 * 60
+BUCKETS_PER_WINDOW = int(SPEND_WINDOW.total_seconds()) // BUCKET_SECONDS
+
+CARD_STATE_PROJECTION = {"user": 1, "daily_limit": 1, "status": 1, "expiry_date": 1}
+
+
+def bucket_index(moment: datetime) -> int:
+    return int(moment.timestamp()) // BUCKET_SECONDS
+
+
+def bucket_start(index: int) -> datetime:
+    return datetime.fromtimestamp(index * BUCKET_SECONDS, UTC)
+
+
+def bucket_id(card_id: PydanticObjectId, index: int) -> str:
+    return f"{card_id}:{index}"
+
+
+class AuthorizationDecision(NamedTuple):
+    approved: bool
+    reason: Optional[str]
+    daily_limit: int  # En centièmes, comme les montants suivants
+    spent: int
+    remaining: int
+
+
+class CardWindow:
+    """État en mémoire d'une carte : plafond, statut et dépenses par tranche de 15 minutes"""
+    __slots__ = ("card_id", "user_id", "daily_limit", "status", "expiry_date", "buckets", "pending", "last_used")
+
+    def __init__(self, card: dict):
+        self.card_id: PydanticObjectId = card["_id"]
+        self.user_id: PydanticObjectId = card["user"].id
+        self.buckets: Dict[int, int] = {}
+        # Montants autorisés ici et pas encore reportés en base : (montant, nombre)
+        self.pending: Dict[int, Tuple[int, int]] = {}
+        self.last_used = datetime.now(UTC)
+        self.apply_card(card)
+
+    def apply_card(self, card: dict) -> None:
+        self.daily_limit: int = card["daily_limit"]
+        self.status: str = card["status"]
+        expiry = card["expiry_date"]
+        self.expiry_date: date = expiry.date() if isinstance(expiry, datetime) else expiry
+
+    def spent(self, current: int) -> int:
+        oldest = current - BUCKETS_PER_WINDOW + 1
+        return sum(amount for index, amount in self.buckets.items() if index >= oldest)
+
+    def prune(self, current: int) -> None:
+        oldest = current - BUCKETS_PER_WINDOW + 1
+        for index in [index for index in self.buckets if index < oldest and index not in self.pending]:
+            del self.buckets[index]
+
+
+class CardAuthorizer:
+    """
+    Autorisations de carte contre le plafond glissant de 24 h, décidées en mémoire.
+
+    Chaque worker garde une fenêtre par carte utilisée (chargée une fois depuis
+    `card_spend_buckets`). Les montants autorisés sont reportés périodiquement par `$inc`
+    atomiques, puis chaque fenêtre est réalignée sur les totaux en base, qui incluent
+    les autorisations des autres workers. Entre deux reports, un dépassement est
+    possible à hauteur de ce que les autres workers ont autorisé sur la même carte.
+    """
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self.windows: Dict[PydanticObjectId, CardWindow] = {}
+        self._loading: Dict[PydanticObjectId, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def window(self, card_id: PydanticObjectId, user_id: PydanticObjectId) -> Optional[CardWindow]:
+        """Fenêtre de la carte si elle appartient à l'utilisateur (chargée à la première utilisation)"""
+        window = self.windows.get(card_id)
+        if window is None:
+            task = self._loading.get(card_id)
+            if task is None:
+                task = asyncio.create_task(self._load(card_id))
+                self._loading[card_id] = task
+                task.add_done_callback(lambda _: self._loading.pop(card_id, None))
+            window = await asyncio.shield(task)
+        if window is None or window.user_id != user_id:
+            return None
+        return window
+
+    async def _load(self, card_id: PydanticObjectId) -> Optional[CardWindow]:
+        card = await Card.get_motor_collection().find_one({"_id": card_id}, CARD_STATE_PROJECTION)
+        if not card:
+            return None
+        window = CardWindow(card)
+        oldest = bucket_index(datetime.now(UTC)) - BUCKETS_PER_WINDOW + 1
+        async for bucket in CardSpendBucket.get_motor_collection().find(
+                {"card_id": card_id, "bucket_start": {"$gte": bucket_start(oldest)}},
+                {"bucket_start": 1, "amount": 1}
+        ):
+            window.buckets[bucket_index(bucket["bucket_start"].replace(tzinfo=UTC))] = bucket["amount"]
+        # Une autorisation a pu arriver pendant le chargement (autre fenêtre déjà en place)
+        return self.windows.setdefault(card_id, window)
+
+    def authorize(self, window: CardWindow, amount: int, now: Optional[datetime] = None) -> AuthorizationDecision:
+        """Décision synchrone : aucun aller-retour base entre la vérification et l'imputation"""
+        now = now or datetime.now(UTC)
+        current = bucket_index(now)
+        window.last_used = now
+        spent = window.spent(current)
+
+        reason = None
+        if window.status != CardStatus.ACTIVE.value:
+            reason = "card_inactive"
+        elif window.expiry_date < now.date():
+            reason = "card_expired"
+        elif spent + amount > window.daily_limit:
+            reason = "daily_limit_exceeded"
+
+        if reason is None:
+            window.buckets[current] = window.buckets.get(current, 0) + amount
+            pending_amount, pending_count = window.pending.get(current, (0, 0))
+            window.pending[current] = (pending_amount + amount, pending_count + 1)
+            spent += amount
+
+        return AuthorizationDecision(
+            approved=reason is None,
+            reason=reason,
+            daily_limit=window.daily_limit,
+            spent=spent,
+            remaining=max(window.daily_limit - spent, 0)
+        )
+
+    async def flush(self) -> None:
+        """Reporte les montants en attente (`$inc`) et réaligne toutes les fenêtres sur la base"""
+        if not self.windows:
+            return
+        now = datetime.now(UTC)
+        current = bucket_index(now)
+
+        flushed: Dict[PydanticObjectId, Dict[int, Tuple[int, int]]] = {}
+        for window in self.windows.values():
+            if window.pending:
+                flushed[window.card_id], window.pending = window.pending, {}
+
+        operations = [
+            UpdateOne(
+                {"_id": bucket_id(card_id, index)},
+                {
+                    "$inc": {"amount": amount, "authorizations": count},
+                    "$setOnInsert": {"card_id": card_id, "bucket_start": bucket_start(index)},
+                },
+                upsert=True
+            )
+            for card_id, pending in flushed.items()
+            for index, (amount, count) in pending.items()
+        ]
+        try:
+            if operations:
+                await CardSpendBucket.get_motor_collection().bulk_write(operations, ordered=False)
+        except Exception:
+            # Rien n'est perdu : les montants repartent au prochain report
+            for card_id, pending in flushed.items():
+                window = self.windows.get(card_id)
+                if window is not None:
+                    for index, (amount, count) in pending.items():
+                        pending_amount, pending_count = window.pending.get(index, (0, 0))
+                        window.pending[index] = (pending_amount + amount, pending_count + count)
+            raise
+
+        await self._reconcile(current)
+
+        # Les cartes inutilisées depuis une fenêtre entière sont déchargées
+        idle = now - SPEND_WINDOW
+        for card_id in [card_id for card_id, window in self.windows.items() if window.last_used < idle and not window.pending]:
+            del self.windows[card_id]
+
+    async def _reconcile(self, current: int) -> None:
+        card_ids: List[PydanticObjectId] = list(self.windows)
+        oldest = current - BUCKETS_PER_WINDOW + 1
+
+        persisted: Dict[PydanticObjectId, Dict[int, int]] = defaultdict(dict)
+        async for bucket in CardSpendBucket.get_motor_collection().find(
+                {"card_id": {"$in": card_ids}, "bucket_start": {"$gte": bucket_start(oldest)}},
+                {"card_id": 1, "bucket_start": 1, "amount": 1}
+        ):
+            persisted[bucket["card_id"]][bucket_index(bucket["bucket_start"].replace(tzinfo=UTC))] = bucket["amount"]
+        cards = {
+            card["_id"]: card
+            async for card in Card.get_motor_collection().find({"_id": {"$in": card_ids}}, CARD_STATE_PROJECTION)
+        }
+
+        for card_id in card_ids:
+            window = self.windows.get(card_id)
+            if window is None:
+                continue
+            if card_id not in cards:
+                del self.windows[card_id]
+                continue
+            window.apply_card(cards[card_id])
+            # Totaux en base + autorisations arrivées pendant le report
+            buckets = dict(persisted.get(card_id, {}))
+            for index, (amount, _) in window.pending.items():
+                buckets[index] = buckets.get(index, 0) + amount
+            window.buckets = buckets
+            window.prune(current)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Échec du report des compteurs de cartes: {str(e)}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Arrête le report périodique et reporte une dernière fois (arrêt de l'application)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Échec du report final des compteurs de cartes: {str(e)}")
+
+
+card_authorizer = CardAuthorizer(flush_interval=settings.CARD_COUNTER_FLUSH_INTERVAL_SECONDS)
@@ -0,0 +1,159 @@
+import unicodedata
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from ..models.banking import TransactionCategory, TransactionType
+
+# Mots-clés par catégorie, comparés en début de mot (espace final : mot entier), sans accents ni casse.
+# Le mot-clé le plus long l'emporte : « uber eats » (restaurants) avant « uber » (transports).
+CATEGORY_KEYWORDS: Dict[TransactionCategory, Tuple[str, ...]] = {
+    TransactionCategory.GROCERIES: (
+        "supermarche", "supermarket", "epicerie", "grocery", "groceries", "carrefour", "auchan",
+        "leclerc", "lidl", "aldi", "intermarche", "monoprix", "casino", "franprix", "marche",
+        "boulangerie", "bakery", "boucherie", "walmart", "costco",
+    ),
+    TransactionCategory.DINING: (
+        "restaurant", "resto", "cafe", "coffee", "starbucks", "mcdonald", "burger", "pizza",
+        "kfc", "brasserie", "bistro", "bar ", "uber eats", "ubereats", "deliveroo", "just eat",
+        "dejeuner", "diner", "lunch", "dinner",
+    ),
+    TransactionCategory.TRANSPORT: (
+        "uber", "bolt", "taxi", "vtc", "sncf", "ratp", "metro", "navigo", "train", "bus ",
+        "essence", "carburant", "fuel", "gasoil", "total energies station", "shell", "esso",
+        "parking", "peage", "toll", "air france", "airline", "billet d avion", "flight",
+    ),
+    TransactionCategory.HOUSING: (
+        "loyer", "rent", "bail", "charges locatives", "syndic", "hypotheque", "mortgage",
+        "credit immobilier", "airbnb", "hotel",
+    ),
+    TransactionCategory.UTILITIES: (
+        "electricite", "electricity", "edf", "engie", "gaz", "eau ", "water bill", "internet",
+        "orange", "sfr", "bouygues", "free mobile", "mtn", "moov", "telephone", "phone bill",
+        "facture", "senelec", "cie ", "sodeci",
+    ),
+    TransactionCategory.HEALTH: (
+        "pharmacie", "pharmacy", "medecin", "docteur", "doctor", "clinique", "clinic",
+        "hopital", "hospital", "dentiste", "dentist", "mutuelle", "optique", "laboratoire",
+    ),
+    TransactionCategory.ENTERTAINMENT: (
+        "netflix", "spotify", "deezer", "disney", "canal", "cinema", "movie", "concert",
+        "theatre", "steam", "playstation", "xbox", "abonnement", "subscription", "gym",
+        "salle de sport", "fitness",
+    ),
+    TransactionCategory.SHOPPING: (
+        "amazon", "fnac", "darty", "ikea", "zara", "h m", "decathlon", "boutique", "shop",
+        "vetements", "clothes", "jumia", "cdiscount", "aliexpress", "achat",
+    ),
+    TransactionCategory.EDUCATION: (
+        "ecole", "school", "scolarite", "tuition", "universite", "university", "formation",
+        "cours", "course", "inscription", "librairie", "fournitures scolaires",
+    ),
+    TransactionCategory.CASH: (
+        "retrait", "withdrawal", "atm", "distributeur", "dab", "especes", "cash",
+    ),
+    TransactionCategory.TRANSFER: (
+        "transfert", "transfer", "virement", "remboursement", "reimbursement",
+    ),
+}
+
+# Catégorie retenue quand aucun mot-clé ne correspond
+TYPE_DEFAULTS: Dict[str, TransactionCategory] = {
+    TransactionType.DEPOSIT.value: TransactionCategory.INCOME,
+    TransactionType.WITHDRAWAL.value: TransactionCategory.CASH,
+    TransactionType.TRANSFER.value: TransactionCategory.TRANSFER,
+}
+
+
+def _normalization_table() -> Dict[int, str]:
+    """Table de `str.translate` : accents latins retirés, ponctuation ASCII remplacée par des espaces"""
+    table = {ord(char): " " for char in "!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~\t\n\r"}
+    for code in range(0xC0, 0x250):
+        char = chr(code)
+        base = unicodedata.normalize("NFKD", char).encode("ascii", "ignore").decode()
+        if base and base != char:
+            table[code] = base.lower()
+    return table
+
+
+NORMALIZATION = _normalization_table()
+
+
+def normalize(text: str) -> str:
+    # Espaces aux bords : « bar » se compare comme « bar » en début et en fin de texte
+    return f" {text.lower().translate(NORMALIZATION)} "
+
+
+class KeywordMatcher:
+    """
+    Automate d'Aho-Corasick : trouve en une seule passe sur le texte le plus long des
+    mots-clés présents, quel que soit le nombre de mots-clés.
+    """
+    __slots__ = ("_goto", "_fail", "_best")
+
+    def __init__(self, keywords: Dict[str, str]):
+        goto: List[Dict[str, int]] = [{}]
+        best: List[Optional[Tuple[int, str]]] = [None]
+        for keyword, label in keywords.items():
+            node = 0
+            for char in keyword:
+                child = goto[node].get(char)
+                if child is None:
+                    child = len(goto)
+                    goto[node][char] = child
+                    goto.append({})
+                    best.append(None)
+                node = child
+            best[node] = (len(keyword), label)
+
+        # Liens d'échec en largeur ; chaque état hérite du plus long mot-clé terminé
+        # par son suffixe (toujours plus court que son propre mot-clé)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(char, 0)
+                if best[child] is None:
+                    best[child] = best[fail[child]]
+                queue.append(child)
+
+        self._goto = goto
+        self._fail = fail
+        self._best = best
+
+    def search(self, text: str) -> Optional[str]:
+        goto, fail, best = self._goto, self._fail, self._best
+        node = 0
+        found: Optional[Tuple[int, str]] = None
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            match = best[node]
+            if match is not None and (found is None or match[0] > found[0]):
+                found = match
+        return found[1] if found is not None else None
+
+
+# Construit une fois par worker, à l'import
+matcher = KeywordMatcher({
+    f" {keyword}": category.value
+    for category, keywords in CATEGORY_KEYWORDS.items()
+    for keyword in keywords
+})
+
+
+@lru_cache(maxsize=65536)
+def categorize(description: str, transaction_type: str) -> str:
+    """
+    Catégorie d'une transaction. Les crédits sont des revenus ; pour les débits, la
+    description est comparée aux mots-clés, à défaut la catégorie dépend du type.
+    """
+    if transaction_type == TransactionType.DEPOSIT.value:
+        return TransactionCategory.INCOME.value
+    found = matcher.search(normalize(description)) if description else None
+    return found or TYPE_DEFAULTS.get(transaction_type, TransactionCategory.OTHER).value
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, UTC
+from typing import Awaitable, Callable, Dict, Optional, Sequence
+
+import httpx
+import numpy as np
+
+from ..config.settings import get_settings
+from ..models.banking import Currency, ExchangeRate
+from .rate_history import record_snapshot
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+RatesFetcher = Callable[[], Awaitable[Dict[str, float]]]
+
+# Délai minimal entre deux tentatives après un échec de l'API externe
+RETRY_INTERVAL_SECONDS = 60
+
+STUB_RATES: Dict[str, float] = {"USD": 1.0, "EUR": 0.93, "XOF": 607.5}
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(timeout=10.0)
+    return _http_client
+
+
+async def fetch_rates_from_api() -> Dict[str, float]:
+    """Récupère les taux (base USD) depuis l'API externe"""
+    response = await _get_http_client().get(f"{settings.EXCHANGE_API_BASE_URL}/{Currency.USD.value}")
+    response.raise_for_status()
+    return response.json()["rates"]
+
+
+async def fetch_stub_rates() -> Dict[str, float]:
+    """Taux fixes locaux, pour les tests et le développement hors ligne"""
+    return dict(STUB_RATES)
+
+
+class CrossRateMatrix:
+    """
+    Matrice N×N des taux croisés, précalculée à partir des taux en base USD.
+    `matrix[i, j]` convertit une unité de `codes[i]` en `codes[j]`.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        self.codes = sorted(code for code, rate in rates.items() if rate and rate > 0)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        usd_rates = np.array([rates[code] for code in self.codes], dtype=np.float64)
+        # (USD -> j) / (USD -> i) = (i -> j)
+        self.matrix = usd_rates[np.newaxis, :] / usd_rates[:, np.newaxis]
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.index
+
+    def rate(self, from_code: str, to_code: str) -> float:
+        return float(self.matrix[self.index[from_code], self.index[to_code]])
+
+    def indices(self, codes: Sequence[str]) -> np.ndarray:
+        """Indices des devises ; lève KeyError sur une devise inconnue"""
+        index = self.index
+        return np.fromiter((index[code] for code in codes), dtype=np.intp, count=len(codes))
+
+    def convert(self, from_idx: np.ndarray, to_idx: np.ndarray, amounts: np.ndarray):
+        """Conversion vectorisée ; retourne (taux appliqués, montants convertis)"""
+        applied = self.matrix[from_idx, to_idx]
+        return applied, amounts * applied
+
+
+class ExchangeRateCache:
+    """
+    Table des taux en mémoire, partagée par tout le processus.
+
+    Les taux frais sont servis sans I/O. Des taux expirés sont servis tels quels
+    pendant qu'un rafraîchissement unique est lancé en arrière-plan
+    (stale-while-revalidate). Les rafraîchissements concurrents partagent la même tâche.
+    """
+
+    def __init__(self, fetcher: RatesFetcher, ttl_seconds: int):
+        self.fetcher = fetcher
+        self.ttl_seconds = ttl_seconds
+        self.rates: Dict[str, float] = {}
+        self.matrix: Optional[CrossRateMatrix] = None
+        self.last_updated: Optional[datetime] = None
+        self._fetched_at = 0.0
+        self._last_attempt = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def is_fresh(self) -> bool:
+        return bool(self.rates) and time.monotonic() - self._fetched_at < self.ttl_seconds
+
+    def _store(self, rates: Dict[str, float], last_updated: datetime) -> None:
+        # La matrice est reconstruite à chaque rafraîchissement puis publiée d'un bloc
+        self.matrix = CrossRateMatrix(rates)
+        self.rates = rates
+        self.last_updated = last_updated
+        age = (datetime.now(UTC) - last_updated.replace(tzinfo=last_updated.tzinfo or UTC)).total_seconds()
+        self._fetched_at = time.monotonic() - max(age, 0.0)
+
+    async def _refresh(self) -> None:
+        self._last_attempt = time.monotonic()
+        try:
+            # Au démarrage, les derniers taux persistés évitent un appel externe
+            if not self.rates:
+                persisted = await ExchangeRate.find_one({})
+                if persisted:
+                    self._store(persisted.rates, persisted.last_updated)
+                    if self.is_fresh():
+                        return
+
+            rates = await self.fetcher()
+            now = datetime.now(UTC)
+            self._store(rates, now)
+            await ExchangeRate.find_one().upsert(
+                {"$set": {"rates": rates, "last_updated": now}},
+                on_insert=ExchangeRate(base_currency=Currency.USD, rates=rates, last_updated=now)
+            )
+            await record_snapshot(rates, now)
+        except Exception as e:
+            logger.error(f"Erreur lors de la mise à jour des taux: {str(e)}")
+
+    def refresh(self) -> asyncio.Task:
+        """Lance un rafraîchissement, ou retourne celui déjà en cours"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+        return self._refresh_task
+
+    async def get_rates(self) -> Dict[str, float]:
+        if self.is_fresh():
+            return self.rates
+
+        if self.rates:
+            if time.monotonic() - self._last_attempt >= RETRY_INTERVAL_SECONDS:
+                self.refresh()
+            return self.rates
+
+        # Cache vide : tous les appelants attendent le même rafraîchissement
+        await asyncio.shield(self.refresh())
+        return self.rates
+
+    async def get_matrix(self) -> Optional[CrossRateMatrix]:
+        await self.get_rates()
+        return self.matrix
+
+    async def close(self) -> None:
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
+
+
+exchange_rate_cache = ExchangeRateCache(
+    fetcher=fetch_stub_rates if settings.EXCHANGE_RATE_USE_STUB else fetch_rates_from_api,
+    ttl_seconds=settings.EXCHANGE_RATE_CACHE_DURATION
+)
+
+
+async def close_exchange_client() -> None:
+    """Arrête le rafraîchissement en cours et ferme le client HTTP partagé"""
+    global _http_client
+    await exchange_rate_cache.close()
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
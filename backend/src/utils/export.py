@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+from datetime import UTC
+from typing import AsyncIterator, Dict, Any
+
+from .money import from_minor
+
+EXPORT_FIELDS = [
+    "transaction_id", "transaction_date", "transaction_type", "amount", "currency",
+    "description", "category", "status", "recipient_name", "recipient_account_number",
+]
+
+# Taille cible d'un morceau envoyé au client : la mémoire reste bornée quel que
+# soit le nombre de lignes exportées
+CHUNK_SIZE = 64 * 1024
+
+
+def export_row(document: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "transaction_id": document["transaction_id"],
+        # Mongo relit des dates naïves, toujours en UTC
+        "transaction_date": document["transaction_date"].replace(
+            tzinfo=document["transaction_date"].tzinfo or UTC
+        ).isoformat(),
+        "transaction_type": document["transaction_type"],
+        "amount": str(from_minor(document["amount"])),
+        "currency": document["currency"],
+        "description": document.get("description", ""),
+        "category": document.get("category"),
+        "status": document["status"],
+        "recipient_name": document.get("recipient_name"),
+        "recipient_account_number": document.get("recipient_account_number"),
+    }
+
+
+async def stream_csv(cursor: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Encode un curseur Motor en CSV, par morceaux d'environ CHUNK_SIZE octets"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+
+    async for document in cursor:
+        writer.writerow(export_row(document))
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def stream_ndjson(cursor: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Encode un curseur Motor en NDJSON (un objet JSON par ligne)"""
+    parts = []
+    size = 0
+    async for document in cursor:
+        line = json.dumps(export_row(document), ensure_ascii=False) + "\n"
+        parts.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield "".join(parts).encode()
+            parts = []
+            size = 0
+
+    if parts:
+        yield "".join(parts).encode()
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Generic, List, Optional, Set, Tuple, Type, TypeVar
+
+from beanie import Document
+from beanie.odm.utils.dump import get_dict
+from pymongo.errors import BulkWriteError
+
+from ..config.settings import get_settings
+from ..models.banking import Transaction
+from .metrics import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+D = TypeVar("D", bound=Document)
+
+
+class GroupCommitMetrics:
+    """Compteurs du regroupement d'insertions (taille des lots, latence des flushs)"""
+
+    def __init__(self):
+        self.flushes = 0
+        self.documents = 0
+        self.failed = 0
+        self.max_batch = 0
+        self.last_batch = 0
+        self.flush_latency = LatencyRecorder()
+        self.wait_latency = LatencyRecorder()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.TRANSACTION_GROUP_COMMIT_ENABLED,
+            "flushes": self.flushes,
+            "documents": self.documents,
+            "failed": self.failed,
+            "avg_batch": round(self.documents / self.flushes, 2) if self.flushes else 0.0,
+            "max_batch": self.max_batch,
+            "last_batch": self.last_batch,
+            "flush_latency": self.flush_latency.snapshot(),
+            "wait_latency": self.wait_latency.snapshot(),
+        }
+
+
+class GroupCommitter(Generic[D]):
+    """
+    Regroupe les insertions concurrentes d'un modèle en un seul `insert_many`.
+
+    Un lot part dès qu'il atteint `max_batch` documents, ou `max_delay_ms` après son
+    premier document. Chaque appelant attend l'acquittement de son propre document
+    (même write concern qu'un `insert()` isolé) et reçoit sa propre erreur éventuelle.
+
+    Une insertion faite dans une session reste immédiate : elle appartient à la
+    transaction MongoDB de sa requête et ne peut pas être partagée avec d'autres. Seuls
+    les documents d'un même appel y sont regroupés (un seul `insert_many` au lieu d'un
+    aller-retour par document). Avec MONGODB_TRANSACTIONS_ENABLED, toutes les insertions
+    des opérations monétaires passent par une session : le regroupement entre requêtes
+    ne s'applique alors pas (cf. `check_configuration`).
+    """
+
+    def __init__(self, model: Type[D], max_batch: int, max_delay_ms: float):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_delay_ms = max_delay_ms
+        self.metrics = GroupCommitMetrics()
+        self._pending: List[Tuple[D, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def insert(self, document: D, session=None) -> D:
+        await self.insert_many([document], session=session)
+        return document
+
+    async def insert_many(self, documents: List[D], session=None) -> List[D]:
+        """Insère les documents (dans l'ordre) et attend leur acquittement"""
+        if session is not None and len(documents) > 1:
+            # Les opérations d'une même session ne peuvent pas être concurrentes :
+            # regroupement limité aux documents de cet appel
+            raw = [self._to_raw(document) for document in documents]
+            await self.model.get_motor_collection().insert_many(raw, session=session)
+            for document, document_dict in zip(documents, raw):
+                document.id = document_dict["_id"]
+            return documents
+        if session is not None or not settings.TRANSACTION_GROUP_COMMIT_ENABLED:
+            for document in documents:
+                await document.insert(session=session)
+            return documents
+
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        futures = []
+        for document in documents:
+            future = loop.create_future()
+            self._pending.append((document, future))
+            futures.append(future)
+
+        if len(self._pending) >= self.max_batch:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay_ms / 1000, self._start_flush)
+
+        try:
+            await asyncio.gather(*futures)
+        finally:
+            self.metrics.wait_latency.observe((time.perf_counter() - started) * 1000)
+        return documents
+
+    def check_configuration(self) -> None:
+        """Signale au démarrage un regroupement activé mais sans effet"""
+        if settings.TRANSACTION_GROUP_COMMIT_ENABLED and settings.MONGODB_TRANSACTIONS_ENABLED:
+            logger.warning(
+                "TRANSACTION_GROUP_COMMIT_ENABLED est sans effet entre requêtes tant que "
+                "MONGODB_TRANSACTIONS_ENABLED est actif : les insertions faites en transaction "
+                "ne sont regroupées qu'au sein d'une même opération"
+            )
+
+    @staticmethod
+    def _to_raw(document: D) -> Dict[str, Any]:
+        return get_dict(document, to_db=True, keep_nulls=document.get_settings().keep_nulls)
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            task = asyncio.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[D, asyncio.Future]]) -> None:
+        raw = [self._to_raw(document) for document, _ in batch]
+        errors: Dict[int, Exception] = {}
+        started = time.perf_counter()
+        try:
+            await self.model.get_motor_collection().insert_many(raw, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                errors[error["index"]] = BulkWriteError({"writeErrors": [error]})
+        except Exception as e:
+            logger.error(f"Échec de l'insertion groupée ({len(batch)} documents): {str(e)}")
+            errors = {index: e for index in range(len(batch))}
+
+        self.metrics.flush_latency.observe((time.perf_counter() - started) * 1000)
+        self.metrics.flushes += 1
+        self.metrics.documents += len(batch)
+        self.metrics.failed += len(errors)
+        self.metrics.last_batch = len(batch)
+        self.metrics.max_batch = max(self.metrics.max_batch, len(batch))
+
+        for index, ((document, future), document_dict) in enumerate(zip(batch, raw)):
+            if future.done():
+                continue
+            if index in errors:
+                future.set_exception(errors[index])
+            else:
+                # pymongo complète `_id` dans le dict inséré
+                document.id = document_dict["_id"]
+                future.set_result(None)
+
+    async def close(self) -> None:
+        """Vide la file (arrêt de l'application)"""
+        self._start_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+
+transaction_inserts: GroupCommitter[Transaction] = GroupCommitter(
+    Transaction,
+    max_batch=settings.TRANSACTION_GROUP_COMMIT_MAX_BATCH,
+    max_delay_ms=settings.TRANSACTION_GROUP_COMMIT_MAX_DELAY_MS
+)
@@ -0,0 +1,159 @@
+import hashlib
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timedelta, UTC
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from beanie import PydanticObjectId
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+from pymongo.errors import DuplicateKeyError
+
+from ..config.settings import get_settings
+from ..models.idempotency import IdempotencyRecord
+
+settings = get_settings()
+
+REPLAY_HEADER = "Idempotent-Replayed"
+
+# Réservation de la requête en cours : {"record_id", "token", "status_code", "in_transaction"}
+_pending: ContextVar[Optional[Dict[str, Any]]] = ContextVar("idempotency_pending", default=None)
+
+
+def _fingerprint(payload: BaseModel) -> str:
+    return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()[:32]
+
+
+def _replay(record: IdempotencyRecord, fingerprint: str, response: Optional[Response]) -> Dict[str, Any]:
+    if record.fingerprint != fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key already used with a different request body"
+        )
+    if not record.completed:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is already in progress"
+        )
+    if response is not None:
+        response.headers[REPLAY_HEADER] = "true"
+        if record.status_code:
+            response.status_code = record.status_code
+    return record.response
+
+
+async def _acquire(record_id: str, fingerprint: str, token: str) -> Optional[IdempotencyRecord]:
+    """
+    Réserve la clé en insérant un enregistrement en attente.
+    Retourne None si la réservation a réussi, sinon l'enregistrement existant.
+
+    Avec les transactions MongoDB, la réponse est enregistrée dans la transaction qui
+    déplace l'argent : une réservation restée en attente au-delà du délai n'a donc rien
+    validé et peut être reprise. Sans transactions, l'opération a pu aboutir avant l'arrêt
+    du processus, sans que sa réponse soit enregistrée : la réservation n'est jamais
+    reprise et la clé reste bloquée (409) jusqu'à son expiration.
+    """
+    existing = await IdempotencyRecord.get(record_id)
+    if existing:
+        timeout = timedelta(seconds=settings.IDEMPOTENCY_PENDING_TIMEOUT_SECONDS)
+        created_at = existing.created_at.replace(tzinfo=existing.created_at.tzinfo or UTC)
+        if (
+                existing.completed
+                or not settings.MONGODB_TRANSACTIONS_ENABLED
+                or datetime.now(UTC) - created_at < timeout
+        ):
+            return existing
+        # Réservation orpheline (processus interrompu avant tout commit) : on la reprend
+        await IdempotencyRecord.get_motor_collection().delete_one({"_id": record_id, "token": existing.token})
+
+    try:
+        await IdempotencyRecord(id=record_id, fingerprint=fingerprint, token=token).insert()
+    except DuplicateKeyError:
+        return await IdempotencyRecord.get(record_id)
+    return None
+
+
+async def _complete(pending: Dict[str, Any], result: BaseModel, session=None) -> None:
+    """Enregistre la réponse sur la réservation, à condition qu'elle n'ait pas été reprise"""
+    updated = await IdempotencyRecord.get_motor_collection().update_one(
+        {"_id": pending["record_id"], "token": pending["token"]},
+        {"$set": {
+            "completed": True,
+            "status_code": pending["status_code"],
+            "response": result.model_dump(mode="json"),
+        }},
+        session=session
+    )
+    if updated.matched_count == 0:
+        # La réservation a expiré et été reprise : cette exécution ne doit rien valider
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is already in progress"
+        )
+
+
+async def complete_in_transaction(result: BaseModel, session) -> None:
+    """
+    Enregistre la réponse de la requête idempotente en cours dans la transaction
+    MongoDB qui déplace l'argent : le même commit valide le mouvement et la réponse
+    à rejouer. Sans session (transactions désactivées) ou sans clé, ne fait rien ;
+    run_idempotent enregistre alors la réponse après coup.
+    """
+    pending = _pending.get()
+    if pending is None or session is None:
+        return
+    await _complete(pending, result, session=session)
+    # Rien n'est acquis avant le commit : seul run_idempotent, au retour du handler, le sait
+    pending["in_transaction"] = True
+
+
+async def run_idempotent(
+        user_id: PydanticObjectId,
+        scope: str,
+        key: Optional[str],
+        payload: BaseModel,
+        handler: Callable[[], Awaitable[BaseModel]],
+        response: Optional[Response] = None
+) -> Any:
+    """
+    Exécute `handler` au plus une fois par (utilisateur, scope, Idempotency-Key).
+
+    Une requête répétée avec la même clé et le même corps rejoue la première
+    réponse en une lecture indexée. Sans clé, `handler` est simplement exécuté.
+    Les erreurs ne sont pas mémorisées : la clé est libérée pour un nouvel essai.
+    `handler` appelle complete_in_transaction dans sa transaction MongoDB.
+    """
+    if not key:
+        return await handler()
+
+    record_id = f"{user_id}:{scope}:{key}"
+    fingerprint = _fingerprint(payload)
+    token = uuid.uuid4().hex
+
+    existing = await _acquire(record_id, fingerprint, token)
+    if existing:
+        return _replay(existing, fingerprint, response)
+
+    pending = {
+        "record_id": record_id,
+        "token": token,
+        "status_code": response.status_code if response is not None else None,
+        "in_transaction": False,
+    }
+    reset = _pending.set(pending)
+    try:
+        result = await handler()
+    except BaseException:
+        # Libère la clé si rien n'a été validé : une réponse écrite dans une transaction
+        # annulée n'existe pas, une réponse validée avec le mouvement d'argent est conservée
+        await IdempotencyRecord.get_motor_collection().delete_one(
+            {"_id": record_id, "token": token, "completed": False}
+        )
+        raise
+    finally:
+        _pending.reset(reset)
+
+    # Handler terminé : sa transaction est validée, réponse comprise
+    if not pending["in_transaction"]:
+        await _complete(pending, result)
+    return result
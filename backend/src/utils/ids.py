@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, UTC
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from ..config.settings import get_settings
+from ..models.ids import WorkerIdLease
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Identifiant 64 bits façon Snowflake : millisecondes depuis EPOCH | worker | séquence
+EPOCH_MS = 1_704_067_200_000  # 2024-01-01T00:00:00Z
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+# Base 32 de Crockford : l'ordre alphabétique des chaînes suit l'ordre numérique
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+ENCODED_LENGTH = 13  # 13 × 5 bits ≥ 64 bits
+
+
+def encode(value: int) -> str:
+    chars = []
+    for _ in range(ENCODED_LENGTH):
+        value, remainder = divmod(value, 32)
+        chars.append(ALPHABET[remainder])
+    return "".join(reversed(chars))
+
+
+def decode(encoded: str) -> int:
+    value = 0
+    for char in encoded:
+        value = value * 32 + ALPHABET.index(char)
+    return value
+
+
+class SortableIdGenerator:
+    """
+    Identifiants croissants dans le temps : les insertions se font à l'extrémité droite
+    de l'index unique au lieu de points aléatoires, et l'ordre des identifiants est
+    l'ordre de création (à la milliseconde, puis par worker et séquence).
+
+    Jusqu'à 4096 identifiants par milliseconde et par worker ; au-delà, ou si l'horloge
+    recule, la milliseconde suivante est empruntée plutôt que d'attendre. Tant qu'aucun
+    numéro de worker n'est attribué (WorkerIdAllocator), la génération échoue.
+    """
+
+    def __init__(self, worker_id: Optional[int] = None):
+        self._worker_id: Optional[int] = None
+        self._last_ms = 0
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self.worker_id = worker_id
+
+    @property
+    def worker_id(self) -> Optional[int]:
+        return self._worker_id
+
+    @worker_id.setter
+    def worker_id(self, worker_id: Optional[int]) -> None:
+        if worker_id is not None and not 0 <= worker_id <= MAX_WORKER:
+            raise ValueError(f"worker_id must be between 0 and {MAX_WORKER}")
+        self._worker_id = worker_id
+
+    def next_int(self) -> int:
+        with self._lock:
+            if self._worker_id is None:
+                raise RuntimeError("No worker id assigned to the id generator")
+            now_ms = time.time_ns() // 1_000_000 - EPOCH_MS
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            elif self._sequence < MAX_SEQUENCE:
+                self._sequence += 1
+            else:
+                self._last_ms += 1
+                self._sequence = 0
+            return (self._last_ms << (WORKER_BITS + SEQUENCE_BITS)) | (self._worker_id << SEQUENCE_BITS) | self._sequence
+
+    def next_id(self) -> str:
+        return encode(self.next_int())
+
+
+def id_timestamp(identifier: str) -> Optional[datetime]:
+    """Date de création d'un identifiant généré ici (None pour les anciens identifiants aléatoires)"""
+    if len(identifier) != ENCODED_LENGTH or any(char not in ALPHABET for char in identifier):
+        return None
+    value = decode(identifier)
+    if value >> 64:
+        return None
+    return datetime.fromtimestamp(((value >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS) / 1000, UTC)
+
+
+class WorkerIdAllocator:
+    """
+    Attribue au générateur un numéro de worker garanti unique parmi les processus vivants.
+
+    Sans ID_WORKER_ID, `acquire` réserve dans id_worker_leases un numéro libre ou dont le
+    bail a expiré (écriture conditionnelle : un seul processus l'obtient), puis le bail est
+    renouvelé toutes les `ttl_seconds / 3`. Si le renouvellement échoue jusqu'à l'approche de
+    l'expiration, ou si le bail a été perdu, la génération est suspendue avant qu'un autre
+    processus ne puisse reprendre le numéro, puis un nouveau numéro est réservé.
+    """
+
+    def __init__(self, generator: SortableIdGenerator, ttl_seconds: float):
+        self.generator = generator
+        self.ttl_seconds = ttl_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._expires_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def acquire(self) -> int:
+        if settings.ID_WORKER_ID is not None:
+            self.generator.worker_id = settings.ID_WORKER_ID
+            return settings.ID_WORKER_ID
+        worker_id = await self._claim()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return worker_id
+
+    async def _claim(self) -> int:
+        collection = WorkerIdLease.get_motor_collection()
+        now = datetime.now(UTC)
+        expires_at = now + timedelta(seconds=self.ttl_seconds)
+        # Départ aléatoire : des processus qui démarrent ensemble ne se disputent pas les mêmes numéros
+        start = random.randrange(MAX_WORKER + 1)
+        for offset in range(MAX_WORKER + 1):
+            candidate = (start + offset) % (MAX_WORKER + 1)
+            try:
+                await collection.update_one(
+                    {"_id": candidate, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                    {"$set": {"owner": self.owner, "expires_at": expires_at}},
+                    upsert=True
+                )
+            except DuplicateKeyError:
+                # Numéro tenu par un autre processus
+                continue
+            self._expires_at = expires_at
+            self.generator.worker_id = candidate
+            logger.info(f"Numéro de worker {candidate} réservé pour les identifiants")
+            return candidate
+        raise RuntimeError("No free worker id for the id generator")
+
+    async def _renew(self) -> None:
+        worker_id = self.generator.worker_id
+        expires_at = datetime.now(UTC) + timedelta(seconds=self.ttl_seconds)
+        result = await WorkerIdLease.get_motor_collection().update_one(
+            {"_id": worker_id, "owner": self.owner},
+            {"$set": {"expires_at": expires_at}}
+        )
+        if result.matched_count == 1:
+            self._expires_at = expires_at
+            return
+        logger.error(f"Bail du numéro de worker {worker_id} perdu, nouvelle réservation")
+        self.generator.worker_id = None
+        await self._claim()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.ttl_seconds / 3)
+            try:
+                if self.generator.worker_id is None:
+                    await self._claim()
+                else:
+                    await self._renew()
+            except Exception as e:
+                logger.error(f"Échec du renouvellement du numéro de worker: {str(e)}")
+                margin = timedelta(seconds=self.ttl_seconds / 3)
+                if self._expires_at is None or datetime.now(UTC) >= self._expires_at - margin:
+                    # Le numéro pourrait bientôt être repris ailleurs : plus aucun identifiant ici
+                    self.generator.worker_id = None
+
+    async def release(self) -> None:
+        """Arrête le renouvellement et libère le numéro (arrêt de l'application ou d'un job)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        worker_id = self.generator.worker_id
+        self.generator.worker_id = None
+        if settings.ID_WORKER_ID is None and worker_id is not None:
+            try:
+                await WorkerIdLease.get_motor_collection().delete_one({"_id": worker_id, "owner": self.owner})
+            except Exception as e:
+                logger.error(f"Échec de la libération du numéro de worker: {str(e)}")
+
+
+ids = SortableIdGenerator()
+worker_id_allocator = WorkerIdAllocator(ids, ttl_seconds=settings.ID_WORKER_LEASE_SECONDS)
@@ -0,0 +1,222 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, UTC
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from beanie import PydanticObjectId
+
+from ..models.banking import Currency
+from ..models.ledger import BalanceSnapshot, LedgerPosting, PostingSide
+from .ids import ids
+
+# Journal d'audit en partie double. Le contrôle de provision et le solde affiché restent
+# sur `Account.balance` (`$inc` conditionnel, cf. utils/balance) : le journal sert au
+# rapprochement (`ledger_balance` comparé au solde du compte), pas de garde-fou.
+
+# Les instantanés s'arrêtent un peu avant « maintenant » pour qu'aucune écriture encore
+# en cours de validation (horodatée avant la coupure) ne leur échappe
+SNAPSHOT_SAFETY_MARGIN = timedelta(minutes=5)
+
+
+class Leg(NamedTuple):
+    account_key: str
+    amount: int  # En centièmes, signé
+    currency: str
+
+
+def account_key(account_id: PydanticObjectId) -> str:
+    return str(account_id)
+
+
+def cash_account(currency) -> str:
+    """Contrepartie des dépôts et retraits (argent entrant/sortant de la banque)"""
+    return f"system:cash:{Currency(currency).value}"
+
+
+def fx_account(currency) -> str:
+    """Compte de change : équilibre chaque devise d'un transfert multi-devises"""
+    return f"system:fx:{Currency(currency).value}"
+
+
+def deposit_legs(account_id: PydanticObjectId, amount: int, currency) -> List[Leg]:
+    currency = Currency(currency).value
+    return [
+        Leg(cash_account(currency), -amount, currency),
+        Leg(account_key(account_id), amount, currency),
+    ]
+
+
+def withdrawal_legs(account_id: PydanticObjectId, amount: int, currency) -> List[Leg]:
+    currency = Currency(currency).value
+    return [
+        Leg(account_key(account_id), -amount, currency),
+        Leg(cash_account(currency), amount, currency),
+    ]
+
+
+def transfer_legs(
+        from_account_id: PydanticObjectId,
+        from_currency,
+        amount: int,
+        to_account_id: PydanticObjectId,
+        to_currency,
+        converted_amount: int
+) -> List[Leg]:
+    from_currency, to_currency = Currency(from_currency).value, Currency(to_currency).value
+    if from_currency == to_currency:
+        return [
+            Leg(account_key(from_account_id), -amount, from_currency),
+            Leg(account_key(to_account_id), amount, to_currency),
+        ]
+    return [
+        Leg(account_key(from_account_id), -amount, from_currency),
+        Leg(fx_account(from_currency), amount, from_currency),
+        Leg(fx_account(to_currency), -converted_amount, to_currency),
+        Leg(account_key(to_account_id), converted_amount, to_currency),
+    ]
+
+
+async def post_entry(
+        legs: List[Leg],
+        transaction_id: Optional[str] = None,
+        now: Optional[datetime] = None,
+        session=None
+) -> str:
+    """Enregistre une pièce équilibrée (somme nulle par devise) et retourne son id"""
+    entry_ids = await post_entries([(legs, transaction_id)], now, session=session)
+    return entry_ids[0]
+
+
+async def post_entries(
+        entries: List[Tuple[List[Leg], Optional[str]]],
+        now: Optional[datetime] = None,
+        session=None
+) -> List[str]:
+    """Enregistre plusieurs pièces (legs, transaction_id) en un seul `insert_many`"""
+    now = now or datetime.now(UTC)
+    postings = []
+    entry_ids = []
+    for legs, transaction_id in entries:
+        totals: Dict[str, int] = defaultdict(int)
+        for leg in legs:
+            totals[leg.currency] += leg.amount
+        unbalanced = {currency: total for currency, total in totals.items() if total != 0}
+        if unbalanced:
+            raise ValueError(f"Unbalanced ledger entry: {unbalanced}")
+
+        entry_id = ids.next_id()
+        entry_ids.append(entry_id)
+        postings.extend(
+            LedgerPosting(
+                entry_id=entry_id,
+                account_key=leg.account_key,
+                side=PostingSide.CREDIT if leg.amount > 0 else PostingSide.DEBIT,
+                amount=leg.amount,
+                currency=leg.currency,
+                transaction_id=transaction_id,
+                posted_at=now
+            )
+            for leg in legs
+        )
+
+    await LedgerPosting.insert_many(postings, session=session)
+    return entry_ids
+
+
+async def latest_snapshot(key: str) -> Optional[BalanceSnapshot]:
+    return await BalanceSnapshot.find({"account_key": key}).sort([("as_of", -1)]).first_or_none()
+
+
+async def _sum_postings(key: str, after: Optional[datetime] = None, until: Optional[datetime] = None) -> Dict[str, int]:
+    match: dict = {"account_key": key}
+    date_range = {}
+    if after is not None:
+        date_range["$gt"] = after
+    if until is not None:
+        date_range["$lte"] = until
+    if date_range:
+        match["posted_at"] = date_range
+    result = await LedgerPosting.get_motor_collection().aggregate([
+        {"$match": match},
+        {"$group": {"_id": None, "total": {"$sum": "$amount"}, "count": {"$sum": 1}}},
+    ]).to_list(1)
+    return result[0] if result else {"total": 0, "count": 0}
+
+
+async def ledger_balance(key: str, rebuild: bool = False) -> int:
+    """
+    Solde d'un compte d'après le journal : dernier instantané + écritures postérieures.
+    `rebuild=True` ignore les instantanés et re-somme tout le journal du compte.
+    """
+    snapshot = None if rebuild else await latest_snapshot(key)
+    since = await _sum_postings(key, after=snapshot.as_of if snapshot else None)
+    return (snapshot.balance if snapshot else 0) + since["total"]
+
+
+async def take_snapshots(cutoff: Optional[datetime] = None, batch_size: int = 1000) -> int:
+    """
+    Arrête le solde de chaque compte ayant des écritures depuis le dernier passage.
+
+    Tous les instantanés d'un passage partagent `as_of = cutoff`. Un compte sans écriture
+    garde son instantané précédent, qui reste exact. Retourne le nombre d'instantanés créés.
+    """
+    cutoff = cutoff or datetime.now(UTC) - SNAPSHOT_SAFETY_MARGIN
+    previous_run = await BalanceSnapshot.find({}).sort([("as_of", -1)]).first_or_none()
+    previous_cutoff = previous_run.as_of if previous_run else None
+
+    match: dict = {"posted_at": {"$lte": cutoff}}
+    if previous_cutoff is not None:
+        match["posted_at"]["$gt"] = previous_cutoff
+
+    deltas = LedgerPosting.get_motor_collection().aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": "$account_key",
+            "total": {"$sum": "$amount"},
+            "count": {"$sum": 1},
+            "currency": {"$first": "$currency"},
+        }},
+    ], allowDiskUse=True)
+
+    created = 0
+    batch = []
+    async for delta in deltas:
+        batch.append(delta)
+        if len(batch) >= batch_size:
+            created += await _write_snapshots(batch, previous_cutoff, cutoff)
+            batch = []
+    if batch:
+        created += await _write_snapshots(batch, previous_cutoff, cutoff)
+    return created
+
+
+async def _write_snapshots(deltas: List[dict], previous_cutoff: Optional[datetime], cutoff: datetime) -> int:
+    keys = [delta["_id"] for delta in deltas]
+    latest = {
+        row["_id"]: row
+        async for row in BalanceSnapshot.get_motor_collection().aggregate([
+            {"$match": {"account_key": {"$in": keys}}},
+            {"$sort": {"account_key": 1, "as_of": -1}},
+            {"$group": {"_id": "$account_key", "balance": {"$first": "$balance"}, "as_of": {"$first": "$as_of"}}},
+        ])
+    }
+
+    snapshots = []
+    for delta in deltas:
+        key = delta["_id"]
+        previous = latest.get(key)
+        base = previous["balance"] if previous else 0
+        total = delta["total"]
+        # Un passage précédent interrompu : on complète l'intervalle manquant pour ce compte
+        if previous_cutoff is not None and (previous is None or previous["as_of"] < previous_cutoff):
+            gap = await _sum_postings(key, after=previous["as_of"] if previous else None, until=previous_cutoff)
+            base += gap["total"]
+        snapshots.append(BalanceSnapshot(
+            account_key=key,
+            balance=base + total,
+            currency=delta["currency"],
+            as_of=cutoff,
+            postings_count=delta["count"]
+        ))
+
+    await BalanceSnapshot.insert_many(snapshots)
+    return len(snapshots)
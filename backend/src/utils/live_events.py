@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, UTC
+from typing import Any, Dict, Optional, Set
+
+from beanie import PydanticObjectId
+from pymongo.errors import OperationFailure, PyMongoError
+
+from ..config.settings import get_settings
+from ..models.banking import Account, Transaction
+from .money import minor_to_float
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Codes renvoyés par un serveur autonome (sans replica set) à l'ouverture d'un change stream
+CHANGE_STREAMS_UNSUPPORTED = {40573, 40324}
+
+# Marqueur placé dans la file d'un client qui n'a pas suivi : il doit recharger par l'API
+RESYNC = "resync"
+
+
+def format_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class LiveEventHub:
+    """
+    Diffusion en temps réel des transactions et des soldes, un seul change stream par worker.
+
+    Le curseur (transactions insérées, soldes de compte modifiés) est ouvert à la première
+    connexion d'un client ; chaque changement est remis aux files des clients abonnés au
+    compte concerné. Un client trop lent pour sa file reçoit un événement `resync` au lieu
+    des événements perdus. En cas d'erreur, le curseur reprend après le dernier jeton vu.
+
+    Les change streams exigent un replica set : un replica set à un seul nœud suffit
+    (`mongod --replSet rs0`, puis `rs.initiate()`). Sur un serveur autonome, `available`
+    passe à False et le flux n'est pas proposé.
+    """
+
+    def __init__(self, queue_size: int, retry_seconds: float = 2.0):
+        self.queue_size = queue_size
+        self.retry_seconds = retry_seconds
+        self.available = True
+        self.delivered = 0
+        self.resyncs = 0
+        self._subscribers: Dict[PydanticObjectId, Set[asyncio.Queue]] = {}
+        self._resume_token: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, account_id: PydanticObjectId) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(account_id, set()).add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, account_id: PydanticObjectId, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(account_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[account_id]
+
+    def publish(self, account_id: PydanticObjectId, message: str) -> None:
+        for queue in self._subscribers.get(account_id, ()):
+            try:
+                queue.put_nowait(message)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                # Les événements en attente sont périmés : on les remplace par un resync
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+                self.resyncs += 1
+
+    def dispatch(self, change: Dict[str, Any]) -> None:
+        """Traduit un changement du flux en événement pour les abonnés du compte"""
+        collection = change["ns"]["coll"]
+        if collection == Transaction.get_settings().name:
+            document = change["fullDocument"]
+            account_id = document["account"].id
+            if account_id not in self._subscribers:
+                return
+            self.publish(account_id, format_event("transaction", {
+                "id": str(document["_id"]),
+                "transaction_id": document["transaction_id"],
+                "account_id": str(account_id),
+                "transaction_type": document["transaction_type"],
+                "amount": minor_to_float(document["amount"]),
+                "currency": document["currency"],
+                "description": document.get("description", ""),
+                "category": document.get("category"),
+                "recipient_name": document.get("recipient_name"),
+                "transaction_date": _isoformat(document["transaction_date"]),
+            }))
+        else:
+            account_id = change["documentKey"]["_id"]
+            if account_id not in self._subscribers:
+                return
+            self.publish(account_id, format_event("balance", {
+                "account_id": str(account_id),
+                "balance": minor_to_float(change["updateDescription"]["updatedFields"]["balance"]),
+            }))
+
+    def _pipeline(self) -> list:
+        transactions = Transaction.get_settings().name
+        accounts = Account.get_settings().name
+        return [
+            {"$match": {"$or": [
+                {"ns.coll": transactions, "operationType": "insert"},
+                {
+                    "ns.coll": accounts,
+                    "operationType": "update",
+                    "updateDescription.updatedFields.balance": {"$exists": True},
+                },
+            ]}},
+            # Seuls les champs diffusés quittent le serveur
+            {"$project": {
+                "ns": 1,
+                "documentKey": 1,
+                "updateDescription.updatedFields.balance": 1,
+                **{f"fullDocument.{field}": 1 for field in (
+                    "_id", "account", "transaction_id", "transaction_type", "amount", "currency",
+                    "description", "category", "recipient_name", "transaction_date",
+                )},
+            }},
+        ]
+
+    async def _run(self) -> None:
+        database = Transaction.get_motor_collection().database
+        while True:
+            try:
+                async with database.watch(self._pipeline(), resume_after=self._resume_token) as stream:
+                    async for change in stream:
+                        self._resume_token = stream.resume_token
+                        try:
+                            self.dispatch(change)
+                        except Exception as e:
+                            logger.error(f"Événement temps réel ignoré: {str(e)}")
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAMS_UNSUPPORTED:
+                    self.available = False
+                    logger.warning("Change streams indisponibles (replica set requis) : flux temps réel désactivé")
+                    self._close_all()
+                    return
+                logger.error(f"Change stream interrompu: {str(e)}")
+                if e.code == 286:
+                    # ChangeStreamHistoryLost : le jeton est sorti de l'oplog, on repart de maintenant
+                    self._resume_token = None
+            except PyMongoError as e:
+                logger.error(f"Change stream interrompu: {str(e)}")
+            await asyncio.sleep(self.retry_seconds)
+
+    def _close_all(self) -> None:
+        """Signale la fin du flux à tous les clients (None)"""
+        for queues in self._subscribers.values():
+            for queue in queues:
+                while queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._close_all()
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "accounts": len(self._subscribers),
+            "clients": sum(len(queues) for queues in self._subscribers.values()),
+            "delivered": self.delivered,
+            "resyncs": self.resyncs,
+        }
+
+
+def _isoformat(moment: datetime) -> str:
+    # Mongo relit des dates naïves, toujours en UTC
+    return moment.replace(tzinfo=moment.tzinfo or UTC).isoformat()
+
+
+live_events = LiveEventHub(queue_size=settings.LIVE_EVENTS_QUEUE_SIZE)
@@ -0,0 +1,29 @@
+from typing import Dict
+
+
+class LatencyRecorder:
+    """Agrégat minimal de latences (en millisecondes), sans allocation par mesure"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        self.count += 1
+        self.total_ms += value_ms
+        self.last_ms = value_ms
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "last_ms": round(self.last_ms, 3),
+        }
+
+    def reset(self) -> None:
+        self.__init__()
@@ -0,0 +1,80 @@
+from decimal import Decimal, ROUND_HALF_EVEN, localcontext, InvalidOperation
+from typing import Iterable, Union
+
+import numpy as np
+
+# Tous les montants sont stockés en entiers de centièmes d'unité, quelle que soit la
+# devise (XOF compris) : un crédit/débit `$inc` n'a ainsi jamais besoin de lire la
+# devise du compte, et les `$sum` côté serveur restent exacts.
+MINOR_UNIT_DIGITS = 2
+MINOR_UNIT_SCALE = 10 ** MINOR_UNIT_DIGITS
+_QUANTUM = Decimal(1).scaleb(-MINOR_UNIT_DIGITS)
+
+Amount = Union[Decimal, float, int, str]
+
+
+def _context():
+    # Contexte local : ne modifie jamais la précision globale du worker
+    return localcontext(prec=34, rounding=ROUND_HALF_EVEN)
+
+
+def to_decimal(value: Amount) -> Decimal:
+    """Décimal exact d'un montant (les floats passent par leur représentation courte)"""
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def has_minor_precision(value: Amount) -> bool:
+    """Vrai si le montant tient en centièmes sans arrondi"""
+    try:
+        decimal_value = to_decimal(value)
+        return decimal_value == decimal_value.quantize(_QUANTUM)
+    except InvalidOperation:
+        return False
+
+
+def validate_money_amount(value: float) -> float:
+    """Validateur pydantic des montants saisis : strictement positifs, au centième près"""
+    if value <= 0:
+        raise ValueError('Amount must be greater than zero')
+    if not has_minor_precision(value):
+        raise ValueError('Amount must have at most 2 decimal places')
+    return value
+
+
+def to_minor(value: Amount) -> int:
+    """Convertit un montant décimal en centièmes (arrondi bancaire)"""
+    with _context():
+        return int((to_decimal(value) * MINOR_UNIT_SCALE).to_integral_value())
+
+
+def from_minor(minor: int) -> Decimal:
+    """Montant décimal exact correspondant à un nombre de centièmes"""
+    return Decimal(int(minor)).scaleb(-MINOR_UNIT_DIGITS)
+
+
+def minor_to_float(minor: int) -> float:
+    """Représentation float pour les réponses JSON existantes"""
+    return float(from_minor(minor))
+
+
+def convert_minor(minor: int, rate: Amount) -> int:
+    """Applique un taux de change à un montant en centièmes (arrondi bancaire)"""
+    with _context():
+        return int((Decimal(int(minor)) * to_decimal(rate)).to_integral_value())
+
+
+def minor_array(values: Iterable[int]) -> np.ndarray:
+    """Tableau int64 de montants en centièmes, pour l'arithmétique exacte par lot"""
+    return np.fromiter(values, dtype=np.int64)
+
+
+def to_minor_array(values: np.ndarray) -> np.ndarray:
+    """Conversion vectorisée de montants float (hérités) en centièmes, arrondi au plus proche pair"""
+    # L'arrondi à 6 décimales élimine le bruit binaire (1.005 * 100 = 100.49999...)
+    scaled = np.round(np.asarray(values, dtype=np.float64) * MINOR_UNIT_SCALE, 6)
+    return np.rint(scaled).astype(np.int64)
+
+
+def sum_minor(values: np.ndarray) -> int:
+    """Somme exacte (entière) d'un tableau de centièmes"""
+    return int(np.asarray(values, dtype=np.int64).sum())
@@ -0,0 +1,47 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta, UTC
+from typing import Any, Dict, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, status
+
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+CURSOR_HEADER = "X-Next-Cursor"
+
+
+def to_millis(value: datetime) -> int:
+    # BSON stocke les dates à la milliseconde, en UTC (naïves à la relecture)
+    return (value.replace(tzinfo=value.tzinfo or UTC) - EPOCH) // timedelta(milliseconds=1)
+
+
+def encode_cursor(value: datetime, object_id: ObjectId) -> str:
+    """Curseur opaque pointant juste après (date, _id)"""
+    raw = json.dumps([to_millis(value), str(object_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        millis, object_id = json.loads(base64.urlsafe_b64decode(padded))
+        return EPOCH + timedelta(milliseconds=int(millis)), ObjectId(object_id)
+    except (ValueError, TypeError, OverflowError, InvalidId, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def keyset_after(cursor: str, field: str) -> Dict[str, Any]:
+    """
+    Filtre des éléments situés après le curseur pour un tri (field desc, _id desc).
+    Utilisé avec l'index composé correspondant, chaque page coûte le même prix.
+    """
+    value, object_id = decode_cursor(cursor)
+    return {"$or": [
+        {field: {"$lt": value}},
+        {field: value, "_id": {"$lt": object_id}},
+    ]}
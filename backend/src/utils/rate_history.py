@@ -0,0 +1,148 @@
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..models.banking import Currency, ExchangeRateSnapshot
+from .pagination import EPOCH, to_millis
+
+SUPPORTED_CODES = [currency.value for currency in Currency]
+
+
+async def record_snapshot(rates: Dict[str, float], timestamp: datetime) -> None:
+    """Ajoute un point à l'historique des taux (appelé à chaque rafraîchissement réussi)"""
+    await ExchangeRateSnapshot(timestamp=timestamp, rates=rates).insert()
+
+
+async def rate_as_of(timestamp: datetime) -> Optional[ExchangeRateSnapshot]:
+    """Taux en vigueur à la date donnée : dernier instantané antérieur ou égal"""
+    return await ExchangeRateSnapshot.find(
+        {"timestamp": {"$lte": timestamp}}
+    ).sort([("timestamp", -1)]).limit(1).first_or_none()
+
+
+class RateTimeline:
+    """
+    Instantanés chargés en mémoire sous forme de tableaux, pour des jointures « as-of »
+    vectorisées : `times[k]` (ms) et `usd[k, c]` le taux USD -> codes[c] de l'instantané k.
+    """
+
+    def __init__(self, codes: Sequence[str] = SUPPORTED_CODES):
+        self.codes = list(codes)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.times = np.empty(0, dtype=np.int64)
+        self.usd = np.empty((0, len(self.codes)), dtype=np.float64)
+        self.loaded_until: Optional[datetime] = None
+
+    def extend(self, snapshots: List[ExchangeRateSnapshot]) -> None:
+        if not snapshots:
+            return
+        times = np.fromiter((to_millis(s.timestamp) for s in snapshots), dtype=np.int64, count=len(snapshots))
+        usd = np.array(
+            [[s.rates.get(code, np.nan) for code in self.codes] for s in snapshots],
+            dtype=np.float64
+        )
+        self.times = np.concatenate([self.times, times])
+        self.usd = np.vstack([self.usd, usd])
+
+    async def load(self, start: datetime, end: datetime) -> None:
+        """Charge l'instantané en vigueur à `start` puis tous ceux de ]start, end]"""
+        snapshots = []
+        first = await rate_as_of(start)
+        if first:
+            snapshots.append(first)
+        snapshots += await ExchangeRateSnapshot.find(
+            {"timestamp": {"$gt": first.timestamp if first else start, "$lte": end}}
+        ).sort([("timestamp", 1)]).to_list()
+        self.extend(snapshots)
+        self.loaded_until = end
+
+    async def ensure_until(self, end: datetime) -> None:
+        """Étend la série jusqu'à `end` avec une seule requête par plage"""
+        if self.loaded_until is not None and end <= self.loaded_until:
+            return
+        if self.loaded_until is None:
+            await self.load(end, end)
+            return
+        self.extend(await ExchangeRateSnapshot.find(
+            {"timestamp": {"$gt": self.loaded_until, "$lte": end}}
+        ).sort([("timestamp", 1)]).to_list())
+        self.loaded_until = end
+
+    def lookup(self, times_ms: np.ndarray) -> np.ndarray:
+        """Indice de l'instantané en vigueur pour chaque date (-1 si antérieure à l'historique)"""
+        return np.searchsorted(self.times, times_ms, side="right") - 1
+
+    def convert(
+            self,
+            times_ms: np.ndarray,
+            from_idx: np.ndarray,
+            to_idx: np.ndarray,
+            amounts: np.ndarray
+    ):
+        """
+        Retourne (indices d'instantané, taux appliqués, montants convertis).
+        NaN lorsque la date précède l'historique ou que la devise est inconnue (indice -1).
+        """
+        snapshot_idx = self.lookup(times_ms)
+        known = (snapshot_idx >= 0) & (from_idx >= 0) & (to_idx >= 0)
+        safe_idx = np.where(known, snapshot_idx, 0)
+        if len(self.times):
+            rates = self.usd[safe_idx, np.where(known, to_idx, 0)] / self.usd[safe_idx, np.where(known, from_idx, 0)]
+        else:
+            rates = np.full(len(times_ms), np.nan)
+        rates = np.where(known, rates, np.nan)
+        return snapshot_idx, rates, amounts * rates
+
+
+async def reprice_stream(
+        transactions: AsyncIterator[Dict[str, Any]],
+        to_currency: Currency,
+        chunk_size: int = 5000
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Jointure « as-of » en masse : reprend chaque transaction (documents bruts triés par
+    `transaction_date` croissante) au taux en vigueur à sa date, par blocs vectorisés.
+    L'historique est chargé par plages, jamais une requête par ligne.
+    Les montants (`amount`, `repriced_amount`) sont en centièmes.
+    """
+    timeline = RateTimeline()
+    to_idx_value = timeline.index[to_currency.value]
+    chunk: List[Dict[str, Any]] = []
+
+    async def flush(rows: List[Dict[str, Any]]):
+        dates = [row["transaction_date"] for row in rows]
+        if timeline.loaded_until is None:
+            await timeline.load(min(dates), max(dates))
+        else:
+            await timeline.ensure_until(max(dates))
+
+        times_ms = np.fromiter((to_millis(d) for d in dates), dtype=np.int64, count=len(rows))
+        from_idx = np.fromiter(
+            (timeline.index.get(row.get("currency"), -1) for row in rows), dtype=np.intp, count=len(rows)
+        )
+        to_idx = np.full(len(rows), to_idx_value, dtype=np.intp)
+        amounts = np.fromiter((row["amount"] for row in rows), dtype=np.int64, count=len(rows))
+
+        snapshot_idx, rates, converted = timeline.convert(times_ms, from_idx, to_idx, amounts)
+        converted = np.rint(converted)
+        for row, k, rate, value in zip(rows, snapshot_idx.tolist(), rates.tolist(), converted.tolist()):
+            known = k >= 0 and not np.isnan(rate)
+            yield {
+                **row,
+                "repriced_currency": to_currency.value,
+                "exchange_rate": rate if known else None,
+                "repriced_amount": int(value) if known else None,
+                "rate_timestamp": EPOCH + timedelta(milliseconds=int(timeline.times[k])) if known else None,
+            }
+
+    async for transaction in transactions:
+        chunk.append(transaction)
+        if len(chunk) >= chunk_size:
+            async for row in flush(chunk):
+                yield row
+            chunk = []
+
+    if chunk:
+        async for row in flush(chunk):
+            yield row
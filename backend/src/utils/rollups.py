@@ -0,0 +1,57 @@
+from datetime import datetime, UTC
+from typing import List, Optional
+
+from beanie import PydanticObjectId
+from pymongo import UpdateOne
+
+from ..models.analytics import MonthlyRollup
+
+
+def month_key(value: datetime) -> str:
+    return f"{value.year:04d}-{value.month:02d}"
+
+
+def rollup_id(account_id: PydanticObjectId, month: str) -> str:
+    return f"{account_id}:{month}"
+
+
+def rollup_increment(
+        account_id: PydanticObjectId,
+        currency: str,
+        transaction_type: str,
+        amount: int,
+        when: datetime,
+        count: int = 1
+) -> UpdateOne:
+    """
+    Opération d'upsert `$inc` pour une transaction terminée (montant signé, en centièmes).
+    `count` > 1 regroupe plusieurs transactions de même signe sur le même compte.
+    """
+    month = month_key(when)
+    return UpdateOne(
+        {"_id": rollup_id(account_id, month)},
+        {
+            "$inc": {
+                f"types.{transaction_type}.count": count,
+                f"types.{transaction_type}.total": amount,
+                "income": amount if amount > 0 else 0,
+                "expense": -amount if amount < 0 else 0,
+            },
+            "$set": {"updated_at": datetime.now(UTC)},
+            "$setOnInsert": {"account_id": account_id, "month": month, "currency": currency},
+        },
+        upsert=True
+    )
+
+
+async def record_rollups(operations: List[UpdateOne], session=None) -> None:
+    """Applique en un seul aller-retour les incréments d'une opération (un par compte touché)"""
+    if operations:
+        await MonthlyRollup.get_motor_collection().bulk_write(operations, ordered=False, session=session)
+
+
+async def monthly_rollups(account_id: PydanticObjectId, since_month: Optional[str] = None) -> List[MonthlyRollup]:
+    query = {"account_id": account_id}
+    if since_month:
+        query["month"] = {"$gte": since_month}
+    return await MonthlyRollup.find(query).sort([("month", 1)]).to_list()
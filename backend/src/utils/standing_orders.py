@@ -0,0 +1,271 @@
+import asyncio
+import heapq
+import logging
+import os
+import socket
+import uuid
+from calendar import monthrange
+from datetime import datetime, timedelta, UTC
+from typing import Awaitable, Callable, List, NamedTuple, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from ..config.settings import get_settings
+from ..models.banking import StandingOrder, StandingOrderFrequency, StandingOrderStatus
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def add_months(moment: datetime, months: int) -> datetime:
+    """Même jour `months` mois plus tard, ramené au dernier jour du mois si besoin (31 → 30, 28...)"""
+    year, month = divmod(moment.month - 1 + months, 12)
+    year += moment.year
+    month += 1
+    return moment.replace(year=year, month=month, day=min(moment.day, monthrange(year, month)[1]))
+
+
+def occurrence_at(start_at: datetime, frequency: str, interval: int, occurrence: int) -> datetime:
+    """Date de l'échéance n° `occurrence`, calculée depuis le début : pas de dérive d'une échéance à l'autre"""
+    if frequency == StandingOrderFrequency.DAILY.value:
+        return start_at + timedelta(days=occurrence * interval)
+    if frequency == StandingOrderFrequency.WEEKLY.value:
+        return start_at + timedelta(weeks=occurrence * interval)
+    return add_months(start_at, occurrence * interval)
+
+
+def next_occurrence(
+        start_at: datetime, frequency: str, interval: int, occurrence: int, now: datetime
+) -> Tuple[int, datetime]:
+    """
+    Première échéance postérieure à `occurrence` et à `now` : après une interruption,
+    les échéances manquées ne sont pas rattrapées une à une.
+    """
+    occurrence += 1
+    if frequency != StandingOrderFrequency.MONTHLY.value:
+        period = timedelta(days=interval) if frequency == StandingOrderFrequency.DAILY.value else timedelta(weeks=interval)
+        if now >= start_at:
+            occurrence = max(occurrence, (now - start_at) // period + 1)
+    when = occurrence_at(start_at, frequency, interval, occurrence)
+    while when <= now:
+        occurrence += 1
+        when = occurrence_at(start_at, frequency, interval, occurrence)
+    return occurrence, when
+
+
+class RunResult(NamedTuple):
+    transaction_id: Optional[str]
+    error: Optional[str]
+
+
+# Exécute un lot d'ordres réservés (documents bruts), un résultat par ordre, dans le même ordre
+Executor = Callable[[List[dict]], Awaitable[List[RunResult]]]
+
+
+def _aware(moment: Optional[datetime]) -> Optional[datetime]:
+    # Mongo relit des dates naïves, toujours en UTC
+    return moment.replace(tzinfo=UTC) if moment is not None and moment.tzinfo is None else moment
+
+
+class StandingOrderScheduler:
+    """
+    Ordonnanceur en mémoire des ordres permanents, un par worker.
+
+    Toutes les `poll_seconds`, les échéances des `poll_seconds` suivantes sont lues par
+    l'index (status, next_run_at) et placées dans un tas trié par date ; la boucle dort
+    jusqu'à la prochaine échéance. Les ordres échus sont réservés par lots d'un seul
+    `update_many` conditionnel (bail de `lease_seconds`) : un ordre n'est exécuté que par
+    le worker qui l'a réservé. Les résultats du lot sont écrits par un seul `bulk_write`.
+
+    Une échéance en échec est retentée après `retry_seconds` (doublé à chaque échec) ;
+    après `max_failures` échecs consécutifs, l'ordre est suspendu.
+    """
+
+    def __init__(
+            self,
+            poll_seconds: float,
+            batch_size: int,
+            lease_seconds: float,
+            max_failures: int,
+            retry_seconds: float
+    ):
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_failures = max_failures
+        self.retry_seconds = retry_seconds
+        self.executed = 0
+        self.failed = 0
+        self._heap: List[Tuple[datetime, ObjectId]] = []
+        self._queued: Set[ObjectId] = set()
+        self._execute: Optional[Executor] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def schedule(self, order_id: ObjectId, run_at: datetime) -> None:
+        """Ajoute une échéance proche au tas (ordre créé ou repris sur ce worker)"""
+        if order_id in self._queued or run_at > datetime.now(UTC) + timedelta(seconds=self.poll_seconds):
+            return
+        heapq.heappush(self._heap, (run_at, order_id))
+        self._queued.add(order_id)
+        self._wakeup.set()
+
+    async def load(self, now: datetime) -> None:
+        """Place dans le tas les échéances des `poll_seconds` à venir qui n'y sont pas déjà"""
+        horizon = now + timedelta(seconds=self.poll_seconds)
+        cursor = StandingOrder.get_motor_collection().find(
+            {
+                "status": StandingOrderStatus.ACTIVE.value,
+                "next_run_at": {"$lte": horizon},
+                "$or": [{"claimed_until": None}, {"claimed_until": {"$lt": now}}],
+            },
+            {"next_run_at": 1}
+        ).sort("next_run_at", 1)
+        async for order in cursor:
+            if order["_id"] not in self._queued:
+                heapq.heappush(self._heap, (_aware(order["next_run_at"]), order["_id"]))
+                self._queued.add(order["_id"])
+
+    def _pop_due(self, now: datetime) -> List[ObjectId]:
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            _, order_id = heapq.heappop(self._heap)
+            self._queued.discard(order_id)
+            due.append(order_id)
+        return due
+
+    async def claim(self, order_ids: List[ObjectId], now: datetime) -> Tuple[str, List[dict]]:
+        """
+        Réserve atomiquement ceux des ordres encore échus et libres ; retourne le jeton
+        de réservation et les ordres obtenus (les autres sont déjà pris ou modifiés).
+        """
+        token = f"{WORKER_ID}:{uuid.uuid4().hex}"
+        collection = StandingOrder.get_motor_collection()
+        await collection.update_many(
+            {
+                "_id": {"$in": order_ids},
+                "status": StandingOrderStatus.ACTIVE.value,
+                "next_run_at": {"$lte": now},
+                "$or": [{"claimed_until": None}, {"claimed_until": {"$lt": now}}],
+            },
+            {"$set": {"claimed_by": token, "claimed_until": now + timedelta(seconds=self.lease_seconds)}}
+        )
+        claimed = await collection.find({"_id": {"$in": order_ids}, "claimed_by": token}).to_list(None)
+        return token, claimed
+
+    def _completion(self, order: dict, token: str, result: RunResult, now: datetime) -> UpdateOne:
+        start_at = _aware(order["start_at"])
+        end_at = _aware(order.get("end_at"))
+        failures = 0 if result.error is None else order.get("consecutive_failures", 0) + 1
+        if failures:
+            # Même échéance retentée plus tard : le paiement de la période n'est pas perdu
+            occurrence = order.get("occurrence", 0)
+            next_run_at = now + timedelta(seconds=self.retry_seconds * 2 ** (failures - 1))
+        else:
+            occurrence, next_run_at = next_occurrence(
+                start_at, order["frequency"], order.get("interval", 1), order.get("occurrence", 0), now
+            )
+
+        update = {
+            "occurrence": occurrence,
+            "next_run_at": next_run_at,
+            "consecutive_failures": failures,
+            "last_run_at": now,
+            "last_error": result.error,
+            "updated_at": now,
+            "claimed_by": None,
+            "claimed_until": None,
+        }
+        if result.transaction_id is not None:
+            update["last_transaction_id"] = result.transaction_id
+        if failures >= self.max_failures:
+            update["status"] = StandingOrderStatus.PAUSED.value
+        elif not failures and end_at is not None and next_run_at > end_at:
+            update["status"] = StandingOrderStatus.COMPLETED.value
+            update["next_run_at"] = None
+
+        operation = {"$set": update}
+        if result.error is None:
+            operation["$inc"] = {"runs": 1}
+        # Bail perdu (exécution trop longue) : l'ordre appartient à un autre worker
+        return UpdateOne({"_id": order["_id"], "claimed_by": token}, operation)
+
+    async def run_due(self, now: Optional[datetime] = None) -> int:
+        """Exécute les ordres échus du tas, par lots ; retourne le nombre d'ordres exécutés"""
+        now = now or datetime.now(UTC)
+        processed = 0
+        while True:
+            due = self._pop_due(now)
+            if not due:
+                return processed
+            token, orders = await self.claim(due, now)
+            if not orders:
+                continue
+
+            results = await self._execute(orders)
+            completed_at = datetime.now(UTC)
+            await StandingOrder.get_motor_collection().bulk_write(
+                [self._completion(order, token, result, completed_at) for order, result in zip(orders, results)],
+                ordered=False
+            )
+            for order, result in zip(orders, results):
+                if result.error is None:
+                    self.executed += 1
+                else:
+                    self.failed += 1
+                    logger.warning(f"Ordre permanent {order['_id']} non exécuté: {result.error}")
+            processed += len(orders)
+
+    async def _run(self) -> None:
+        next_load = datetime.now(UTC)
+        errors = 0
+        while True:
+            now = datetime.now(UTC)
+            try:
+                if now >= next_load:
+                    await self.load(now)
+                    next_load = now + timedelta(seconds=self.poll_seconds)
+                await self.run_due(now)
+                errors = 0
+            except Exception as e:
+                logger.error(f"Échec de l'exécution des ordres permanents: {str(e)}")
+                # Base indisponible : rechargement complet après un délai croissant, sans boucle active
+                errors += 1
+                next_load = now + timedelta(seconds=min(self.poll_seconds, 2 ** (errors - 1)))
+
+            now = datetime.now(UTC)
+            wake_at = min(next_load, self._heap[0][0]) if self._heap and not errors else next_load
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max((wake_at - now).total_seconds(), 0.0))
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, execute: Executor) -> None:
+        self._execute = execute
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> dict:
+        return {"queued": len(self._heap), "executed": self.executed, "failed": self.failed}
+
+
+standing_order_scheduler = StandingOrderScheduler(
+    poll_seconds=settings.STANDING_ORDER_POLL_SECONDS,
+    batch_size=settings.STANDING_ORDER_BATCH_SIZE,
+    lease_seconds=settings.STANDING_ORDER_LEASE_SECONDS,
+    max_failures=settings.STANDING_ORDER_MAX_FAILURES,
+    retry_seconds=settings.STANDING_ORDER_RETRY_SECONDS
+)
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from pymongo.errors import PyMongoError
+from pymongo.write_concern import WriteConcern
+
+from ..config.settings import get_settings
+from ..database.connection import get_client
+from .metrics import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+T = TypeVar("T")
+
+TRANSIENT_ERROR = "TransientTransactionError"
+UNKNOWN_COMMIT_RESULT = "UnknownTransactionCommitResult"
+
+
+class TransferMetrics:
+    """Compteurs du moteur de transferts transactionnels"""
+
+    def __init__(self):
+        self.started = 0
+        self.committed = 0
+        self.aborted = 0
+        self.transient_retries = 0
+        self.commit_retries = 0
+        self.commit_latency = LatencyRecorder()
+        self.total_latency = LatencyRecorder()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "started": self.started,
+            "committed": self.committed,
+            "aborted": self.aborted,
+            "transient_retries": self.transient_retries,
+            "commit_retries": self.commit_retries,
+            "commit_latency": self.commit_latency.snapshot(),
+            "total_latency": self.total_latency.snapshot(),
+        }
+
+
+transfer_metrics = TransferMetrics()
+
+
+async def _backoff(attempt: int) -> None:
+    """Attente exponentielle avec gigue complète entre deux tentatives"""
+    ceiling = min(
+        settings.TRANSFER_RETRY_BACKOFF_MAX_MS,
+        settings.TRANSFER_RETRY_BACKOFF_MS * (2 ** (attempt - 1))
+    )
+    await asyncio.sleep(random.uniform(0, ceiling) / 1000)
+
+
+async def _abort(session) -> None:
+    if session.in_transaction:
+        try:
+            await session.abort_transaction()
+        except PyMongoError as e:
+            logger.warning(f"Échec de l'annulation de la transaction: {str(e)}")
+
+
+async def _commit(session, max_retries: int) -> None:
+    """Valide la transaction, en rejouant le commit si son résultat est inconnu"""
+    attempt = 0
+    started = time.perf_counter()
+    while True:
+        try:
+            await session.commit_transaction()
+            transfer_metrics.commit_latency.observe((time.perf_counter() - started) * 1000)
+            return
+        except PyMongoError as e:
+            if e.has_error_label(UNKNOWN_COMMIT_RESULT) and attempt < max_retries:
+                attempt += 1
+                transfer_metrics.commit_retries += 1
+                logger.warning(f"Résultat du commit inconnu, nouvelle tentative ({attempt}): {str(e)}")
+                await _backoff(attempt)
+                continue
+            raise
+
+
+async def run_in_transaction(
+        callback: Callable[[Optional[Any]], Awaitable[T]],
+        max_retries: Optional[int] = None
+) -> T:
+    """
+    Exécute `callback(session)` dans une transaction MongoDB multi-documents.
+
+    La transaction entière est rejouée sur `TransientTransactionError` et le commit
+    seul est rejoué sur `UnknownTransactionCommitResult`, avec un backoff exponentiel.
+    Toute autre exception (y compris HTTPException) annule la transaction et remonte.
+    Sans replica set (MONGODB_TRANSACTIONS_ENABLED=False), le callback est exécuté
+    sans session.
+    """
+    if max_retries is None:
+        max_retries = settings.TRANSFER_MAX_RETRIES
+
+    if not settings.MONGODB_TRANSACTIONS_ENABLED:
+        return await callback(None)
+
+    transfer_metrics.started += 1
+    started = time.perf_counter()
+    attempt = 0
+
+    async with await get_client().start_session() as session:
+        while True:
+            session.start_transaction(write_concern=WriteConcern(w="majority"))
+            try:
+                result = await callback(session)
+                await _commit(session, max_retries)
+            except PyMongoError as e:
+                await _abort(session)
+                if e.has_error_label(TRANSIENT_ERROR) and attempt < max_retries:
+                    attempt += 1
+                    transfer_metrics.transient_retries += 1
+                    logger.warning(f"Erreur transitoire, transaction rejouée ({attempt}): {str(e)}")
+                    await _backoff(attempt)
+                    continue
+                transfer_metrics.aborted += 1
+                raise
+            except BaseException:
+                await _abort(session)
+                transfer_metrics.aborted += 1
+                raise
+
+            transfer_metrics.committed += 1
+            transfer_metrics.total_latency.observe((time.perf_counter() - started) * 1000)
+            return result
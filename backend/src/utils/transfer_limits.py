@@ -0,0 +1,185 @@
+from collections import Counter
+from datetime import datetime, UTC
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from beanie import PydanticObjectId
+from pymongo.errors import DuplicateKeyError
+
+from ..models.banking import AccountTier, TransferCounter
+from .money import convert_minor
+
+HOUR_SECONDS = 60 * 60
+DAY_SECONDS = 24 * HOUR_SECONDS
+DAILY_WINDOW_HOURS = 24
+MONTHLY_WINDOW_DAYS = 30
+RESERVE_MAX_ATTEMPTS = 5
+
+
+class TransferLimits(NamedTuple):
+    single: int  # Montant maximal d'un transfert
+    daily: int  # Total émis sur 24 h glissantes
+    monthly: int  # Total émis sur 30 jours glissants
+    recipient_daily_count: int  # Transferts vers un même destinataire sur 24 h glissantes
+
+
+# Plafonds par niveau, en centièmes de dollar (convertis dans la devise du compte)
+TIER_LIMITS: Dict[str, TransferLimits] = {
+    AccountTier.STANDARD.value: TransferLimits(
+        single=2_000_00, daily=5_000_00, monthly=20_000_00, recipient_daily_count=5
+    ),
+    AccountTier.PREMIUM.value: TransferLimits(
+        single=10_000_00, daily=25_000_00, monthly=100_000_00, recipient_daily_count=10
+    ),
+    AccountTier.BUSINESS.value: TransferLimits(
+        single=100_000_00, daily=250_000_00, monthly=1_000_000_00, recipient_daily_count=50
+    ),
+}
+
+
+def limits_for(tier: str, usd_rate: Decimal) -> TransferLimits:
+    """Plafonds du niveau dans la devise du compte (`usd_rate` : 1 USD en devise du compte)"""
+    limits = TIER_LIMITS.get(tier, TIER_LIMITS[AccountTier.STANDARD.value])
+    if usd_rate == 1:
+        return limits
+    return TransferLimits(
+        single=convert_minor(limits.single, usd_rate),
+        daily=convert_minor(limits.daily, usd_rate),
+        monthly=convert_minor(limits.monthly, usd_rate),
+        recipient_daily_count=limits.recipient_daily_count
+    )
+
+
+def _hour(now: datetime) -> int:
+    return int(now.timestamp()) // HOUR_SECONDS
+
+
+def _day(now: datetime) -> int:
+    return int(now.timestamp()) // DAY_SECONDS
+
+
+async def load_counter(account_id: PydanticObjectId, session=None) -> dict:
+    return await TransferCounter.get_motor_collection().find_one({"_id": account_id}, session=session) or {}
+
+
+def check_limits(
+        counter: dict,
+        limits: TransferLimits,
+        legs: List[Tuple[PydanticObjectId, int]],
+        now: Optional[datetime] = None
+) -> Optional[str]:
+    """
+    Évalue en une passe toutes les règles pour les transferts `legs` (destinataire, montant).
+    Retourne le motif du premier refus, ou None si les transferts sont autorisés.
+    """
+    now = now or datetime.now(UTC)
+    first_hour = _hour(now) - DAILY_WINDOW_HOURS + 1
+    first_day = _day(now) - MONTHLY_WINDOW_DAYS + 1
+
+    if any(amount > limits.single for _, amount in legs):
+        return "Montant maximal par transfert dépassé"
+
+    total = sum(amount for _, amount in legs)
+    daily = sum(amount for hour, amount in counter.get("hours", {}).items() if int(hour) >= first_hour)
+    if daily + total > limits.daily:
+        return "Plafond de transfert sur 24 heures dépassé"
+    monthly = sum(amount for day, amount in counter.get("days", {}).items() if int(day) >= first_day)
+    if monthly + total > limits.monthly:
+        return "Plafond de transfert sur 30 jours dépassé"
+
+    recipients = counter.get("recipients", {})
+    for recipient_id, count in Counter(str(recipient_id) for recipient_id, _ in legs).items():
+        recent = sum(n for hour, n in recipients.get(recipient_id, {}).items() if int(hour) >= first_hour)
+        if recent + count > limits.recipient_daily_count:
+            return "Trop de transferts vers ce destinataire sur 24 heures"
+
+    return None
+
+
+async def record_transfers(
+        account_id: PydanticObjectId,
+        counter: dict,
+        legs: List[Tuple[PydanticObjectId, int]],
+        now: Optional[datetime] = None,
+        session=None
+) -> bool:
+    """
+    Impute les transferts aux compteurs (`$inc`) et retire les clés sorties des fenêtres.
+    L'écriture ne s'applique que si les compteurs n'ont pas changé depuis la lecture de
+    `counter` (même `version`) ; retourne False sinon.
+    """
+    now = now or datetime.now(UTC)
+    hour, day = _hour(now), _day(now)
+    first_hour = hour - DAILY_WINDOW_HOURS + 1
+    first_day = day - MONTHLY_WINDOW_DAYS + 1
+
+    total = sum(amount for _, amount in legs)
+    increments: Dict[str, int] = {f"hours.{hour}": total, f"days.{day}": total, "version": 1}
+    for recipient_id, count in Counter(str(recipient_id) for recipient_id, _ in legs).items():
+        increments[f"recipients.{recipient_id}.{hour}"] = count
+
+    expired = [f"hours.{key}" for key in counter.get("hours", {}) if int(key) < first_hour]
+    expired += [f"days.{key}" for key in counter.get("days", {}) if int(key) < first_day]
+    for recipient_id, hours in counter.get("recipients", {}).items():
+        stale = [key for key in hours if int(key) < first_hour]
+        if len(stale) == len(hours) and f"recipients.{recipient_id}.{hour}" not in increments:
+            expired.append(f"recipients.{recipient_id}")
+        else:
+            expired += [f"recipients.{recipient_id}.{key}" for key in stale]
+
+    update = {"$inc": increments, "$set": {"updated_at": now}}
+    if expired:
+        update["$unset"] = {key: "" for key in expired}
+    version = counter.get("version")
+    try:
+        result = await TransferCounter.get_motor_collection().update_one(
+            {"_id": account_id, "version": version if version is not None else {"$exists": False}},
+            update, upsert=True, session=session
+        )
+    except DuplicateKeyError:
+        # Compteurs modifiés entre-temps : l'upsert a tenté de recréer le document
+        return False
+    return result.matched_count == 1 or result.upserted_id is not None
+
+
+async def reserve_transfers(
+        account_id: PydanticObjectId,
+        limits: TransferLimits,
+        legs: List[Tuple[PydanticObjectId, int]],
+        now: Optional[datetime] = None,
+        session=None
+) -> Optional[str]:
+    """
+    Vérifie les plafonds et impute les transferts en une écriture conditionnelle : des
+    transferts concurrents du même compte ne peuvent pas tous passer sur la même lecture,
+    avec ou sans transaction MongoDB. Relit et réévalue en cas de conflit.
+    Retourne le motif du refus, ou None si les transferts sont imputés.
+    """
+    now = now or datetime.now(UTC)
+    for _ in range(RESERVE_MAX_ATTEMPTS):
+        counter = await load_counter(account_id, session=session)
+        violation = check_limits(counter, limits, legs, now)
+        if violation:
+            return violation
+        if await record_transfers(account_id, counter, legs, now, session=session):
+            return None
+    return "Trop de transferts simultanés, veuillez réessayer"
+
+
+async def release_transfers(
+        account_id: PydanticObjectId,
+        legs: List[Tuple[PydanticObjectId, int]],
+        now: datetime,
+        session=None
+) -> None:
+    """Retire des compteurs des transferts imputés par reserve_transfers (même `now`) et non effectués"""
+    if not legs:
+        return
+    hour, day = _hour(now), _day(now)
+    total = sum(amount for _, amount in legs)
+    decrements: Dict[str, int] = {f"hours.{hour}": -total, f"days.{day}": -total, "version": 1}
+    for recipient_id, count in Counter(str(recipient_id) for recipient_id, _ in legs).items():
+        decrements[f"recipients.{recipient_id}.{hour}"] = -count
+    await TransferCounter.get_motor_collection().update_one(
+        {"_id": account_id}, {"$inc": decrements}, session=session
+    )
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Les réglages sont lus à l'import de `src` : valeurs de test avant toute importation
+os.environ.setdefault("CORS_ORIGINS", '["http://localhost"]')
+os.environ.setdefault("MONGODB_TRANSACTIONS_ENABLED", "false")
+os.environ.setdefault("EXCHANGE_RATE_USE_STUB", "true")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,64 @@
+from datetime import date, datetime, timedelta, UTC
+
+from beanie import PydanticObjectId
+from bson import DBRef
+
+from src.utils.card_limits import BUCKET_SECONDS, BUCKETS_PER_WINDOW, CardAuthorizer, CardWindow, bucket_index
+
+NOW = datetime(2026, 6, 15, 12, 0, tzinfo=UTC)
+USER_ID = PydanticObjectId()
+
+
+def make_window(daily_limit: int = 100_00, status: str = "active", expiry=date(2030, 1, 1)) -> CardWindow:
+    # Document brut tel que relu avec CARD_STATE_PROJECTION
+    return CardWindow({
+        "_id": PydanticObjectId(),
+        "user": DBRef("users", USER_ID),
+        "daily_limit": daily_limit,
+        "status": status,
+        "expiry_date": datetime.combine(expiry, datetime.min.time()),
+    })
+
+
+def test_approves_and_records_pending_amount():
+    authorizer = CardAuthorizer(flush_interval=1)
+    window = make_window()
+    decision = authorizer.authorize(window, 30_00, NOW)
+    assert decision.approved and decision.reason is None
+    assert (decision.spent, decision.remaining) == (30_00, 70_00)
+    assert window.pending == {bucket_index(NOW): (30_00, 1)}
+
+
+def test_declines_over_daily_limit_without_recording():
+    authorizer = CardAuthorizer(flush_interval=1)
+    window = make_window()
+    authorizer.authorize(window, 80_00, NOW)
+    decision = authorizer.authorize(window, 30_00, NOW + timedelta(minutes=1))
+    assert not decision.approved
+    assert decision.reason == "daily_limit_exceeded"
+    assert (decision.spent, decision.remaining) == (80_00, 20_00)
+    assert window.spent(bucket_index(NOW)) == 80_00
+
+
+def test_window_slides_after_24_hours():
+    authorizer = CardAuthorizer(flush_interval=1)
+    window = make_window()
+    authorizer.authorize(window, 100_00, NOW)
+    assert not authorizer.authorize(window, 1, NOW + timedelta(hours=23)).approved
+    later = NOW + timedelta(seconds=BUCKETS_PER_WINDOW * BUCKET_SECONDS)
+    assert authorizer.authorize(window, 1, later).approved
+
+
+def test_declines_inactive_and_expired_cards():
+    authorizer = CardAuthorizer(flush_interval=1)
+    assert authorizer.authorize(make_window(status="blocked"), 1, NOW).reason == "card_inactive"
+    assert authorizer.authorize(make_window(expiry=date(2026, 6, 14)), 1, NOW).reason == "card_expired"
+
+
+def test_prune_keeps_unflushed_buckets():
+    window = make_window()
+    old = bucket_index(NOW) - BUCKETS_PER_WINDOW
+    window.buckets = {old: 10_00, old - 1: 5_00}
+    window.pending = {old: (10_00, 1)}
+    window.prune(bucket_index(NOW))
+    assert window.buckets == {old: 10_00}
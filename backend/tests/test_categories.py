@@ -0,0 +1,40 @@
+from src.utils.categories import KeywordMatcher, categorize, normalize
+
+
+def test_normalize_strips_accents_case_and_punctuation():
+    assert normalize("Café-Crème, SUPERMARCHÉ!") == " cafe creme  supermarche  "
+
+
+def test_matcher_prefers_longest_keyword():
+    matcher = KeywordMatcher({" uber": "transport", " uber eats": "dining", " eats": "other"})
+    assert matcher.search(" paiement uber eats paris ") == "dining"
+    assert matcher.search(" course uber ") == "transport"
+    assert matcher.search(" rien ") is None
+
+
+def test_matcher_finds_keyword_through_failure_links():
+    # « ab » échoue sur « c » : le lien d'échec doit mener à « bcd »
+    matcher = KeywordMatcher({"abx": "first", "bcd": "second"})
+    assert matcher.search("zabcd") == "second"
+
+
+def test_keywords_match_at_word_start_only():
+    assert categorize("Paiement Bolt", "transfer") == "transport"
+    # « bar » n'est pas reconnu au milieu d'un mot
+    assert categorize("Barbier du coin", "transfer") == "transfer"
+    assert categorize("Verre au bar", "transfer") == "dining"
+
+
+def test_categorize_debits():
+    assert categorize("Uber Eats commande", "transfer") == "dining"
+    assert categorize("UBER trajet", "transfer") == "transport"
+    assert categorize("Loyer juin", "transfer") == "housing"
+    assert categorize("Électricité EDF", "withdrawal") == "utilities"
+
+
+def test_type_defaults():
+    assert categorize("Salaire", "deposit") == "income"
+    assert categorize("Uber Eats", "deposit") == "income"
+    assert categorize("", "withdrawal") == "cash"
+    assert categorize("Divers", "transfer") == "transfer"
+    assert categorize("Divers", "fee") == "other"
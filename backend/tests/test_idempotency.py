@@ -0,0 +1,199 @@
+import asyncio
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from beanie import PydanticObjectId, init_beanie
+from fastapi import HTTPException, Response
+from pydantic import BaseModel
+
+from src.models.idempotency import IdempotencyRecord
+from src.utils import idempotency
+from src.utils.idempotency import REPLAY_HEADER, complete_in_transaction, run_idempotent
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+USER_ID = PydanticObjectId()
+
+
+class Payload(BaseModel):
+    amount: int
+
+
+class Result(BaseModel):
+    balance: int
+
+
+class Handler:
+    """Handler comptant ses exécutions, en échec tant que `failures` n'est pas épuisé"""
+
+    def __init__(self, failures: int = 0, session=None):
+        self.calls = 0
+        self.failures = failures
+        self.session = session
+
+    async def __call__(self) -> Result:
+        self.calls += 1
+        result = Result(balance=100 * self.calls)
+        if self.session is not None:
+            await complete_in_transaction(result, self.session)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("transaction aborted")
+        return result
+
+
+def run(scenario):
+    async def main():
+        client = mongomock_motor.AsyncMongoMockClient()
+        await init_beanie(database=client["test"], document_models=[IdempotencyRecord])
+        await scenario()
+    asyncio.run(main())
+
+
+def test_without_key_handler_always_runs():
+    async def scenario():
+        handler = Handler()
+        await run_idempotent(USER_ID, "deposit", None, Payload(amount=1), handler)
+        await run_idempotent(USER_ID, "deposit", None, Payload(amount=1), handler)
+        assert handler.calls == 2
+        assert await IdempotencyRecord.find_all().count() == 0
+    run(scenario)
+
+
+def test_repeated_request_replays_first_response():
+    async def scenario():
+        handler = Handler()
+        response = Response(status_code=201)
+        first = await run_idempotent(USER_ID, "deposit", "k1", Payload(amount=1), handler, response)
+        assert first == Result(balance=100)
+        record = await IdempotencyRecord.get(f"{USER_ID}:deposit:k1")
+        assert record.completed and record.status_code == 201
+
+        replay_response = Response()
+        replay = await run_idempotent(USER_ID, "deposit", "k1", Payload(amount=1), handler, replay_response)
+        assert replay == {"balance": 100}
+        assert handler.calls == 1
+        assert replay_response.headers[REPLAY_HEADER] == "true"
+        assert replay_response.status_code == 201
+
+        # La clé est propre à l'utilisateur et à l'opération
+        await run_idempotent(USER_ID, "withdraw", "k1", Payload(amount=1), handler)
+        assert handler.calls == 2
+    run(scenario)
+
+
+def test_same_key_with_different_body_is_rejected():
+    async def scenario():
+        await run_idempotent(USER_ID, "deposit", "k1", Payload(amount=1), Handler())
+        with pytest.raises(HTTPException) as raised:
+            await run_idempotent(USER_ID, "deposit", "k1", Payload(amount=2), Handler())
+        assert raised.value.status_code == 422
+    run(scenario)
+
+
+def test_request_in_progress_conflicts():
+    async def scenario():
+        outer = Handler()
+
+        async def concurrent() -> Result:
+            with pytest.raises(HTTPException) as raised:
+                await run_idempotent(USER_ID, "deposit", "k1", Payload(amount=1), Handler())
+            assert raised.value.status_code == 409
+            return await outer()
+
+        await run_idempotent(USER_ID, "deposit", "k1", Payload(amount=1), concurrent)
+        assert outer.calls == 1
+    run(scenario)
+
+
+def test_failure_releases_key_for_retry():
+    async def scenario():
+        handler = Handler(failures=1)
+        with pytest.raises(RuntimeError):
+            await run_idempotent(USER_ID, "deposit", "k1", Payload(amount=1), handler)
+        assert await IdempotencyRecord.get(f"{USER_ID}:deposit:k1") is None
+
+        assert await run_idempotent(USER_ID, "deposit", "k1", Payload(amount=1), handler) == Result(balance=200)
+        assert handler.calls == 2
+    run(scenario)
+
+
+def test_aborted_transaction_does_not_leave_key_completed(monkeypatch):
+    staged = []
+
+    async def complete_rolled_back(pending, result, session=None):
+        # L'écriture faite dans la session disparaît avec la transaction annulée
+        staged.append(session)
+
+    async def scenario():
+        monkeypatch.setattr(idempotency, "_complete", complete_rolled_back)
+        handler = Handler(failures=1, session=object())
+        with pytest.raises(RuntimeError):
+            await run_idempotent(USER_ID, "deposit", "k1", Payload(amount=1), handler)
+        assert staged == [handler.session]
+        assert await IdempotencyRecord.get(f"{USER_ID}:deposit:k1") is None
+    run(scenario)
+
+
+def test_response_written_in_transaction_is_not_written_again(monkeypatch):
+    sessions = []
+
+    async def complete(pending, result, session=None):
+        sessions.append(session)
+
+    async def scenario():
+        monkeypatch.setattr(idempotency, "_complete", complete)
+        handler = Handler(session=object())
+        await run_idempotent(USER_ID, "deposit", "k1", Payload(amount=1), handler)
+        assert sessions == [handler.session]
+    run(scenario)
+
+
+def stale_pending(record_id: str) -> IdempotencyRecord:
+    return IdempotencyRecord(
+        id=record_id,
+        fingerprint=idempotency._fingerprint(Payload(amount=1)),
+        token="old",
+        # Au-delà du délai de réservation, bien avant l'expiration (TTL) de la clé
+        created_at=datetime.now(UTC) - timedelta(seconds=idempotency.settings.IDEMPOTENCY_PENDING_TIMEOUT_SECONDS + 60)
+    )
+
+
+def test_stale_reservation_taken_over_with_transactions(monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(idempotency.settings, "MONGODB_TRANSACTIONS_ENABLED", True)
+        await stale_pending(f"{USER_ID}:deposit:k1").insert()
+        handler = Handler()
+        await run_idempotent(USER_ID, "deposit", "k1", Payload(amount=1), handler)
+        assert handler.calls == 1
+        record = await IdempotencyRecord.get(f"{USER_ID}:deposit:k1")
+        assert record.completed and record.token != "old"
+    run(scenario)
+
+
+def test_stale_reservation_kept_without_transactions(monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(idempotency.settings, "MONGODB_TRANSACTIONS_ENABLED", False)
+        await stale_pending(f"{USER_ID}:deposit:k1").insert()
+        handler = Handler()
+        with pytest.raises(HTTPException) as raised:
+            await run_idempotent(USER_ID, "deposit", "k1", Payload(amount=1), handler)
+        assert raised.value.status_code == 409
+        assert handler.calls == 0
+    run(scenario)
+
+
+def test_taken_over_reservation_cannot_complete():
+    async def scenario():
+        record_id = f"{USER_ID}:deposit:k1"
+
+        async def overtaken() -> Result:
+            # Une autre requête a repris la réservation entre-temps
+            await IdempotencyRecord.get_motor_collection().update_one({"_id": record_id}, {"$set": {"token": "new"}})
+            return Result(balance=1)
+
+        with pytest.raises(HTTPException) as raised:
+            await run_idempotent(USER_ID, "deposit", "k1", Payload(amount=1), overtaken)
+        assert raised.value.status_code == 409
+        assert not (await IdempotencyRecord.get(record_id)).completed
+    run(scenario)
@@ -0,0 +1,54 @@
+import base64
+from datetime import datetime, UTC
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from src.utils.pagination import decode_cursor, encode_cursor, keyset_after
+
+
+def craft(raw: str) -> str:
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def test_round_trip_at_millisecond_precision():
+    object_id = ObjectId()
+    moment = datetime(2026, 6, 15, 12, 30, 45, 123456, tzinfo=UTC)
+    assert decode_cursor(encode_cursor(moment, object_id)) == (moment.replace(microsecond=123000), object_id)
+
+
+def test_naive_dates_are_read_as_utc():
+    object_id = ObjectId()
+    naive = datetime(2026, 6, 15, 12, 30)
+    assert decode_cursor(encode_cursor(naive, object_id))[0] == naive.replace(tzinfo=UTC)
+
+
+def test_cursor_is_url_safe_without_padding():
+    cursor = encode_cursor(datetime(2026, 6, 15, tzinfo=UTC), ObjectId())
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    "",
+    craft("{}"),
+    craft("[1]"),
+    craft('["x", "0123456789abcdef01234567"]'),
+    craft("[1, \"not-an-id\"]"),
+    craft("[1e400, \"0123456789abcdef01234567\"]"),
+    craft("[99999999999999999999, \"0123456789abcdef01234567\"]"),
+])
+def test_crafted_cursor_is_rejected_with_400(cursor):
+    with pytest.raises(HTTPException) as raised:
+        decode_cursor(cursor)
+    assert raised.value.status_code == 400
+
+
+def test_keyset_after_filters_strictly_after_cursor():
+    object_id = ObjectId()
+    moment = datetime(2026, 6, 15, tzinfo=UTC)
+    assert keyset_after(encode_cursor(moment, object_id), "transaction_date") == {"$or": [
+        {"transaction_date": {"$lt": moment}},
+        {"transaction_date": moment, "_id": {"$lt": object_id}},
+    ]}
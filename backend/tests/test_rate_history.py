@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, UTC
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.utils.pagination import to_millis
+from src.utils.rate_history import RateTimeline
+
+T0 = datetime(2026, 6, 1, tzinfo=UTC)
+
+
+def snapshot(at: datetime, **rates):
+    # Seuls `timestamp` et `rates` d'un ExchangeRateSnapshot sont lus
+    return SimpleNamespace(timestamp=at, rates={"USD": 1.0, **rates})
+
+
+def make_timeline() -> RateTimeline:
+    timeline = RateTimeline(["USD", "EUR", "XOF"])
+    timeline.extend([
+        snapshot(T0, EUR=0.9, XOF=600.0),
+        snapshot(T0 + timedelta(days=1), EUR=0.8),
+    ])
+    return timeline
+
+
+def millis(*moments: datetime) -> np.ndarray:
+    return np.array([to_millis(moment) for moment in moments], dtype=np.int64)
+
+
+def test_lookup_picks_snapshot_in_force():
+    timeline = make_timeline()
+    indices = timeline.lookup(millis(
+        T0 - timedelta(seconds=1), T0, T0 + timedelta(hours=23), T0 + timedelta(days=1), T0 + timedelta(days=5)
+    ))
+    assert indices.tolist() == [-1, 0, 0, 1, 1]
+
+
+def test_convert_uses_cross_rate_of_each_date():
+    timeline = make_timeline()
+    usd, eur = timeline.index["USD"], timeline.index["EUR"]
+    snapshot_idx, rates, converted = timeline.convert(
+        millis(T0 + timedelta(hours=1), T0 + timedelta(days=2)),
+        np.array([usd, eur]),
+        np.array([eur, usd]),
+        np.array([100.0, 80.0])
+    )
+    assert snapshot_idx.tolist() == [0, 1]
+    np.testing.assert_allclose(rates, [0.9, 1.25])
+    np.testing.assert_allclose(converted, [90.0, 100.0])
+
+
+def test_convert_returns_nan_when_rate_unknown():
+    timeline = make_timeline()
+    usd, xof = timeline.index["USD"], timeline.index["XOF"]
+    _, rates, converted = timeline.convert(
+        millis(T0 - timedelta(days=1), T0 + timedelta(hours=1), T0 + timedelta(days=2), T0 + timedelta(hours=1)),
+        np.array([usd, usd, usd, -1]),
+        np.array([usd, xof, xof, usd]),
+        np.array([1.0, 1.0, 1.0, 1.0])
+    )
+    # Avant l'historique, taux absent de l'instantané, devise inconnue
+    assert np.isnan(rates[0]) and np.isnan(rates[2]) and np.isnan(rates[3])
+    assert rates[1] == 600.0
+    assert np.isnan(converted).tolist() == [True, False, True, True]
+
+
+def test_convert_on_empty_timeline():
+    timeline = RateTimeline(["USD", "EUR"])
+    _, rates, _ = timeline.convert(millis(T0), np.array([0]), np.array([1]), np.array([1.0]))
+    assert np.isnan(rates).all()
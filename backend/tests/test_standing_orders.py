@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, UTC
+
+from bson import ObjectId
+
+from src.utils.standing_orders import RunResult, StandingOrderScheduler, add_months, next_occurrence
+
+START = datetime(2026, 1, 31, 9, 0, tzinfo=UTC)
+
+
+def make_scheduler(max_failures: int = 3) -> StandingOrderScheduler:
+    return StandingOrderScheduler(
+        poll_seconds=60, batch_size=10, lease_seconds=30, max_failures=max_failures, retry_seconds=300
+    )
+
+
+def make_order(**fields) -> dict:
+    order = {
+        "_id": ObjectId(),
+        "start_at": START.replace(tzinfo=None),  # Mongo relit des dates naïves
+        "frequency": "monthly",
+        "interval": 1,
+        "occurrence": 0,
+        "consecutive_failures": 0,
+    }
+    order.update(fields)
+    return order
+
+
+def test_add_months_clamps_to_month_end():
+    assert add_months(START, 1) == datetime(2026, 2, 28, 9, 0, tzinfo=UTC)
+    assert add_months(START, 13) == datetime(2027, 2, 28, 9, 0, tzinfo=UTC)
+    assert add_months(datetime(2027, 12, 31, tzinfo=UTC), 2) == datetime(2028, 2, 29, tzinfo=UTC)
+
+
+def test_monthly_occurrences_do_not_drift():
+    # Après le 28 février, l'échéance revient au 31 : calcul depuis le début, pas depuis la précédente
+    occurrence, when = next_occurrence(START, "monthly", 1, 1, START + timedelta(days=28))
+    assert (occurrence, when) == (2, datetime(2026, 3, 31, 9, 0, tzinfo=UTC))
+
+
+def test_missed_occurrences_are_skipped():
+    occurrence, when = next_occurrence(START, "monthly", 1, 0, datetime(2026, 5, 1, tzinfo=UTC))
+    assert (occurrence, when) == (4, datetime(2026, 5, 31, 9, 0, tzinfo=UTC))
+
+    start = datetime(2026, 1, 1, tzinfo=UTC)
+    occurrence, when = next_occurrence(start, "weekly", 2, 0, datetime(2026, 3, 1, tzinfo=UTC))
+    assert (occurrence, when) == (5, datetime(2026, 3, 12, tzinfo=UTC))
+
+
+def test_next_occurrence_is_strictly_after_now():
+    start = datetime(2026, 1, 1, tzinfo=UTC)
+    occurrence, when = next_occurrence(start, "daily", 1, 0, start + timedelta(days=3))
+    assert (occurrence, when) == (4, start + timedelta(days=4))
+
+
+def test_success_advances_to_next_occurrence():
+    now = START + timedelta(minutes=1)
+    update = make_scheduler()._completion(make_order(), "token", RunResult("TX1", None), now)
+    assert update._filter == {"_id": update._filter["_id"], "claimed_by": "token"}
+    fields = update._doc["$set"]
+    assert fields["occurrence"] == 1
+    assert fields["next_run_at"] == datetime(2026, 2, 28, 9, 0, tzinfo=UTC)
+    assert fields["consecutive_failures"] == 0
+    assert fields["last_transaction_id"] == "TX1"
+    assert update._doc["$inc"] == {"runs": 1}
+
+
+def test_failure_retries_same_occurrence_with_backoff():
+    scheduler = make_scheduler()
+    now = START + timedelta(minutes=1)
+    order = make_order(occurrence=4, consecutive_failures=1)
+    update = scheduler._completion(order, "token", RunResult(None, "Solde insuffisant"), now)
+    fields = update._doc["$set"]
+    assert fields["occurrence"] == 4
+    assert fields["next_run_at"] == now + timedelta(seconds=600)
+    assert fields["consecutive_failures"] == 2
+    assert fields["last_error"] == "Solde insuffisant"
+    assert "status" not in fields
+    assert "$inc" not in update._doc
+
+
+def test_order_paused_after_max_failures():
+    update = make_scheduler(max_failures=3)._completion(
+        make_order(consecutive_failures=2), "token", RunResult(None, "Solde insuffisant"), START
+    )
+    assert update._doc["$set"]["status"] == "paused"
+
+
+def test_order_completed_after_end_date():
+    order = make_order(end_at=datetime(2026, 2, 15))
+    update = make_scheduler()._completion(order, "token", RunResult("TX1", None), START)
+    assert update._doc["$set"]["status"] == "completed"
+    assert update._doc["$set"]["next_run_at"] is None
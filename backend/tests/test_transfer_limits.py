@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, UTC
+from decimal import Decimal
+
+from beanie import PydanticObjectId
+
+from src.utils.transfer_limits import TIER_LIMITS, TransferLimits, _day, _hour, check_limits, limits_for
+
+NOW = datetime(2026, 6, 15, 12, 30, tzinfo=UTC)
+LIMITS = TransferLimits(single=1_000_00, daily=2_000_00, monthly=5_000_00, recipient_daily_count=2)
+RECIPIENT = PydanticObjectId()
+
+
+def counter(hours=None, days=None, recipients=None) -> dict:
+    # Même forme que le document TransferCounter relu par load_counter (clés en chaînes)
+    return {
+        "hours": {str(hour): amount for hour, amount in (hours or {}).items()},
+        "days": {str(day): amount for day, amount in (days or {}).items()},
+        "recipients": {
+            str(recipient): {str(hour): count for hour, count in per_hour.items()}
+            for recipient, per_hour in (recipients or {}).items()
+        },
+    }
+
+
+def test_allows_transfer_within_limits():
+    assert check_limits({}, LIMITS, [(RECIPIENT, 1_000_00)], NOW) is None
+
+
+def test_single_transfer_cap():
+    assert check_limits({}, LIMITS, [(RECIPIENT, 1_000_01)], NOW) == "Montant maximal par transfert dépassé"
+
+
+def test_daily_cap_counts_only_last_24_hours():
+    hour = _hour(NOW)
+    recent = counter(hours={hour - 23: 1_500_00})
+    assert check_limits(recent, LIMITS, [(RECIPIENT, 600_00)], NOW) == "Plafond de transfert sur 24 heures dépassé"
+
+    expired = counter(hours={hour - 24: 1_500_00})
+    assert check_limits(expired, LIMITS, [(RECIPIENT, 600_00)], NOW) is None
+
+
+def test_daily_cap_applies_to_the_whole_batch():
+    legs = [(PydanticObjectId(), 800_00) for _ in range(3)]
+    assert check_limits({}, LIMITS, legs, NOW) == "Plafond de transfert sur 24 heures dépassé"
+
+
+def test_monthly_cap_counts_only_last_30_days():
+    day = _day(NOW)
+    recent = counter(days={day - 29: 4_500_00})
+    assert check_limits(recent, LIMITS, [(RECIPIENT, 600_00)], NOW) == "Plafond de transfert sur 30 jours dépassé"
+
+    expired = counter(days={day - 30: 4_500_00})
+    assert check_limits(expired, LIMITS, [(RECIPIENT, 600_00)], NOW) is None
+
+
+def test_recipient_velocity():
+    hour = _hour(NOW)
+    history = counter(recipients={RECIPIENT: {hour - 1: 1}})
+    assert check_limits(history, LIMITS, [(RECIPIENT, 10_00)], NOW) is None
+    assert check_limits(
+        history, LIMITS, [(RECIPIENT, 10_00), (RECIPIENT, 10_00)], NOW
+    ) == "Trop de transferts vers ce destinataire sur 24 heures"
+    # Un autre destinataire a son propre compteur
+    assert check_limits(history, LIMITS, [(PydanticObjectId(), 10_00)], NOW) is None
+
+
+def test_now_defaults_to_current_time():
+    hour = _hour(datetime.now(UTC) - timedelta(hours=1))
+    assert check_limits(counter(hours={hour: 1_900_00}), LIMITS, [(RECIPIENT, 200_00)]) is not None
+
+
+def test_limits_for_converts_to_account_currency():
+    assert limits_for("premium", Decimal(1)) is TIER_LIMITS["premium"]
+    assert limits_for("unknown", Decimal(1)) is TIER_LIMITS["standard"]
+    euro = limits_for("standard", Decimal("0.5"))
+    assert euro.single == TIER_LIMITS["standard"].single // 2
+    assert euro.recipient_daily_count == TIER_LIMITS["standard"].recipient_daily_count